@@ -9,15 +9,24 @@ from mood_detector import MoodDetector
 from chatbot import MindMateChatbot
 from quotes_manager import QuotesManager
 from crisis_resources import CrisisResources
+from storage import get_store
+from metrics import start_exporters
+from request_profiler import profile_request
+from preprocessing import prepare_text
+from session_memory import memory_registry
 from utils import (
     initialize_session_state, add_mood_to_history, 
-    get_mood_trend, sanitize_input, setup_logging, 
-    get_welcome_message, create_chat_bubble
+    get_mood_trend, setup_logging, 
+    get_welcome_message, build_chat_transcript_html, paginate, persist,
+    get_user_key, load_earlier_chat, render_timer, stage_timer, is_admin
 )
 
 # Setup logging
 setup_logging()
 
+# Serve latency histograms when metrics are enabled (once per process)
+start_exporters()
+
 # Configure Streamlit page
 st.set_page_config(
     page_title="MindMate - AI Mental Health Companion",
@@ -91,10 +100,9 @@ def main():
     # Initialize session state
     initialize_session_state()
     
-    # Initialize components
+    # Initialize components (the mood detector is only built for the chat page)
     try:
-        mood_detector = MoodDetector()
-        chatbot = MindMateChatbot()
+        chatbot = MindMateChatbot(st.session_state.chat_history)
         quotes_manager = QuotesManager()
         crisis_resources = CrisisResources()
     except Exception as e:
@@ -111,7 +119,7 @@ def main():
     """, unsafe_allow_html=True)
     
     # Sidebar configuration
-    setup_sidebar(mood_detector, quotes_manager, crisis_resources)
+    setup_sidebar(quotes_manager, crisis_resources)
     
     # Main content area
     if st.session_state.get('show_crisis_resources', False):
@@ -121,38 +129,115 @@ def main():
     elif st.session_state.get('show_mood_history', False):
         display_mood_history_page()
     else:
-        display_chat_interface(mood_detector, chatbot, crisis_resources)
+        display_chat_interface(get_mood_detector(), chatbot, crisis_resources)
+
+@st.cache_resource(show_spinner=False)
+def get_mood_detector():
+    """Process-wide mood detector; torch and transformers load on its first analysis
 
-def setup_sidebar(mood_detector, quotes_manager, crisis_resources):
+    When an inference service is configured, analysis goes there instead and
+    the local models only load if the service is unreachable.
+    """
+    if Config.INFERENCE_SERVICE_URL:
+        from inference_client import InferenceClient
+        return InferenceClient()
+    return MoodDetector()
+
+def setup_sidebar(quotes_manager, crisis_resources):
     """Setup the sidebar with mood tracking, personality selection, and resources"""
     
     with st.sidebar:
-        st.markdown("## 🎭 Current Mood")
+        display_current_mood()
         
-        # Display current mood
-        current_mood = st.session_state.get('current_mood', {"emotion": "normal", "confidence": 0.0})
-        mood_emoji = Config.MOOD_EMOJIS.get(current_mood['emotion'], "😊")
-        confidence = current_mood['confidence']
+        st.markdown("---")
         
-        st.markdown(f"""
-        <div class="mood-indicator">
-            <h2>{mood_emoji}</h2>
-            <h4>{current_mood['emotion'].title()}</h4>
-            <p>Confidence: {confidence:.2%}</p>
-        </div>
-        """, unsafe_allow_html=True)
+        # Each interactive section is a fragment, so using it reruns only that section
+        personality_selector_fragment()
         
-        # Mood trend
-        try:
-            trend = get_mood_trend()
-            if isinstance(trend, dict):
-                st.markdown(f"**Trend**: {trend['trend'].title()}")
-        except Exception as e:
-            logging.error(f"Error getting mood trend: {str(e)}")
+        st.markdown("---")
+        
+        # Quick actions
+        st.markdown("## 🌟 Quick Actions")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            if st.button("📝 View Mood History", use_container_width=True):
+                st.session_state.show_mood_history = True
+                st.rerun()
+        
+        with col2:
+            if st.button("💡 Browse Quotes", use_container_width=True):
+                st.session_state.show_quotes = True
+                st.rerun()
+        
+        daily_quote_fragment(quotes_manager)
         
         st.markdown("---")
         
-        # Personality selector
+        crisis_contacts_fragment(crisis_resources)
+        
+        if is_admin():
+            st.markdown("---")
+            display_diagnostics()
+
+def display_diagnostics():
+    """Admin-only switches for investigating slow requests"""
+    
+    with st.expander("🛠️ Diagnostics"):
+        st.toggle("Profile my chat requests", key="profile_requests")
+        st.caption(
+            f"Profiles are written to `{Config.PROFILE_DIR}`. "
+            f"Sampled for everyone at a rate of {Config.PROFILE_SAMPLE_RATE:g}."
+        )
+        
+        # Chat history held in memory by every live session on this server
+        report = memory_registry.report()
+        st.caption(
+            f"Chat history in memory: {report['total_bytes'] / 1e6:.1f} MB across {report['sessions']} sessions, "
+            f"{report['entries']} turns held, {report['spilled_entries']} spilled to storage."
+        )
+        if report["largest"]:
+            st.dataframe(
+                [{"session": session["session_id"][:8], "KB": round(session["bytes"] / 1024, 1),
+                  "turns": session["entries"], "spilled": session["spilled"]} for session in report["largest"]],
+                hide_index=True, use_container_width=True
+            )
+
+def display_current_mood():
+    """Display the current mood and trend (changes only when a message is sent)"""
+    
+    st.markdown("## 🎭 Current Mood")
+    
+    # Display current mood
+    current_mood = st.session_state.get('current_mood', {"emotion": "normal", "confidence": 0.0})
+    mood_emoji = Config.MOOD_EMOJIS.get(current_mood['emotion'], "😊")
+    confidence = current_mood['confidence']
+    
+    st.markdown(f"""
+    <div class="mood-indicator">
+        <h2>{mood_emoji}</h2>
+        <h4>{current_mood['emotion'].title()}</h4>
+        <p>Confidence: {confidence:.2%}</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Mood trend, read from the online trend engine
+    try:
+        trend = st.session_state.mood_trend.current()
+        if trend.has_data:
+            st.markdown(f"**Trend**: {trend.trend.title()}")
+            change_note = trend.describe_change()
+            if change_note:
+                st.caption(change_note)
+    except Exception as e:
+        logging.error(f"Error getting mood trend: {str(e)}")
+
+@st.fragment
+def personality_selector_fragment():
+    """Personality selector; the choice applies from the next message on"""
+    
+    with render_timer("personality_selector"):
         st.markdown("## 🤖 Chatbot Personality")
         
         personalities = list(Config.PERSONALITIES.keys())
@@ -166,7 +251,6 @@ def setup_sidebar(mood_detector, quotes_manager, crisis_resources):
         if selected_personality != st.session_state.get('selected_personality'):
             st.session_state.selected_personality = selected_personality
             st.success(f"Switched to {selected_personality} personality!")
-            st.rerun()
         
         # Display current personality info
         personality_info = Config.PERSONALITIES[selected_personality]
@@ -175,25 +259,12 @@ def setup_sidebar(mood_detector, quotes_manager, crisis_resources):
             <small><strong>Style:</strong> {personality_info['tone']}</small>
         </div>
         """, unsafe_allow_html=True)
-        
-        st.markdown("---")
-        
-        # Quick actions
-        st.markdown("## 🌟 Quick Actions")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            if st.button("📝 View Mood History", use_container_width=True):
-                st.session_state.show_mood_history = True
-                st.rerun()
-        
-        with col2:
-            if st.button("💡 Browse Quotes", use_container_width=True):
-                st.session_state.show_quotes = True
-                st.rerun()
-        
-        # Daily quote
+
+@st.fragment
+def daily_quote_fragment(quotes_manager):
+    """Quote of the day card with its favorite button"""
+    
+    with render_timer("daily_quote"):
         st.markdown("## 🌅 Quote of the Day")
         
         daily_quote = quotes_manager.get_daily_quote()
@@ -210,9 +281,12 @@ def setup_sidebar(mood_detector, quotes_manager, crisis_resources):
                 st.success("Added to favorites!")
             else:
                 st.info("Already in favorites!")
-        
-        st.markdown("---")
-        
+
+@st.fragment
+def crisis_contacts_fragment(crisis_resources):
+    """Crisis resources button, region selector and quick contacts"""
+    
+    with render_timer("crisis_contacts"):
         # Crisis resources - always visible
         st.markdown("## 🆘 Need Help?")
         
@@ -220,12 +294,25 @@ def setup_sidebar(mood_detector, quotes_manager, crisis_resources):
             st.session_state.show_crisis_resources = True
             st.rerun()
         
+        # Region for crisis contacts
+        regions = crisis_resources.get_regions()
+        region_codes = list(regions.keys())
+        current_bundle = crisis_resources.get_bundle()
+        selected_region = st.selectbox(
+            "Your region:",
+            region_codes,
+            index=region_codes.index(current_bundle.region),
+            format_func=lambda code: regions[code],
+            help="Show crisis contacts for where you are"
+        )
+        
+        if selected_region != current_bundle.region:
+            st.session_state.locale = {**st.session_state.locale, "region": selected_region}
+            current_bundle = crisis_resources.get_bundle()
+        
         # Quick crisis contacts
-        quick_resources = crisis_resources.get_quick_resources()
         with st.expander("Quick Contacts"):
-            for resource in quick_resources[:2]:  # Show top 2
-                st.markdown(f"**{resource['name']}**")
-                st.markdown(f"`{resource['number']}`")
+            st.markdown(current_bundle.fragments["quick"])
 
 def display_chat_interface(mood_detector, chatbot, crisis_resources):
     """Display the main chat interface"""
@@ -250,28 +337,21 @@ def display_chat_interface(mood_detector, chatbot, crisis_resources):
     # Display chat history
     st.markdown("## 💬 Conversation")
     
+    # Only the most recent messages are rendered; older ones load on request
+    window = st.session_state.setdefault('chat_window', Config.CHAT_WINDOW_SIZE)
+    chat_history = st.session_state.chat_history
+    has_earlier = len(chat_history) > window or chat_history.cursor is not None
+    
+    if has_earlier and st.button("⬆️ Load earlier messages", key="load_earlier_chat"):
+        window += Config.CHAT_WINDOW_SIZE
+        st.session_state.chat_window = window
+        load_earlier_chat(window)
+    
     # Create chat container
     chat_container = st.container()
     
-    with chat_container:
-        for chat in st.session_state.chat_history:
-            if chat.get('is_welcome'):
-                continue  # Skip welcome message in chat bubbles
-            
-            if chat['user_message']:
-                create_chat_bubble(
-                    chat['user_message'], 
-                    is_user=True, 
-                    emotion=chat.get('detected_emotion'),
-                    timestamp=chat['timestamp']
-                )
-            
-            if chat['bot_response']:
-                create_chat_bubble(
-                    chat['bot_response'], 
-                    is_user=False,
-                    timestamp=chat['timestamp']
-                )
+    with chat_container, stage_timer("render"):
+        st.markdown(build_chat_transcript_html(chat_history[-window:]), unsafe_allow_html=True)
     
     # Chat input
     st.markdown("---")
@@ -300,14 +380,33 @@ def display_chat_interface(mood_detector, chatbot, crisis_resources):
     
     # Process user input
     if submit_button and user_input.strip():
+        st.session_state.stage_timings = {}
+        # Set before the profiled block, whose details are read even if preprocessing fails
+        prepared = None
         try:
-            with st.spinner("MindMate is thinking..."):
-                # Sanitize input
-                clean_input = sanitize_input(user_input)
+            with st.spinner("MindMate is thinking..."), profile_request(
+                st.session_state.session_id,
+                force=st.session_state.get('profile_requests', False),
+                details=lambda: {"stage_timings_ms": dict(st.session_state.stage_timings),
+                                 **({"message_hash": prepared.content_hash,
+                                     "token_estimate": prepared.token_estimate} if prepared is not None else {})}
+            ) as profiling:
+                # Stage timings are only kept when this request is profiled (or Config.RECORD_TIMINGS)
+                st.session_state.profiling = profiling
+                
+                # Sanitize and normalize the input once for every later stage
+                with stage_timer("preprocess"):
+                    prepared = prepare_text(user_input)
+                    clean_input = prepared.text
+                logging.debug(f"Processing message {prepared.content_hash} "
+                              f"(~{prepared.token_estimate} tokens, language {prepared.language_hint})")
                 
-                # Detect mood and crisis indicators
-                mood_result = mood_detector.detect_emotion(clean_input)
-                is_crisis = mood_detector.detect_crisis_indicators(clean_input)
+                # Detect mood and sentiment, then crisis indicators
+                with stage_timer("emotion"):
+                    analysis = mood_detector.analyze(prepared, st.session_state.emotion_context)
+                    mood_result, sentiment = analysis["mood"], analysis["sentiment"]
+                with stage_timer("crisis"):
+                    is_crisis = mood_detector.detect_crisis_indicators(prepared)
                 
                 # Update current mood
                 st.session_state.current_mood = {
@@ -316,27 +415,23 @@ def display_chat_interface(mood_detector, chatbot, crisis_resources):
                 }
                 
                 # Add to mood history
-                add_mood_to_history(mood_result['emotion'], mood_result['confidence'])
+                with stage_timer("mood_history"):
+                    add_mood_to_history(mood_result['emotion'], mood_result['confidence'])
                 
-                # Handle crisis detection
-                if is_crisis:
-                    st.session_state.crisis_detected = True
-                    crisis_resources.log_crisis_interaction(clean_input)
-                    bot_response = chatbot.get_crisis_response()
-                else:
-                    # Generate normal response
-                    bot_response = chatbot.get_personality_response(mood_result['emotion'], clean_input)
-                
-                # Add to chat history
-                chat_entry = {
-                    "timestamp": datetime.now(),
-                    "user_message": clean_input,
-                    "bot_response": bot_response,
-                    "detected_emotion": mood_result['emotion']
-                }
+                with stage_timer("response"):
+                    # Handle crisis detection
+                    if is_crisis:
+                        st.session_state.crisis_detected = True
+                        crisis_resources.log_crisis_interaction(clean_input)
+                        bot_response = chatbot.get_crisis_response()
+                    else:
+                        # Generate normal response
+                        bot_response = chatbot.get_personality_response(mood_result['emotion'], clean_input, sentiment)
                 
-                st.session_state.chat_history.append(chat_entry)
-                chatbot.add_to_history(clean_input, bot_response, mood_result['emotion'])
+                # Add to chat history (shared with the chatbot) and persist it
+                with stage_timer("chat_history"):
+                    chat_entry = chatbot.add_to_history(clean_input, bot_response, mood_result['emotion'])
+                    st.session_state.chat_history.track_write(chat_entry["id"], persist("add_chat_entry", chat_entry))
                 
                 # Rerun to show new messages
                 st.rerun()
@@ -344,6 +439,8 @@ def display_chat_interface(mood_detector, chatbot, crisis_resources):
         except Exception as e:
             st.error(f"An error occurred while processing your message: {str(e)}")
             logging.error(f"Chat processing error: {str(e)}\n{traceback.format_exc()}")
+        finally:
+            st.session_state.profiling = False
 
 def display_quotes_page(quotes_manager):
     """Display the quotes browsing page"""
@@ -385,24 +482,7 @@ def display_quotes_page(quotes_manager):
     
     with col2:
         if st.button("⭐ View Favorites", use_container_width=True):
-            favorites = quotes_manager.get_favorites()
-            if favorites:
-                st.markdown("### ⭐ Your Favorite Quotes")
-                for i, fav_quote in enumerate(favorites):
-                    with st.container():
-                        st.markdown(f"""
-                        <div class="quote-card">
-                            <p style="font-style: italic;">"{fav_quote['text']}"</p>
-                            <p style="text-align: right;">— {fav_quote['author']}</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        if st.button(f"❌ Remove from Favorites", key=f"remove_fav_{i}"):
-                            quotes_manager.remove_from_favorites(fav_quote)
-                            st.success("Removed from favorites!")
-                            st.rerun()
-            else:
-                st.info("No favorite quotes yet. Add some by clicking the ⭐ button!")
+            st.session_state.show_favorites = not st.session_state.get('show_favorites', False)
     
     with col3:
         if st.button("🔄 Refresh Daily Quote", use_container_width=True):
@@ -415,46 +495,104 @@ def display_quotes_page(quotes_manager):
             </div>
             """, unsafe_allow_html=True)
     
+    if st.session_state.get('show_favorites'):
+        favorites_fragment(quotes_manager)
+    
     # Display quotes based on search/category
     if search_term:
         results = quotes_manager.search_quotes(search_term)
         st.markdown(f"### 🔍 Search Results ({len(results)} found)")
         
-        for quote in results:
-            with st.container():
-                st.markdown(f"""
-                <div class="quote-card">
-                    <p style="font-style: italic;">"{quote['text']}"</p>
-                    <p style="text-align: right;">— {quote['author']}</p>
-                    <small>Category: {quote.get('category', 'Unknown')}</small>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                if st.button(f"⭐ Add to Favorites", key=f"fav_{quote['text'][:20]}"):
-                    if quotes_manager.add_to_favorites(quote):
-                        st.success("Added to favorites!")
-                    else:
-                        st.info("Already in favorites!")
+        display_quote_list(quotes_manager, results, f"search:{search_term.lower()}", show_category=True)
     
     elif selected_category != "All":
         # Display quotes from selected category
-        category_quotes = quotes_manager.quotes.get(selected_category, [])
+        category_quotes = quotes_manager.get_category_quotes(selected_category)
         st.markdown(f"### 📚 {selected_category.replace('_', ' ').title()} Quotes")
         
-        for quote in category_quotes:
-            with st.container():
-                st.markdown(f"""
-                <div class="quote-card">
-                    <p style="font-style: italic;">"{quote['text']}"</p>
-                    <p style="text-align: right;">— {quote['author']}</p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                if st.button(f"⭐ Add to Favorites", key=f"fav_cat_{quote['text'][:20]}"):
-                    if quotes_manager.add_to_favorites(quote):
-                        st.success("Added to favorites!")
-                    else:
-                        st.info("Already in favorites!")
+        display_quote_list(quotes_manager, category_quotes, f"category:{selected_category}")
+
+@st.fragment
+def favorites_fragment(quotes_manager):
+    """Favorite quotes list; removing one reruns only this list"""
+    
+    with render_timer("favorites"):
+        favorites = quotes_manager.get_favorites()
+        if favorites:
+            st.markdown("### ⭐ Your Favorite Quotes")
+            for i, fav_quote in enumerate(favorites):
+                with st.container():
+                    st.markdown(f"""
+                    <div class="quote-card">
+                        <p style="font-style: italic;">"{fav_quote['text']}"</p>
+                        <p style="text-align: right;">— {fav_quote['author']}</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+                    
+                    if st.button(f"❌ Remove from Favorites", key=f"remove_fav_{fav_quote.get('id', i)}"):
+                        quotes_manager.remove_from_favorites(fav_quote)
+                        st.rerun(scope="fragment")
+        else:
+            st.info("No favorite quotes yet. Add some by clicking the ⭐ button!")
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def build_quote_page_html(view_key, page, page_size, data_version, _quotes, show_category=False):
+    """Build the quote card HTML for one page of a quote list"""
+    cards = []
+    for quote in _quotes:
+        category_line = f"<small>Category: {quote.get('category', 'Unknown')}</small>" if show_category else ""
+        cards.append(f"""
+        <div class="quote-card">
+            <p style="font-style: italic;">"{quote['text']}"</p>
+            <p style="text-align: right;">— {quote['author']}</p>
+            {category_line}
+        </div>
+        """)
+    return tuple(cards)
+
+def display_quote_list(quotes_manager, quotes, view_key, show_category=False):
+    """Display one page of a quote list with pagination controls"""
+    
+    if not quotes:
+        return
+    
+    page_size = Config.QUOTES_PAGE_SIZE
+    pages = st.session_state.setdefault('quote_pages', {})
+    page_quotes, page, total_pages = paginate(quotes, pages.get(view_key, 0), page_size)
+    pages[view_key] = page
+    
+    cards = build_quote_page_html(
+        view_key, page, page_size, quotes_manager.data_version, page_quotes, show_category
+    )
+    
+    for quote, card_html in zip(page_quotes, cards):
+        with st.container():
+            st.markdown(card_html, unsafe_allow_html=True)
+            
+            if st.button("⭐ Add to Favorites", key=f"fav_{quote['id']}"):
+                if quotes_manager.add_to_favorites(quote):
+                    st.success("Added to favorites!")
+                else:
+                    st.info("Already in favorites!")
+    
+    if total_pages > 1:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        
+        with col1:
+            if st.button("← Previous", key=f"page_prev_{view_key}", disabled=page == 0, use_container_width=True):
+                pages[view_key] = page - 1
+                st.rerun()
+        
+        with col2:
+            st.markdown(
+                f"<p style='text-align: center;'>Page {page + 1} of {total_pages}</p>",
+                unsafe_allow_html=True
+            )
+        
+        with col3:
+            if st.button("Next →", key=f"page_next_{view_key}", disabled=page >= total_pages - 1, use_container_width=True):
+                pages[view_key] = page + 1
+                st.rerun()
 
 def display_mood_history_page():
     """Display mood tracking history and analytics"""
@@ -483,22 +621,18 @@ def display_mood_history_page():
                 st.metric("Dominant Mood", trend['dominant_mood'].title())
             
             with col2:
-                st.metric("Current Trend", trend['trend'].title())
+                st.metric("Current Trend", st.session_state.mood_trend.current().trend.title())
             
             with col3:
                 st.metric("Mood Entries", len(mood_history))
             
-            # Mood distribution
-            st.markdown("## 📈 Mood Distribution")
-            
-            mood_dist = trend['mood_distribution']
-            
-            # Create a simple chart using Streamlit's built-in charting
-            import pandas as pd
-            
-            df = pd.DataFrame(list(mood_dist.items()), columns=['Mood', 'Count'])
-            st.bar_chart(df.set_index('Mood'))
-            
+    except Exception as e:
+        logging.error(f"Error getting mood trend: {str(e)}")
+    
+    # Long-range analytics from the stored rollups
+    try:
+        display_mood_rollups()
+        
     except Exception as e:
         logging.error(f"Error displaying mood analytics: {str(e)}")
         st.error("Unable to generate mood analytics at this time.")
@@ -507,7 +641,7 @@ def display_mood_history_page():
     st.markdown("## 📝 Recent Mood History")
     
     # Show last 20 entries
-    recent_moods = mood_history[-20:] if len(mood_history) > 20 else mood_history
+    recent_moods = mood_history.recent(20)
     
     for mood_entry in reversed(recent_moods):  # Most recent first
         timestamp = mood_entry['timestamp']
@@ -536,6 +670,44 @@ def display_mood_history_page():
         </div>
         """, unsafe_allow_html=True)
 
+def display_mood_rollups():
+    """Display mood distribution and timelines from precomputed rollups"""
+    
+    st.markdown("## 📈 Mood Distribution")
+    
+    granularity_labels = {"hour": "Last 48 hours", "day": "Last 30 days", "week": "Last 12 months"}
+    granularity = st.radio(
+        "Time range:",
+        list(granularity_labels.keys()),
+        index=1,
+        format_func=granularity_labels.get,
+        horizontal=True
+    )
+    
+    # Imported here so pandas and NumPy load only when analytics are viewed
+    from mood_analytics import MoodAnalytics
+    
+    store = get_store()
+    # Include a mood added moments ago, waiting for the writer only while it is still queued
+    pending = st.session_state.get('pending_mood_write')
+    if pending is not None:
+        if pending > store.committed_through:
+            store.flush(timeout=1.0)
+        st.session_state.pending_mood_write = None
+    frame = MoodAnalytics(store, get_user_key()).load(granularity)
+    
+    if not frame.total:
+        st.info("No mood data in this time range yet.")
+        return
+    
+    st.bar_chart(frame.to_distribution_data())
+    
+    st.markdown("### Mood Over Time")
+    st.bar_chart(frame.to_chart_data())
+    
+    st.markdown("### Detection Confidence")
+    st.line_chart(frame.to_confidence_data())
+
 def display_crisis_resources_page(crisis_resources):
     """Display comprehensive crisis resources"""
     
@@ -548,7 +720,8 @@ def display_crisis_resources_page(crisis_resources):
 
 if __name__ == "__main__":
     try:
-        main()
+        with render_timer("app"):
+            main()
     except Exception as e:
         st.error("An unexpected error occurred. Please refresh the page.")
         logging.error(f"Main application error: {str(e)}\n{traceback.format_exc()}")
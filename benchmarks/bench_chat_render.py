@@ -0,0 +1,88 @@
+"""Benchmark building the chat transcript HTML against transcript length.
+
+Compares the old approach (format every message from scratch on each rerun)
+with the windowed, cached renderer used by the app. Only the HTML string is
+timed, not a Streamlit rerun or the browser rendering it; bench_reruns.py
+measures whole reruns.
+
+    python benchmarks/bench_chat_render.py --lengths 10 100 1000 10000 --output chat_render.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from utils import build_chat_bubble_html, build_chat_transcript_html, format_timestamp
+
+
+def make_transcript(length):
+    """Synthetic transcript spread over the last few days"""
+    start = datetime.now() - timedelta(days=3)
+    return [{
+        "id": uuid.uuid4().hex,
+        "timestamp": start + timedelta(minutes=i),
+        "user_message": f"Message {i}: I've been thinking about how the week went and how I feel about it.",
+        "bot_response": f"Response {i}: Thank you for sharing that. What stood out to you the most?",
+        "detected_emotion": "normal",
+    } for i in range(length)]
+
+
+def render_full_uncached(transcript):
+    """Baseline: every message formatted from scratch"""
+    parts = []
+    for chat in transcript:
+        for message, is_user in ((chat["user_message"], True), (chat["bot_response"], False)):
+            head, tail = build_chat_bubble_html.__wrapped__(
+                message, is_user, chat["detected_emotion"] if is_user else None
+            )
+            parts.append(head + format_timestamp(chat["timestamp"]) + tail)
+    return "".join(parts)
+
+
+def render_windowed(transcript, window):
+    """Current renderer: last ``window`` messages with cached bubble HTML"""
+    return build_chat_transcript_html(transcript[-window:])
+
+
+def time_call(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--window", type=int, default=Config.CHAT_WINDOW_SIZE)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = []
+    print("HTML build time per rerun, excluding Streamlit and the browser")
+    print(f"{'messages':>10} {'full (ms)':>12} {'windowed (ms)':>15}")
+    for length in args.lengths:
+        transcript = make_transcript(length)
+        render_windowed(transcript, args.window)  # warm the bubble cache, as a previous rerun would
+        full_ms = time_call(lambda: render_full_uncached(transcript), args.repeat)
+        windowed_ms = time_call(lambda: render_windowed(transcript, args.window), args.repeat)
+        results.append({"messages": length, "full_ms": full_ms, "windowed_ms": windowed_ms})
+        print(f"{length:>10} {full_ms:>12.3f} {windowed_ms:>15.3f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"window": args.window, "repeat": args.repeat, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Benchmark conversation export and import throughput on a long history.
+
+Seeds a conversation store with one user's synthetic history (a million chat
+messages and as many moods by default), then exports it as JSONL, gzipped
+JSONL and Parquet, and imports each export into a fresh user and then again
+into the same user, where every record is a duplicate. Every phase runs in a
+fresh interpreter, so the peak RSS it reports belongs to that phase alone and
+shows whether memory stays bounded by the chunk size.
+
+    python benchmarks/bench_export.py --messages 1000000
+    python benchmarks/bench_export.py --messages 100000 --formats jsonl --chunk-size 1000
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_mood_detector import peak_rss_mb  # noqa: E402
+
+RESULT_MARKER = "BENCH_RESULT "
+SOURCE_USER = "bench:source"
+EXPORT_NAMES = {"jsonl": "history.jsonl", "jsonl.gz": "history.jsonl.gz", "parquet": "history-parquet"}
+
+
+def synthetic_chunks(messages, chunk_size, seed):
+    """Yield (kind, rows) chunks of a synthetic history, one mood per chat message"""
+    from benchmarks.load_test import make_corpus
+    from config import Config
+
+    rng = random.Random(seed)
+    corpus = make_corpus(5000, seed, crisis_rate=0.0)
+    emotions = list(Config.MOOD_EMOJIS)
+    personalities = sorted(Config.PERSONALITIES)
+    start = 1704067200.0  # 2024-01-01T00:00:00Z
+    for offset in range(0, messages, chunk_size):
+        chat, moods = [], []
+        for i in range(offset, min(messages, offset + chunk_size)):
+            ts = start + i * 37.5
+            emotion = rng.choice(emotions)
+            chat.append((f"msg-{i:08d}", ts, corpus[i % len(corpus)], corpus[(i * 7) % len(corpus)],
+                         emotion, personalities[i % len(personalities)]))
+            moods.append((ts, emotion, round(rng.random(), 6)))
+        yield "chat", chat
+        yield "mood", moods
+    yield "favorite", [(f"quote-{i}", start + i, f"Quote {i}", "Author", "motivation") for i in range(200)]
+
+
+def run_phase(args):
+    """Run inside the worker interpreter"""
+    from conversation_export import export_history, import_history
+    from storage import ConversationStore
+
+    store = ConversationStore(args.db)
+    start = time.perf_counter()
+    if args.phase == "seed":
+        records = sum(store.import_rows(kind, SOURCE_USER, rows)
+                      for kind, rows in synthetic_chunks(args.messages, args.chunk_size, args.seed))
+        size = os.path.getsize(args.db)
+    elif args.phase == "export":
+        counts = export_history(store, SOURCE_USER, args.path, args.format, chunk_size=args.chunk_size)
+        records = sum(counts.values())
+        size = (sum(entry.stat().st_size for entry in os.scandir(args.path))
+                if os.path.isdir(args.path) else os.path.getsize(args.path))
+    else:
+        counts = import_history(store, args.user, args.path, args.format, args.chunk_size)
+        records = sum(read for read, _ in counts.values())
+        size = sum(inserted for _, inserted in counts.values())
+    elapsed = time.perf_counter() - start
+    store.close()
+    print(RESULT_MARKER + json.dumps({"records": records, "elapsed_s": elapsed, "size": size,
+                                      "peak_rss_mb": peak_rss_mb()}))
+
+
+def phase(args, name, **options):
+    command = [sys.executable, os.path.abspath(__file__), "--phase", name, "--db", args.db,
+               "--messages", str(args.messages), "--chunk-size", str(args.chunk_size), "--seed", str(args.seed)]
+    for option, value in options.items():
+        command += [f"--{option}", value]
+    completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    raise RuntimeError(f"{name} failed:\n{completed.stderr[-2000:]}")
+
+
+def report(label, result, size_label=None):
+    rate = result["records"] / result["elapsed_s"]
+    extra = f"   {size_label}" if size_label else ""
+    print(f"{label:<28} {result['records']:>9} records {result['elapsed_s']:>7.2f} s "
+          f"{rate:>10.0f} records/s   peak RSS {result['peak_rss_mb']:>6.0f} MB{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1000000)
+    parser.add_argument("--formats", nargs="+", default=list(EXPORT_NAMES), choices=list(EXPORT_NAMES))
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--workdir", help="Keep the store and exports here (default: a temporary directory)")
+    parser.add_argument("--phase", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    parser.add_argument("--format", help=argparse.SUPPRESS)
+    parser.add_argument("--user", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    from config import Config
+    args.chunk_size = args.chunk_size or Config.EXPORT_CHUNK_SIZE
+    if args.phase:
+        run_phase(args)
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        workdir = args.workdir or temp_dir
+        os.makedirs(workdir, exist_ok=True)
+        args.db = os.path.join(workdir, "conversations.db")
+        if os.path.exists(args.db):
+            os.remove(args.db)
+
+        print(f"{args.messages} messages, chunks of {args.chunk_size} rows")
+        seeded = phase(args, "seed")
+        report("seed (import_rows)", seeded, f"store {seeded['size'] / 1e6:.0f} MB")
+
+        for name in args.formats:
+            path = os.path.join(workdir, EXPORT_NAMES[name])
+            fmt = "parquet" if name == "parquet" else "jsonl"
+            exported = phase(args, "export", path=path, format=fmt)
+            report(f"export {name}", exported, f"{exported['size'] / 1e6:.0f} MB written")
+            for attempt in ("new", "duplicate"):
+                imported = phase(args, "import", path=path, format=fmt, user=f"bench:import-{name}")
+                report(f"import {name} ({attempt})", imported, f"{imported['size']} inserted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""Benchmark MoodDetector latency, batch throughput, cold load and memory.
+
+Runs on the fixed corpus in benchmarks/corpus (short, medium and long
+messages). Every backend and thread setting is measured in a fresh
+interpreter, so cold-load time and peak memory are not shared between runs.
+The result cache is turned off so every call reaches the model. Runs are
+appended to a JSON history, and ``compare`` flags regressions between two
+runs. Each run also times the fused analyze() call against separate emotion
+and sentiment calls, and, for in-process backends, the extra latency of
+context-aware scoring over scoring each message alone.
+
+    python benchmarks/bench_mood_detector.py run --backends cpu --threads 1 4
+    python benchmarks/bench_mood_detector.py run --backends service --service-url http://127.0.0.1:8765
+    python benchmarks/bench_mood_detector.py compare --threshold 0.10
+
+Start a service under test with MINDMATE_RESULT_CACHE=none as well.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_CORPUS = os.path.join(ROOT, "benchmarks", "corpus", "mood_corpus_v1.json")
+DEFAULT_HISTORY = os.path.join(ROOT, "benchmarks", "results", "mood_detector.json")
+BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64]
+RESULT_MARKER = "BENCH_RESULT "
+
+
+def load_corpus(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def latency_stats(timings):
+    ordered = sorted(timings)
+    return {
+        "mean_ms": statistics.mean(ordered),
+        "p50_ms": ordered[len(ordered) // 2],
+        "p95_ms": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(backend, corpus, repeat, rounds, service_url=None):
+    """Run inside the worker interpreter, after the environment is set up"""
+    start = time.perf_counter()
+    if backend == "service":
+        from inference_client import InferenceClient
+        detector = InferenceClient(service_url)
+        if not detector.is_available():
+            raise RuntimeError(f"Inference service at {service_url} is not reachable")
+        detector.detect_emotion("warm up")
+    else:
+        from mood_detector import MoodDetector
+        detector = MoodDetector()
+        detector.ensure_models()
+        if detector.emotion_classifier is None:
+            raise RuntimeError("Emotion model failed to load")
+    cold_load_s = time.perf_counter() - start
+
+    messages = corpus["messages"]
+    for text in messages["short"][:3]:
+        detector.detect_emotion(text)
+
+    latency = {}
+    for category, texts in messages.items():
+        timings = []
+        for _ in range(repeat):
+            for text in texts:
+                call_start = time.perf_counter()
+                detector.detect_emotion(text)
+                timings.append((time.perf_counter() - call_start) * 1000)
+        latency[category] = latency_stats(timings)
+
+    # Throughput on a fixed mix of all message lengths
+    mixed = [text for texts in messages.values() for text in texts]
+    throughput = {}
+    for batch_size in BATCH_SIZES:
+        batch = [mixed[i % len(mixed)] for i in range(batch_size)]
+        batch_start = time.perf_counter()
+        for _ in range(rounds):
+            detector.detect_emotions(batch, batch_size=batch_size)
+        throughput[str(batch_size)] = batch_size * rounds / (time.perf_counter() - batch_start)
+
+    # One fused analyze() call against the two serial calls it replaces
+    serial, fused = [], []
+    for _ in range(repeat):
+        for text in mixed:
+            call_start = time.perf_counter()
+            detector.detect_emotion(text)
+            detector.analyze_sentiment_intensity(text)
+            serial.append((time.perf_counter() - call_start) * 1000)
+            call_start = time.perf_counter()
+            detector.analyze(text)
+            fused.append((time.perf_counter() - call_start) * 1000)
+    fused_latency = {"serial": latency_stats(serial), "fused": latency_stats(fused)}
+    fused_latency["saved_p50_ms"] = fused_latency["serial"]["p50_ms"] - fused_latency["fused"]["p50_ms"]
+
+    # Cost of scoring each message with the previous turns as context, on the
+    # same conversation; the service scores messages alone, so it is skipped
+    context_latency = None
+    if backend != "service":
+        from config import Config
+        from mood_detector import EmotionContext
+        context = EmotionContext(turns=Config.EMOTION_CONTEXT_TURNS or 3)
+        alone, in_context = [], []
+        for _ in range(repeat):
+            context.clear()
+            for text in mixed:
+                call_start = time.perf_counter()
+                detector.detect_emotion(text)
+                alone.append((time.perf_counter() - call_start) * 1000)
+                call_start = time.perf_counter()
+                detector.detect_emotion_in_context(text, context)
+                in_context.append((time.perf_counter() - call_start) * 1000)
+        context_latency = {"turns": context.turns, "alone": latency_stats(alone),
+                           "context": latency_stats(in_context)}
+        context_latency["extra_p50_ms"] = context_latency["context"]["p50_ms"] - context_latency["alone"]["p50_ms"]
+
+    return {
+        "cold_load_s": cold_load_s,
+        "latency": latency,
+        "throughput_texts_per_s": throughput,
+        "fused_latency": fused_latency,
+        "context_latency": context_latency,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_worker(args):
+    corpus = load_corpus(args.corpus)
+    result = measure(args.backend, corpus, args.repeat, args.rounds, args.service_url)
+    print(RESULT_MARKER + json.dumps(result))
+
+
+def run_configuration(backend, threads, args):
+    env = dict(os.environ, MINDMATE_RESULT_CACHE="none", MINDMATE_INFERENCE_THREADS=str(threads))
+    if backend in ("cpu", "cuda"):
+        env["MINDMATE_INFERENCE_DEVICE"] = backend
+    command = [
+        sys.executable, os.path.abspath(__file__), "worker",
+        "--backend", backend, "--corpus", args.corpus,
+        "--repeat", str(args.repeat), "--rounds", str(args.rounds),
+    ]
+    if args.service_url:
+        command += ["--service-url", args.service_url]
+
+    completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    raise RuntimeError(f"{backend} with {threads} threads failed:\n{completed.stderr[-2000:]}")
+
+
+def load_history(path):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return []
+
+
+def run(args):
+    from config import Config
+
+    corpus = load_corpus(args.corpus)
+    history = load_history(args.history)
+    entry = {
+        "version": Config.APP_VERSION,
+        "corpus_version": corpus["version"],
+        "timestamp": time.time(),
+        "python": sys.version.split()[0],
+        "emotion_model": Config.EMOTION_MODEL,
+        "results": {},
+    }
+
+    for backend in args.backends:
+        # Thread settings only apply to in-process models
+        for threads in (args.threads if backend != "service" else [0]):
+            key = f"{backend}/threads={threads}"
+            try:
+                result = run_configuration(backend, threads, args)
+            except RuntimeError as e:
+                print(f"{key}: {e}")
+                continue
+            entry["results"][key] = result
+
+            print(f"{key}: cold load {result['cold_load_s']:.2f} s, peak RSS {result['peak_rss_mb']:.0f} MB")
+            for category, stats in result["latency"].items():
+                print(f"    {category:<8} p50 {stats['p50_ms']:>8.2f} ms   p95 {stats['p95_ms']:>8.2f} ms")
+            print("    batch    " + "  ".join(f"{size:>7}" for size in result["throughput_texts_per_s"]))
+            print("    texts/s  " + "  ".join(f"{value:>7.1f}" for value in result["throughput_texts_per_s"].values()))
+            fused_latency = result.get("fused_latency")
+            if fused_latency:
+                print(f"    analyze  p50 {fused_latency['fused']['p50_ms']:>8.2f} ms fused, "
+                      f"{fused_latency['serial']['p50_ms']:.2f} ms as two serial calls")
+            context_latency = result.get("context_latency")
+            if context_latency:
+                print(f"    context  p50 {context_latency['context']['p50_ms']:>8.2f} ms with {context_latency['turns']} "
+                      f"turns, {context_latency['extra_p50_ms']:+.2f} ms over the message alone")
+
+    if entry["results"] and not args.no_save:
+        os.makedirs(os.path.dirname(args.history), exist_ok=True)
+        history.append(entry)
+        with open(args.history, "w", encoding="utf-8") as f:
+            json.dump(history, f, indent=2)
+
+
+def flatten_metrics(result):
+    """(metric name, value, higher_is_better) for every compared number"""
+    metrics = [("cold_load_s", result["cold_load_s"], False), ("peak_rss_mb", result["peak_rss_mb"], False)]
+    for category, stats in result["latency"].items():
+        metrics.append((f"latency.{category}.p50_ms", stats["p50_ms"], False))
+        metrics.append((f"latency.{category}.p95_ms", stats["p95_ms"], False))
+    for batch_size, value in result["throughput_texts_per_s"].items():
+        metrics.append((f"throughput.batch_{batch_size}", value, True))
+    if result.get("fused_latency"):
+        metrics.append(("fused.p50_ms", result["fused_latency"]["fused"]["p50_ms"], False))
+    if result.get("context_latency"):
+        metrics.append(("context.p50_ms", result["context_latency"]["context"]["p50_ms"], False))
+    return metrics
+
+
+def compare(args):
+    history = load_history(args.history)
+    if len(history) < 2:
+        print("Need at least two runs in the history to compare")
+        sys.exit(2)
+
+    baseline, candidate = history[args.baseline], history[args.candidate]
+    if baseline["corpus_version"] != candidate["corpus_version"]:
+        print(f"WARNING: comparing corpus v{baseline['corpus_version']} with v{candidate['corpus_version']}")
+
+    regressions = []
+    print(f"baseline {baseline['version']} ({time.ctime(baseline['timestamp'])}) -> "
+          f"candidate {candidate['version']} ({time.ctime(candidate['timestamp'])})")
+    for key in sorted(set(baseline["results"]) & set(candidate["results"])):
+        before = {name: value for name, value, _ in flatten_metrics(baseline["results"][key])}
+        for name, value, higher_is_better in flatten_metrics(candidate["results"][key]):
+            if not before.get(name):
+                continue
+            change = (value - before[name]) / before[name]
+            worse = -change if higher_is_better else change
+            flag = "REGRESSION" if worse > args.threshold else ""
+            if flag:
+                regressions.append((key, name, change))
+            print(f"{key:<22} {name:<28} {before[name]:>10.2f} {value:>10.2f} {change:>+8.1%} {flag}")
+
+    if regressions:
+        print(f"{len(regressions)} metrics regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Benchmark and append the results to the history")
+    run_parser.add_argument("--backends", nargs="+", default=["cpu"], choices=["cpu", "cuda", "service"])
+    run_parser.add_argument("--threads", type=int, nargs="+", default=[0], help="Torch CPU threads; 0 is the default")
+    run_parser.add_argument("--service-url", help="Inference service URL for the service backend")
+    run_parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    run_parser.add_argument("--repeat", type=int, default=5, help="Passes over the corpus for latency")
+    run_parser.add_argument("--rounds", type=int, default=5, help="Calls per batch size for throughput")
+    run_parser.add_argument("--history", default=DEFAULT_HISTORY)
+    run_parser.add_argument("--no-save", action="store_true", help="Do not append to the history file")
+
+    worker_parser = commands.add_parser("worker", help=argparse.SUPPRESS)
+    worker_parser.add_argument("--backend", required=True)
+    worker_parser.add_argument("--service-url")
+    worker_parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    worker_parser.add_argument("--repeat", type=int, default=5)
+    worker_parser.add_argument("--rounds", type=int, default=5)
+
+    compare_parser = commands.add_parser("compare", help="Flag regressions between two runs in the history")
+    compare_parser.add_argument("--history", default=DEFAULT_HISTORY)
+    compare_parser.add_argument("--baseline", type=int, default=-2, help="History index of the baseline run")
+    compare_parser.add_argument("--candidate", type=int, default=-1, help="History index of the candidate run")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative slowdown")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        if "service" in args.backends and not args.service_url:
+            parser.error("--service-url is required for the service backend")
+        run(args)
+    elif args.command == "worker":
+        run_worker(args)
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Measure full-app rerun time against the cost of each fragment rerun.
+
+Before fragments, any sidebar interaction paid the full "app" time. With
+fragments it pays only its own region. Uses Streamlit's headless AppTest, so
+no browser is needed. Timings come from utils.render_timer.
+
+    python benchmarks/bench_reruns.py --runs 20 --output reruns.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    # render_timer only keeps timings in session state when asked to
+    os.environ["MINDMATE_RECORD_TIMINGS"] = "1"
+    app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=args.timeout)
+    app.run()  # first run loads models and data files
+
+    samples = {}
+    for _ in range(args.runs):
+        app.run()
+        for region, elapsed_ms in app.session_state["render_timings"].items():
+            samples.setdefault(region, []).append(elapsed_ms)
+
+    results = {region: {"median_ms": statistics.median(values), "max_ms": max(values)}
+               for region, values in samples.items()}
+
+    print(f"{'region':<24} {'median (ms)':>12} {'max (ms)':>10}")
+    for region, stats in sorted(results.items(), key=lambda item: -item[1]["median_ms"]):
+        print(f"{region:<24} {stats['median_ms']:>12.2f} {stats['max_ms']:>10.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"runs": args.runs, "regions": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
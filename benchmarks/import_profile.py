@@ -0,0 +1,127 @@
+"""Profile import time for each page's module set and track it across releases.
+
+Each profile is imported in a fresh interpreter with ``python -X importtime``.
+Results are appended to a JSON history keyed by app version, so releases can
+be compared. Profiles for non-chat pages must not import the ML stack, and
+``--check`` fails when they do.
+
+    python benchmarks/import_profile.py
+    python benchmarks/import_profile.py --check --history benchmarks/results/import_profile.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import Config
+
+PROFILES = {
+    # Modules behind the crisis resources and quotes pages
+    "crisis_and_quotes": ["quotes_manager", "crisis_resources", "utils"],
+    # Everything app.py imports at module level
+    "app_shell": ["config", "chatbot", "mood_detector", "quotes_manager", "crisis_resources", "utils"],
+    # Loaded when the mood history page is opened
+    "analytics": ["mood_analytics"],
+    # Loaded on the first message analysis
+    "ml_stack": ["torch", "transformers"],
+}
+
+# Packages that only the chat analysis path may import
+HEAVY_PACKAGES = {"torch", "transformers", "tensorflow", "pandas", "numpy"}
+HEAVY_ALLOWED = {"analytics": {"pandas", "numpy"}, "ml_stack": HEAVY_PACKAGES}
+
+DEFAULT_HISTORY = os.path.join(ROOT, "benchmarks", "results", "import_profile.json")
+
+
+def profile_imports(modules):
+    """Import modules in a fresh interpreter and return {package: cumulative_us} and the total"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {modules} failed:\n{result.stderr[-2000:]}")
+
+    packages = {}
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        cumulative_us = int(cumulative_us)
+        # One leading space, then two more per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            total_us += cumulative_us
+        top_level = name.strip().split(".")[0]
+        packages[top_level] = max(packages.get(top_level, 0), cumulative_us)
+    return packages, total_us
+
+
+def load_history(path):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES))
+    parser.add_argument("--history", default=DEFAULT_HISTORY)
+    parser.add_argument("--no-save", action="store_true", help="Do not append to the history file")
+    parser.add_argument("--check", action="store_true", help="Fail if a profile imports a heavy package it should not")
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    previous = {}
+    for run in history:
+        previous.update({name: data["total_ms"] for name, data in run["profiles"].items()})
+
+    run = {"version": Config.APP_VERSION, "timestamp": time.time(), "python": sys.version.split()[0], "profiles": {}}
+    violations = []
+
+    for name in args.profiles:
+        try:
+            packages, total_us = profile_imports(PROFILES[name])
+        except RuntimeError as e:
+            print(f"{name}: {e}")
+            continue
+
+        heavy = sorted(HEAVY_PACKAGES.intersection(packages) - HEAVY_ALLOWED.get(name, set()))
+        if heavy:
+            violations.append((name, heavy))
+
+        top = sorted(packages.items(), key=lambda item: -item[1])[:10]
+        run["profiles"][name] = {
+            "total_ms": total_us / 1000,
+            "top_packages_ms": {package: us / 1000 for package, us in top},
+            "heavy_imports": heavy,
+        }
+
+        delta = ""
+        if name in previous:
+            delta = f" ({total_us / 1000 - previous[name]:+.1f} ms vs last run)"
+        print(f"{name}: {total_us / 1000:.1f} ms{delta}")
+        for package, us in top[:5]:
+            print(f"    {package:<28} {us / 1000:>8.1f} ms")
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(args.history), exist_ok=True)
+        history.append(run)
+        with open(args.history, "w", encoding="utf-8") as f:
+            json.dump(history, f, indent=2)
+
+    for name, heavy in violations:
+        print(f"WARNING: profile '{name}' imports {', '.join(heavy)}")
+    if args.check and violations:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
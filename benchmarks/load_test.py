@@ -0,0 +1,212 @@
+"""Load-test the full chat submit path with many concurrent sessions.
+
+Each simulated session is a headless AppTest running app.py. AppTest keeps a
+process-wide runtime, so every session runs in its own process; they share
+the on-disk stores and caches as replicas would. Every session submits
+messages from a seeded synthetic corpus. The stages of each submit are timed
+by utils.stage_timer. The report gives throughput, per-stage latency
+percentiles and peak RSS (per session process and summed).
+
+    python benchmarks/load_test.py --sessions 8 --messages 20 --output load.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from queue import Empty
+from threading import BrokenBarrierError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STAGES = ["preprocess", "emotion", "crisis", "mood_history", "response", "chat_history", "render"]
+
+OPENERS = ["Today", "This morning", "Lately", "Since the weekend", "At work", "After talking to my family"]
+FEELINGS = {
+    "happy": ["I feel really good and grateful", "things went better than I hoped", "I finally finished my project"],
+    "sad": ["I feel down and lonely", "I miss my friends a lot", "nothing seems to cheer me up"],
+    "anxious": ["I am worried about my exams", "my heart races before meetings", "I can't stop overthinking"],
+    "angry": ["I am so frustrated with my manager", "people keep ignoring what I say", "I lost my temper again"],
+    "normal": ["it was an ordinary day", "I went for a walk and made dinner", "nothing much happened"],
+}
+DETAILS = [
+    "and I keep thinking about it.",
+    "and I'm not sure what to do next.",
+    "so I wanted to talk it through with someone.",
+    "and I wonder if that is normal. I tried writing it down in my journal, but it did not help much.",
+]
+CRISIS_MESSAGES = ["Some days I feel hopeless and want to end it all."]
+
+
+def make_corpus(size, seed, crisis_rate):
+    """Deterministic synthetic messages of mixed mood and length"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        if rng.random() < crisis_rate:
+            corpus.append(rng.choice(CRISIS_MESSAGES))
+            continue
+        feeling = rng.choice(list(FEELINGS))
+        sentences = [f"{rng.choice(OPENERS)} {rng.choice(FEELINGS[feeling])} {rng.choice(DETAILS)}"
+                     for _ in range(rng.choice([1, 1, 2, 4]))]
+        corpus.append(" ".join(sentences))
+    return corpus
+
+
+def percentiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def at(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {"count": len(ordered), "mean": sum(ordered) / len(ordered),
+            "p50": at(0.50), "p90": at(0.90), "p95": at(0.95), "p99": at(0.99), "max": ordered[-1]}
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_session(index, messages, timeout, start_barrier, results):
+    samples, errors = {}, []
+    startup_error = None
+    try:
+        from streamlit.testing.v1 import AppTest
+
+        app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=timeout)
+        app.run()
+    except Exception as e:
+        startup_error = f"Startup failed: {e}"
+    # Wait even after a failed startup, so the other sessions are not held up
+    try:
+        start_barrier.wait(timeout)
+    except BrokenBarrierError:
+        startup_error = startup_error or "Start barrier broken: another session did not start in time"
+    if startup_error:
+        results.put({"samples": {}, "errors": [{"session": index, "error": startup_error}],
+                     "peak_rss_mb": peak_rss_mb()})
+        return
+
+    for text in messages:
+        app.session_state["stage_timings"] = {}
+        app.text_area(key="user_input").input(text)
+        next(button for button in app.button if button.label.startswith("Send")).click()
+
+        start = time.perf_counter()
+        app.run()
+        total_ms = (time.perf_counter() - start) * 1000
+
+        failed = list(app.exception) or [element.value for element in app.error]
+        if failed:
+            errors.append({"session": index, "message": text, "error": str(failed[0])})
+        else:
+            samples.setdefault("submit_total", []).append(total_ms)
+            for stage, elapsed_ms in app.session_state["stage_timings"].items():
+                samples.setdefault(stage, []).append(elapsed_ms)
+
+        # A crisis message replaces the chat form with the crisis popup until acknowledged
+        if app.session_state["crisis_detected"]:
+            app.session_state["crisis_detected"] = False
+
+    results.put({"samples": samples, "errors": errors, "peak_rss_mb": peak_rss_mb()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent sessions")
+    parser.add_argument("--messages", type=int, default=10, help="Messages per session")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--crisis-rate", type=float, default=0.02)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--storage-dir", help="Storage directory (default: a fresh temporary one)")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    # Keep load-test users out of the real stores; must happen before config is imported
+    os.environ["MINDMATE_STORAGE_DIR"] = args.storage_dir or tempfile.mkdtemp(prefix="mindmate-load-")
+    # Sessions read their stage timings from session state
+    os.environ["MINDMATE_RECORD_TIMINGS"] = "1"
+    os.chdir(ROOT)
+    from config import Config
+
+    corpus = make_corpus(args.sessions * args.messages, args.seed, args.crisis_rate)
+    start_barrier = multiprocessing.Barrier(args.sessions + 1)
+    queue = multiprocessing.Queue()
+
+    sessions = [
+        multiprocessing.Process(
+            target=run_session,
+            args=(i, corpus[i * args.messages:(i + 1) * args.messages], args.timeout, start_barrier, queue),
+            name=f"load-session-{i}", daemon=True
+        )
+        for i in range(args.sessions)
+    ]
+    for session in sessions:
+        session.start()
+
+    # Sessions load the app first; the clock starts once all of them are ready to submit
+    try:
+        start_barrier.wait(args.timeout)
+    except BrokenBarrierError:
+        print(f"Not all sessions started within {args.timeout:g} s; they report as errors", file=sys.stderr)
+    start = time.perf_counter()
+    reports = []
+    for session in sessions:
+        try:
+            reports.append(queue.get(timeout=args.timeout * args.messages))
+        except Empty:
+            break
+    elapsed = time.perf_counter() - start
+    for session in sessions:
+        session.join(timeout=5)
+
+    samples, errors = {}, []
+    for report in reports:
+        errors.extend(report["errors"])
+        for stage, values in report["samples"].items():
+            samples.setdefault(stage, []).extend(values)
+    if len(reports) < args.sessions:
+        errors.append({"error": f"{args.sessions - len(reports)} session processes did not report"})
+
+    processed = len(samples.get("submit_total", []))
+    results = {
+        "version": Config.APP_VERSION,
+        "timestamp": time.time(),
+        "python": sys.version.split()[0],
+        "config": {"sessions": args.sessions, "messages": args.messages, "seed": args.seed,
+                   "crisis_rate": args.crisis_rate},
+        "elapsed_s": elapsed,
+        "messages_processed": processed,
+        "errors": len(errors),
+        "throughput_msgs_per_s": processed / elapsed if elapsed else 0.0,
+        "peak_rss_mb_per_session": max((report["peak_rss_mb"] for report in reports), default=0.0),
+        "peak_rss_mb_total": sum(report["peak_rss_mb"] for report in reports),
+        "latency_ms": {stage: percentiles(samples.get(stage, [])) for stage in ["submit_total"] + STAGES},
+        "error_samples": errors[:10],
+    }
+
+    print(f"{processed} messages from {args.sessions} sessions in {elapsed:.2f} s "
+          f"({results['throughput_msgs_per_s']:.1f} msg/s), {len(errors)} errors, "
+          f"peak RSS {results['peak_rss_mb_per_session']:.0f} MB per session, "
+          f"{results['peak_rss_mb_total']:.0f} MB total")
+    print(f"{'stage':<14} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10}")
+    for stage, stats in results["latency_ms"].items():
+        if stats:
+            print(f"{stage:<14} {stats['p50']:>10.2f} {stats['p95']:>10.2f} {stats['p99']:>10.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
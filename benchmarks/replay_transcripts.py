@@ -0,0 +1,273 @@
+"""Replay conversation transcripts through the analysis and response path.
+
+Every user message goes through prepare_text, MoodDetector emotion (with
+context when MINDMATE_EMOTION_CONTEXT_TURNS is set) and crisis checks, the
+mood history and trend engine, and the chatbot's response selection. The random seed is fixed per transcript, so responses are
+reproducible. The tool records labels, crisis flags, trends, the chosen
+responses and per-stage latency. It then diffs them against a stored baseline.
+Transcripts run in parallel worker processes.
+
+Transcripts are JSON or JSONL files of
+{"id": ..., "personality": "Friendly", "messages": ["...", ...]}, chat
+histories read from a conversation store, or synthetic ones.
+
+    python benchmarks/replay_transcripts.py --synthetic 200 --save-baseline benchmarks/results/replay_baseline.json
+    python benchmarks/replay_transcripts.py --synthetic 200 --baseline benchmarks/results/replay_baseline.json
+    python benchmarks/replay_transcripts.py --transcripts chats.jsonl --workers 8 --output replay.json
+    python benchmarks/replay_transcripts.py --from-store storage/conversations.db --users session:abc --baseline base.json
+
+User messages are stored only as hashes, so results from real chats can be kept.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STAGES = ["preprocess", "emotion", "crisis", "mood_history", "response"]
+# Fixed clock for synthetic transcripts, so trend results do not depend on when the replay runs
+SYNTHETIC_START = 1767225600  # 2026-01-01T00:00:00Z
+SYNTHETIC_GAP = 600
+
+_detector = None
+
+
+def _init_worker():
+    global _detector
+    from mood_detector import MoodDetector
+    _detector = MoodDetector()
+    _detector.ensure_models()
+
+
+def replay_transcript(transcript, seed):
+    """Replay one transcript; runs in a worker process"""
+    from chatbot import MindMateChatbot
+    from mood_history import MoodHistory
+    from mood_detector import EmotionContext
+    from mood_trend import MoodTrendEngine
+    from preprocessing import prepare_text
+
+    random.seed(f"{seed}:{transcript['id']}")
+    chatbot = MindMateChatbot()
+    chatbot.set_personality(transcript.get("personality", "Friendly"))
+    history = MoodHistory()
+    trend = MoodTrendEngine()
+    context = EmotionContext()
+
+    turns = []
+    for i, message in enumerate(transcript["messages"]):
+        timestamps = transcript.get("timestamps")
+        timestamp = timestamps[i] if timestamps else SYNTHETIC_START + i * SYNTHETIC_GAP
+        latency = {}
+
+        start = time.perf_counter()
+        prepared = prepare_text(message)
+        clean_input = prepared.text
+        latency["preprocess"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        analysis = _detector.analyze(prepared, context)
+        mood_result, sentiment = analysis["mood"], analysis["sentiment"]
+        latency["emotion"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        is_crisis = _detector.detect_crisis_indicators(prepared)
+        latency["crisis"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        history.append(mood_result["emotion"], mood_result["confidence"], timestamp)
+        trend.update(mood_result["emotion"], mood_result["confidence"], timestamp)
+        latency["mood_history"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if is_crisis:
+            response = chatbot.get_crisis_response()
+        else:
+            response = chatbot.get_personality_response(mood_result["emotion"], clean_input, sentiment)
+        latency["response"] = time.perf_counter() - start
+
+        turns.append({
+            "message_hash": hashlib.sha1(message.encode("utf-8")).hexdigest()[:12],
+            "emotion": mood_result["emotion"],
+            "confidence": round(float(mood_result["confidence"]), 4),
+            "crisis": is_crisis,
+            "trend": trend.current().trend,
+            "response": response,
+            "latency_ms": {stage: seconds * 1000 for stage, seconds in latency.items()},
+        })
+    return transcript["id"], turns
+
+
+def load_transcript_files(paths):
+    transcripts = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            if path.endswith(".jsonl"):
+                transcripts.extend(json.loads(line) for line in f if line.strip())
+            else:
+                data = json.load(f)
+                transcripts.extend(data if isinstance(data, list) else [data])
+    return transcripts
+
+
+def load_store_transcripts(db_path, user_keys):
+    from storage import ConversationStore
+
+    store = ConversationStore(db_path)
+    transcripts = []
+    for user_key in user_keys:
+        entries = sorted((entry for entry in store.iter_chat(user_key) if entry["user_message"]),
+                         key=lambda entry: entry["timestamp"])
+        if entries:
+            transcripts.append({
+                "id": user_key,
+                "personality": entries[-1]["personality"] or "Friendly",
+                "messages": [entry["user_message"] for entry in entries],
+                "timestamps": [entry["timestamp"].timestamp() for entry in entries],
+            })
+    store.close()
+    return transcripts
+
+
+def synthetic_transcripts(count, length, seed):
+    from benchmarks.load_test import make_corpus
+    from config import Config
+
+    personalities = sorted(Config.PERSONALITIES)
+    corpus = make_corpus(count * length, seed, crisis_rate=0.02)
+    return [{
+        "id": f"synthetic-{i:05d}",
+        "personality": personalities[i % len(personalities)],
+        "messages": corpus[i * length:(i + 1) * length],
+    } for i in range(count)]
+
+
+def summarize_latency(results):
+    summary = {}
+    for stage in STAGES:
+        values = sorted(turn["latency_ms"][stage] for turns in results.values() for turn in turns)
+        if values:
+            summary[stage] = {"p50_ms": values[len(values) // 2],
+                              "p95_ms": values[min(len(values) - 1, int(0.95 * len(values)))]}
+    return summary
+
+
+def diff_against_baseline(run, baseline, confidence_tolerance, latency_threshold, latency_floor_ms):
+    """Return (output differences, latency regressions)"""
+    differences = []
+    for transcript_id, turns in run["transcripts"].items():
+        expected = baseline["transcripts"].get(transcript_id)
+        if expected is None:
+            differences.append(f"{transcript_id}: not in the baseline")
+            continue
+        if len(expected) != len(turns):
+            differences.append(f"{transcript_id}: {len(turns)} turns, baseline has {len(expected)}")
+            continue
+        for i, (turn, old) in enumerate(zip(turns, expected)):
+            if turn["message_hash"] != old["message_hash"]:
+                differences.append(f"{transcript_id}[{i}]: message differs from the baseline transcript")
+                break
+            for field in ("emotion", "crisis", "trend", "response"):
+                if turn[field] != old[field]:
+                    differences.append(f"{transcript_id}[{i}] {field}: {str(old[field])[:60]!r} -> {str(turn[field])[:60]!r}")
+            if abs(turn["confidence"] - old["confidence"]) > confidence_tolerance:
+                differences.append(f"{transcript_id}[{i}] confidence: {old['confidence']} -> {turn['confidence']}")
+    for transcript_id in set(baseline["transcripts"]) - set(run["transcripts"]):
+        differences.append(f"{transcript_id}: missing from this run")
+
+    regressions = []
+    for stage, stats in run["latency"].items():
+        old = baseline.get("latency", {}).get(stage)
+        if old and old["p50_ms"] > 0:
+            change = (stats["p50_ms"] - old["p50_ms"]) / old["p50_ms"]
+            # Sub-floor differences are timer noise, whatever their relative size
+            if change > latency_threshold and stats["p50_ms"] - old["p50_ms"] > latency_floor_ms:
+                regressions.append(f"{stage}: p50 {old['p50_ms']:.3f} -> {stats['p50_ms']:.3f} ms ({change:+.0%})")
+    return differences, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transcripts", nargs="*", default=[], help="JSON or JSONL transcript files")
+    parser.add_argument("--from-store", help="Conversation store database to read chat histories from")
+    parser.add_argument("--users", nargs="*", default=[], help="User keys to read from --from-store")
+    parser.add_argument("--synthetic", type=int, default=0, help="Number of synthetic transcripts to add")
+    parser.add_argument("--synthetic-length", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", help="Write this run as JSON")
+    parser.add_argument("--baseline", help="Diff against this stored run")
+    parser.add_argument("--save-baseline", help="Write this run as the new baseline")
+    parser.add_argument("--confidence-tolerance", type=float, default=0.001)
+    parser.add_argument("--latency-threshold", type=float, default=0.25, help="Allowed relative p50 slowdown")
+    parser.add_argument("--latency-floor-ms", type=float, default=0.05, help="Ignore p50 slowdowns smaller than this")
+    parser.add_argument("--cache", action="store_true", help="Keep the result cache on (off by default)")
+    args = parser.parse_args()
+
+    # Every message should reach the model
+    if not args.cache:
+        os.environ["MINDMATE_RESULT_CACHE"] = "none"
+    os.chdir(ROOT)
+    from config import Config
+
+    transcripts = load_transcript_files(args.transcripts)
+    if args.from_store:
+        transcripts += load_store_transcripts(args.from_store, args.users)
+    if args.synthetic:
+        transcripts += synthetic_transcripts(args.synthetic, args.synthetic_length, args.seed)
+    if not transcripts:
+        parser.error("No transcripts: use --transcripts, --from-store or --synthetic")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as executor:
+        results = dict(executor.map(replay_transcript, transcripts, [args.seed] * len(transcripts)))
+    elapsed = time.perf_counter() - start
+
+    run = {
+        "version": Config.APP_VERSION,
+        "timestamp": time.time(),
+        "seed": args.seed,
+        "emotion_model": Config.EMOTION_MODEL,
+        "elapsed_s": elapsed,
+        "latency": summarize_latency(results),
+        "transcripts": results,
+    }
+    turns = sum(len(turns) for turns in results.values())
+    print(f"Replayed {len(results)} transcripts ({turns} messages) in {elapsed:.1f} s with {args.workers} workers")
+    for stage, stats in run["latency"].items():
+        print(f"    {stage:<14} p50 {stats['p50_ms']:>8.3f} ms   p95 {stats['p95_ms']:>8.3f} ms")
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("seed") != args.seed:
+            print(f"WARNING: baseline used seed {baseline.get('seed')}, this run used {args.seed}")
+        differences, regressions = diff_against_baseline(
+            run, baseline, args.confidence_tolerance, args.latency_threshold, args.latency_floor_ms
+        )
+        for line in differences[:50]:
+            print(f"DIFF {line}")
+        if len(differences) > 50:
+            print(f"... and {len(differences) - 50} more differences")
+        for line in regressions:
+            print(f"SLOWER {line}")
+        print(f"{len(differences)} output differences, {len(regressions)} latency regressions")
+        if differences or regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
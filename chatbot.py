@@ -1,13 +1,14 @@
 import streamlit as st
-from transformers import pipeline
 import random
+import uuid
 from config import Config
 import logging
 from datetime import datetime
 
 class MindMateChatbot:
-    def __init__(self):
-        self.conversation_history = []
+    def __init__(self, conversation_history=None):
+        # Callers pass the session's chat history so it outlives this object
+        self.conversation_history = conversation_history if conversation_history is not None else []
         self.current_personality = "Friendly"
         self.setup_conversation_model()
     
@@ -125,8 +126,15 @@ class MindMateChatbot:
             }
         }
     
-    def get_personality_response(self, emotion, text=""):
-        """Generate a response based on current personality and detected emotion"""
+    def get_personality_response(self, emotion, text="", sentiment=None):
+        """Generate a response based on current personality and detected emotion
+        
+        A clear sentiment picks the reply when the emotion reads as normal, so a
+        flatly worded but negative message still gets a supportive answer.
+        """
+        if emotion == "normal" and sentiment and sentiment.get("score", 0.0) >= Config.SENTIMENT_RESPONSE_THRESHOLD:
+            emotion = Config.SENTIMENT_MOODS.get(str(sentiment.get("label", "")).lower(), emotion)
+        
         personality_responses = self.response_templates.get(self.current_personality, {})
         emotion_responses = personality_responses.get(emotion, personality_responses.get("normal", []))
         
@@ -180,13 +188,16 @@ class MindMateChatbot:
         if timestamp is None:
             timestamp = datetime.now()
         
-        self.conversation_history.append({
+        entry = {
+            "id": uuid.uuid4().hex,
             "timestamp": timestamp,
             "user_message": user_message,
             "bot_response": bot_response,
             "detected_emotion": emotion,
             "personality": self.current_personality
-        })
+        }
+        self.conversation_history.append(entry)
+        return entry
     
     def set_personality(self, personality):
         """Change chatbot personality"""
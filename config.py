@@ -15,6 +15,69 @@ class Config:
     # Model configurations
     SENTIMENT_MODEL = "cardiffnlp/twitter-roberta-base-sentiment-latest"
     EMOTION_MODEL = "j-hartmann/emotion-english-distilroberta-base"
+    # Sentiment score above which a message whose emotion reads as normal gets the
+    # reply for the mood its sentiment points to
+    SENTIMENT_RESPONSE_THRESHOLD = 0.75
+    SENTIMENT_MOODS = {"negative": "sad", "positive": "happy"}
+    
+    # Device for the models: "auto" (GPU when available), "cpu" or "cuda"
+    INFERENCE_DEVICE = os.getenv("MINDMATE_INFERENCE_DEVICE", "auto")
+    # CPU threads for model inference; 0 keeps torch's default
+    INFERENCE_THREADS = int(os.getenv("MINDMATE_INFERENCE_THREADS", "0"))
+    # Seconds to wait before trying again after the models fail to load
+    MODEL_RETRY_AFTER = float(os.getenv("MINDMATE_MODEL_RETRY_AFTER", "60"))
+    # Batch size used when several texts are scored in one model call
+    INFERENCE_BATCH_SIZE = int(os.getenv("MINDMATE_INFERENCE_BATCH_SIZE", "16"))
+    # Previous user turns read with each message when scoring emotion; 0 scores messages alone
+    EMOTION_CONTEXT_TURNS = int(os.getenv("MINDMATE_EMOTION_CONTEXT_TURNS", "0"))
+    # Most context tokens kept per session, newest first
+    EMOTION_CONTEXT_MAX_TOKENS = int(os.getenv("MINDMATE_EMOTION_CONTEXT_MAX_TOKENS", "128"))
+    
+    # Optional standalone inference service (see inference_service.py). When the URL is
+    # set the app sends analysis there and falls back to local models if it is unreachable.
+    # Use http://host:port or unix:///path/to/socket
+    INFERENCE_SERVICE_URL = os.getenv("MINDMATE_INFERENCE_URL", "")
+    INFERENCE_TIMEOUT = float(os.getenv("MINDMATE_INFERENCE_TIMEOUT", "5.0"))
+    INFERENCE_POOL_SIZE = int(os.getenv("MINDMATE_INFERENCE_POOL_SIZE", "8"))
+    # Seconds to stay on the local fallback after the service fails
+    INFERENCE_RETRY_AFTER = float(os.getenv("MINDMATE_INFERENCE_RETRY_AFTER", "30"))
+    # Service-side limit per batch; kept under the client timeout so the client sees the 503
+    INFERENCE_REQUEST_TIMEOUT = float(os.getenv("MINDMATE_INFERENCE_REQUEST_TIMEOUT", "4.0"))
+    INFERENCE_WORKERS = int(os.getenv("MINDMATE_INFERENCE_WORKERS", "2"))
+    INFERENCE_MAX_BATCH = 64
+    
+    # Latency metrics: stage and render histograms in the Prometheus text format,
+    # served on METRICS_PORT (0 = no endpoint) and/or written to METRICS_FILE
+    METRICS_ENABLED = os.getenv("MINDMATE_METRICS", "0") == "1"
+    METRICS_HOST = os.getenv("MINDMATE_METRICS_HOST", "127.0.0.1")
+    METRICS_PORT = int(os.getenv("MINDMATE_METRICS_PORT", "9464"))
+    METRICS_FILE = os.getenv("MINDMATE_METRICS_FILE", "")
+    METRICS_EXPORT_INTERVAL = 15
+    # Keep the latest render and stage timings in session state on every rerun, for
+    # the benchmarks; profiled requests keep their stage timings regardless
+    RECORD_TIMINGS = os.getenv("MINDMATE_RECORD_TIMINGS", "0") == "1"
+    
+    # Request profiling: the share of chat submissions profiled (0 = off). Admins can
+    # also profile their own session from the sidebar.
+    PROFILE_SAMPLE_RATE = float(os.getenv("MINDMATE_PROFILE_RATE", "0"))
+    # "collapsed" (low-overhead stack sampling) or "pstats" (cProfile, exact call counts)
+    PROFILE_FORMAT = os.getenv("MINDMATE_PROFILE_FORMAT", "collapsed")
+    PROFILE_SAMPLE_INTERVAL = 0.001
+    PROFILE_MAX_FILES = int(os.getenv("MINDMATE_PROFILE_MAX_FILES", "200"))
+    # Signed-in users (by email) who see the diagnostics panel
+    ADMIN_EMAILS = [email.strip() for email in os.getenv("MINDMATE_ADMIN_EMAILS", "").split(",") if email.strip()]
+    
+    # Logging: records are queued and written by a background thread
+    LOG_LEVEL = os.getenv("MINDMATE_LOG_LEVEL", "INFO")
+    # "json" (one object per line) or "text"
+    LOG_FORMAT = os.getenv("MINDMATE_LOG_FORMAT", "json")
+    # Records beyond this many waiting are dropped instead of blocking the request
+    LOG_QUEUE_SIZE = 10000
+    # At most LOG_RATE_LIMIT warnings/errors per call site every LOG_RATE_WINDOW seconds
+    LOG_RATE_LIMIT = int(os.getenv("MINDMATE_LOG_RATE_LIMIT", "10"))
+    LOG_RATE_WINDOW = 60
+    # Share of records kept per logger (or module), e.g. "streamlit=0.1,mood_detector=0.5"
+    LOG_SAMPLING = os.getenv("MINDMATE_LOG_SAMPLING", "")
     
     # UI Configuration
     MOOD_EMOJIS = {
@@ -29,6 +92,24 @@ class Config:
         "excited": "🤩"
     }
     
+    # Emotions counted as negative when analysing mood trends
+    NEGATIVE_EMOTIONS = ["sad", "angry", "upset", "anxious"]
+    
+    # Mood history kept per session and the number of recent moods used for trends
+    MOOD_HISTORY_CAPACITY = 50
+    MOOD_TREND_WINDOW = 10
+    
+    # Online trend engine: half-lives (seconds) of the short and long moving averages,
+    # the most weight either average keeps per observation, and change-point settings
+    MOOD_TREND_SHORT_HALF_LIFE = 86400
+    MOOD_TREND_LONG_HALF_LIFE = 14 * 86400
+    MOOD_TREND_SHORT_MAX_KEEP = 0.7
+    MOOD_TREND_LONG_MAX_KEEP = 0.97
+    MOOD_TREND_MARGIN = 0.15
+    MOOD_TREND_CHANGE_DELTA = 0.05
+    MOOD_TREND_CHANGE_THRESHOLD = 1.5
+    MOOD_TREND_MIN_OBSERVATIONS = 3
+    
     PERSONALITIES = {
         "Friendly": {
             "tone": "warm and approachable",
@@ -52,6 +133,74 @@ class Config:
         }
     }
     
+    # Seconds between modification checks on data files (quotes, crisis contacts)
+    DATA_RELOAD_INTERVAL = float(os.getenv("MINDMATE_DATA_RELOAD_INTERVAL", "2.0"))
+    
+    # Number of quotes rendered per page on the quotes browser
+    QUOTES_PAGE_SIZE = 10
+    
+    # Locale used when the browser does not report one, as language-REGION
+    DEFAULT_LOCALE = os.getenv("MINDMATE_DEFAULT_LOCALE", "en-US")
+    
+    # Resource categories that feed the quick contacts list
+    CRISIS_QUICK_CATEGORIES = ["emergency", "suicide_prevention"]
+    
+    # Local directory for runtime data written by the app
+    STORAGE_DIR = os.getenv("MINDMATE_STORAGE_DIR", "storage")
+    
+    # Key that signs the session id kept in the page URL; when unset, one is
+    # generated once and kept in STORAGE_DIR/session_secret
+    SESSION_SECRET = os.getenv("MINDMATE_SESSION_SECRET", "")
+    
+    # Crisis event audit log (SQLite in WAL mode, written in batches off the request thread)
+    CRISIS_EVENTS_DB = os.path.join(STORAGE_DIR, "crisis_events.db")
+    CRISIS_EVENTS_QUEUE_SIZE = int(os.getenv("MINDMATE_CRISIS_EVENTS_QUEUE_SIZE", "10000"))
+    CRISIS_EVENTS_BATCH_SIZE = int(os.getenv("MINDMATE_CRISIS_EVENTS_BATCH_SIZE", "100"))
+    CRISIS_EVENTS_FLUSH_INTERVAL = float(os.getenv("MINDMATE_CRISIS_EVENTS_FLUSH_INTERVAL", "1.0"))
+    # SQLite synchronous mode: OFF, NORMAL (fsync at checkpoints) or FULL (fsync every batch)
+    CRISIS_EVENTS_SYNCHRONOUS = os.getenv("MINDMATE_CRISIS_EVENTS_SYNCHRONOUS", "NORMAL")
+    # What to do when the queue is full: drop_newest, drop_oldest or block
+    CRISIS_EVENTS_BACKPRESSURE = os.getenv("MINDMATE_CRISIS_EVENTS_BACKPRESSURE", "drop_newest")
+    CRISIS_EVENTS_BLOCK_TIMEOUT = float(os.getenv("MINDMATE_CRISIS_EVENTS_BLOCK_TIMEOUT", "0.05"))
+    
+    # Persistent mood, chat and favorites store (SQLite, indexed on user and time)
+    CONVERSATION_DB = os.path.join(STORAGE_DIR, "conversations.db")
+    STORAGE_BATCH_SIZE = int(os.getenv("MINDMATE_STORAGE_BATCH_SIZE", "50"))
+    STORAGE_FLUSH_INTERVAL = float(os.getenv("MINDMATE_STORAGE_FLUSH_INTERVAL", "0.5"))
+    STORAGE_PAGE_SIZE = 50
+    # Chat entries loaded into a restored session; older ones are read on demand
+    CHAT_HISTORY_PRELOAD = 50
+    # Rows per chunk when exporting or importing a history; bounds memory use
+    EXPORT_CHUNK_SIZE = int(os.getenv("MINDMATE_EXPORT_CHUNK_SIZE", "5000"))
+    
+    # Request profiles, oldest deleted beyond PROFILE_MAX_FILES
+    PROFILE_DIR = os.getenv("MINDMATE_PROFILE_DIR", os.path.join(STORAGE_DIR, "profiles"))
+    
+    # Result cache shared by app replicas: "memory" (per process), "sqlite" (a file on a
+    # shared volume), "redis" (any server speaking the Redis protocol) or "none"
+    RESULT_CACHE_BACKEND = os.getenv("MINDMATE_RESULT_CACHE", "memory")
+    RESULT_CACHE_DB = os.getenv("MINDMATE_RESULT_CACHE_DB", os.path.join(STORAGE_DIR, "result_cache.db"))
+    RESULT_CACHE_URL = os.getenv("MINDMATE_RESULT_CACHE_URL", "redis://localhost:6379/0")
+    RESULT_CACHE_TTL = 7 * 24 * 3600
+    RESULT_CACHE_MAX_ENTRIES = 10000
+    RESULT_CACHE_TIMEOUT = 0.5
+    RESULT_CACHE_RETRY_AFTER = 30
+    # Daily quote picks are keyed by date; the TTL only bounds how long past days linger
+    DAILY_QUOTE_TTL = 2 * 24 * 3600
+    
+    # Chat messages rendered at once; older ones sit behind "load earlier"
+    CHAT_WINDOW_SIZE = 20
+    # Rendered chat bubbles kept in the process-wide HTML cache
+    CHAT_BUBBLE_CACHE_SIZE = 4096
+    
+    # Estimated bytes of chat history a session may hold before old turns are dropped
+    # from memory (they stay in the conversation store and load on demand)
+    SESSION_MEMORY_BUDGET = int(os.getenv("MINDMATE_SESSION_MEMORY_BUDGET", str(256 * 1024)))
+    # Newest chat entries kept as plain dicts; older ones are compacted
+    SESSION_HOT_TURNS = 20
+    # Log a warning when chat history across all sessions passes this many bytes
+    SERVER_MEMORY_WARNING = int(os.getenv("MINDMATE_SERVER_MEMORY_WARNING", str(512 * 1024 * 1024)))
+    
     # Crisis keywords that trigger emergency resources
     CRISIS_KEYWORDS = [
         "suicide", "kill myself", "end it all", "hurt myself", "self harm",
@@ -0,0 +1,211 @@
+"""Export and import a user's chat, mood and favorites history.
+
+Records stream through in chunks of Config.EXPORT_CHUNK_SIZE rows, so memory
+stays flat however long the history is. JSONL exports are one object per line
+with a "type" of chat, mood or favorite, optionally gzipped. Parquet exports
+are a directory with chat.parquet, mood.parquet and favorite.parquet, one row
+group per chunk; they need pyarrow. Imports are batched, one transaction per
+chunk, and skip records that are already stored, so the same file can be
+imported twice.
+
+    python conversation_export.py export --user session:abc --output history.jsonl.gz
+    python conversation_export.py export --user session:abc --format parquet --output history/
+    python conversation_export.py import --user session:abc --input history/
+"""
+import argparse
+import gzip
+import json
+import os
+
+from config import Config
+from data_catalog import SchemaError
+from preprocessing import sanitize
+from storage import EXPORT_COLUMNS, ConversationStore
+
+EXPORT_KINDS = tuple(EXPORT_COLUMNS)
+# Fields an imported record must have; the other columns may be null
+REQUIRED_FIELDS = {
+    "chat": ("message_id", "ts"),
+    "mood": ("ts", "emotion", "confidence"),
+    "favorite": ("quote_id", "ts", "text", "author"),
+}
+# Free-text fields that the app renders as HTML, sanitized on import like typed messages
+SANITIZED_FIELDS = {"chat": ("user_message", "bot_response"), "favorite": ("text", "author")}
+
+
+def _pyarrow():
+    """Import pyarrow, which only the Parquet format needs"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("The Parquet format needs pyarrow: pip install pyarrow") from None
+    return pyarrow, pyarrow.parquet
+
+
+def _parquet_schema(pa, kind):
+    return pa.schema([(column, pa.float64() if column in ("ts", "confidence") else pa.string())
+                      for column in EXPORT_COLUMNS[kind]])
+
+
+def detect_format(path):
+    """parquet for directories and .parquet paths, jsonl otherwise"""
+    return "parquet" if os.path.isdir(path) or path.endswith((".parquet", "/")) else "jsonl"
+
+
+def _open_text(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def export_history(store, user_key, path, fmt=None, kinds=EXPORT_KINDS, chunk_size=None):
+    """Write a user's history to path; returns the number of records per kind"""
+    fmt = fmt or detect_format(path)
+    counts = dict.fromkeys(kinds, 0)
+
+    if fmt == "jsonl":
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with _open_text(path, "w") as f:
+            for kind in kinds:
+                columns = EXPORT_COLUMNS[kind]
+                for rows in store.iter_export_chunks(kind, user_key, chunk_size):
+                    f.write("".join(
+                        json.dumps({"type": kind, **dict(zip(columns, row))}, ensure_ascii=False) + "\n"
+                        for row in rows
+                    ))
+                    counts[kind] += len(rows)
+    elif fmt == "parquet":
+        pa, pq = _pyarrow()
+        os.makedirs(path, exist_ok=True)
+        for kind in kinds:
+            schema = _parquet_schema(pa, kind)
+            with pq.ParquetWriter(os.path.join(path, f"{kind}.parquet"), schema, compression="zstd") as writer:
+                for rows in store.iter_export_chunks(kind, user_key, chunk_size):
+                    writer.write_batch(pa.record_batch([list(column) for column in zip(*rows)], schema=schema))
+                    counts[kind] += len(rows)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return counts
+
+
+def _sanitizer(kind):
+    """Turn a row in EXPORT_COLUMNS order into one with its free-text fields sanitized"""
+    positions = [EXPORT_COLUMNS[kind].index(field) for field in SANITIZED_FIELDS.get(kind, ())]
+
+    def clean(row):
+        if not positions:
+            return row
+        row = list(row)
+        for position in positions:
+            if isinstance(row[position], str):
+                row[position] = sanitize(row[position])
+        return tuple(row)
+    return clean
+
+
+def _row(kind, record, where):
+    """Validate an imported record and turn it into a row in EXPORT_COLUMNS order"""
+    if not isinstance(record, dict):
+        raise SchemaError(f"{where}: expected an object, got {type(record).__name__}")
+    for field in REQUIRED_FIELDS[kind]:
+        if record.get(field) is None:
+            raise SchemaError(f"{where}: missing '{field}'")
+    return tuple(record.get(column) for column in EXPORT_COLUMNS[kind])
+
+
+def iter_import_chunks(path, fmt=None, chunk_size=None):
+    """Yield (kind, rows) chunks read from an export, holding at most one chunk per kind
+
+    Message and quote text is sanitized as it is read, since an export file
+    is untrusted input.
+    """
+    fmt = fmt or detect_format(path)
+    chunk_size = chunk_size or Config.EXPORT_CHUNK_SIZE
+    sanitizers = {kind: _sanitizer(kind) for kind in EXPORT_KINDS}
+
+    if fmt == "jsonl":
+        pending = {kind: [] for kind in EXPORT_KINDS}
+        with _open_text(path, "r") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                where = f"{path}:{line_number}"
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise SchemaError(f"{where}: {str(e)}") from None
+                kind = record.get("type") if isinstance(record, dict) else None
+                if kind not in pending:
+                    raise SchemaError(f"{where}: unknown record type {kind!r}")
+                rows = pending[kind]
+                rows.append(sanitizers[kind](_row(kind, record, where)))
+                if len(rows) >= chunk_size:
+                    yield kind, rows
+                    pending[kind] = []
+        for kind, rows in pending.items():
+            if rows:
+                yield kind, rows
+    elif fmt == "parquet":
+        _, pq = _pyarrow()
+        for kind in EXPORT_KINDS:
+            file_path = os.path.join(path, f"{kind}.parquet")
+            if not os.path.exists(file_path):
+                continue
+            columns = EXPORT_COLUMNS[kind]
+            for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_size, columns=list(columns)):
+                data = batch.to_pydict()
+                for field in REQUIRED_FIELDS[kind]:
+                    if None in data[field]:
+                        raise SchemaError(f"{file_path}: missing '{field}'")
+                yield kind, [sanitizers[kind](row) for row in zip(*(data[column] for column in columns))]
+    else:
+        raise ValueError(f"Unknown import format: {fmt}")
+
+
+def import_history(store, user_key, path, fmt=None, chunk_size=None):
+    """Import an export into a user's history
+
+    Returns {kind: (records read, records inserted)}; the difference is the
+    records that were already stored.
+    """
+    counts = {kind: (0, 0) for kind in EXPORT_KINDS}
+    for kind, rows in iter_import_chunks(path, fmt, chunk_size):
+        read, inserted = counts[kind]
+        counts[kind] = (read + len(rows), inserted + store.import_rows(kind, user_key, rows))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("--user", required=True, help="User key, e.g. session:<id>")
+    parser.add_argument("--db", default=None, help="Conversation store (default: Config.CONVERSATION_DB)")
+    parser.add_argument("--output", help="Export destination")
+    parser.add_argument("--input", help="Export to import")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], help="Default: from the path")
+    parser.add_argument("--kinds", nargs="*", choices=EXPORT_KINDS, default=list(EXPORT_KINDS))
+    parser.add_argument("--chunk-size", type=int, default=None)
+    args = parser.parse_args()
+
+    store = ConversationStore(args.db)
+    try:
+        if args.command == "export":
+            if not args.output:
+                parser.error("export needs --output")
+            counts = export_history(store, args.user, args.output, args.format, args.kinds, args.chunk_size)
+            print(", ".join(f"{count} {kind}" for kind, count in counts.items()), f"records written to {args.output}")
+        else:
+            if not args.input:
+                parser.error("import needs --input")
+            counts = import_history(store, args.user, args.input, args.format, args.chunk_size)
+            for kind, (read, inserted) in counts.items():
+                print(f"{kind}: {read} read, {inserted} imported, {read - inserted} already stored")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
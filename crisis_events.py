@@ -0,0 +1,247 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+import atexit
+import logging
+
+from config import Config
+from storage import WEEK_OFFSET
+
+AGGREGATION_WINDOWS = {
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+    "week": 604800,
+}
+
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL")
+BACKPRESSURE_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+_FLUSH = object()
+_STOP = object()
+
+
+class CrisisEventSink:
+    """Queues crisis events and writes them to SQLite in batches on a background thread"""
+
+    def __init__(self, db_path=None, queue_size=None, batch_size=None, flush_interval=None,
+                 synchronous=None, backpressure=None, block_timeout=None):
+        self.db_path = db_path or Config.CRISIS_EVENTS_DB
+        self.batch_size = batch_size or Config.CRISIS_EVENTS_BATCH_SIZE
+        self.flush_interval = Config.CRISIS_EVENTS_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.synchronous = (synchronous or Config.CRISIS_EVENTS_SYNCHRONOUS).upper()
+        self.backpressure = backpressure or Config.CRISIS_EVENTS_BACKPRESSURE
+        self.block_timeout = Config.CRISIS_EVENTS_BLOCK_TIMEOUT if block_timeout is None else block_timeout
+
+        if self.synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(f"synchronous must be one of {SYNCHRONOUS_MODES}")
+        if self.backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"backpressure must be one of {BACKPRESSURE_POLICIES}")
+
+        self.queue = queue.Queue(maxsize=queue_size or Config.CRISIS_EVENTS_QUEUE_SIZE)
+        self.counters = {"accepted": 0, "written": 0, "dropped": 0, "batches": 0, "errors": 0}
+        self._counter_lock = threading.Lock()
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._create_schema()
+
+        self._thread = threading.Thread(target=self._run, name="crisis-event-writer", daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def _create_schema(self):
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS crisis_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ts REAL NOT NULL,
+                    session_id TEXT NOT NULL,
+                    region TEXT,
+                    event_type TEXT NOT NULL,
+                    resources_shown INTEGER NOT NULL DEFAULT 1
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_crisis_events_ts ON crisis_events (ts)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _count(self, name, amount=1):
+        with self._counter_lock:
+            self.counters[name] += amount
+
+    def record(self, session_id, event_type="crisis_detected", region=None, resources_shown=True, timestamp=None):
+        """Queue an event without waiting on disk; returns False if it was dropped"""
+        event = (
+            time.time() if timestamp is None else timestamp,
+            session_id,
+            region,
+            event_type,
+            1 if resources_shown else 0,
+        )
+
+        try:
+            if self.backpressure == "block":
+                self.queue.put(event, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(event)
+        except queue.Full:
+            if self.backpressure != "drop_oldest":
+                self._count("dropped")
+                return False
+            self._evict_oldest()
+            try:
+                self.queue.put_nowait(event)
+            except queue.Full:
+                self._count("dropped")
+                return False
+
+        self._count("accepted")
+        return True
+
+    def _evict_oldest(self):
+        """Drop the oldest queued event to make room; flush and stop requests are put back, not dropped"""
+        requests = []
+        try:
+            while True:
+                item = self.queue.get_nowait()
+                if item[0] is _FLUSH or item[0] is _STOP:
+                    requests.append(item)
+                    continue
+                self._count("dropped")
+                break
+        except queue.Empty:
+            pass
+        # Requeued behind newer events, so a flush or stop still covers everything queued before it
+        for item in requests:
+            try:
+                self.queue.put(item, timeout=self.block_timeout)
+            except queue.Full:
+                logging.warning("Crisis event queue full, a flush or stop request was lost")
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far has been written"""
+        done = threading.Event()
+        try:
+            self.queue.put((_FLUSH, done), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Write any queued events and stop the writer thread"""
+        if not self._thread.is_alive():
+            return
+        try:
+            self.queue.put((_STOP, None), timeout=timeout)
+        except queue.Full:
+            logging.warning("Crisis event queue full at shutdown, pending events may be lost")
+            return
+        self._thread.join(timeout)
+
+    def stats(self):
+        """Get event counters and the current queue depth"""
+        with self._counter_lock:
+            stats = dict(self.counters)
+        stats["queued"] = self.queue.qsize()
+        return stats
+
+    def _run(self):
+        conn = self._connect()
+        batch = []
+        deadline = None
+        try:
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is not None and item[0] is not _FLUSH and item[0] is not _STOP:
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+                    if len(batch) < self.batch_size:
+                        continue
+
+                self._write_batch(conn, batch)
+                batch = []
+                deadline = None
+
+                if item is not None and item[0] is _FLUSH:
+                    item[1].set()
+                elif item is not None and item[0] is _STOP:
+                    return
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn, batch):
+        if not batch:
+            return
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO crisis_events (ts, session_id, region, event_type, resources_shown) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    batch
+                )
+            self._count("written", len(batch))
+            self._count("batches")
+        except sqlite3.Error as e:
+            self._count("errors")
+            self._count("dropped", len(batch))
+            logging.error(f"Error writing crisis events: {str(e)}")
+
+    def aggregate(self, window="hour", since=None, until=None, event_type=None):
+        """Count events per time bucket
+
+        ``window`` is one of AGGREGATION_WINDOWS or a bucket size in seconds.
+        Weeks start on Monday, like the mood rollups in storage.
+        Returns a list of dicts with bucket_start (epoch seconds), events and sessions.
+        """
+        bucket = AGGREGATION_WINDOWS.get(window, window)
+        if not isinstance(bucket, (int, float)) or bucket <= 0:
+            raise ValueError(f"Unknown aggregation window: {window}")
+        offset = WEEK_OFFSET if window == "week" else 0
+
+        query = ("SELECT CAST((ts - ?) / ? AS INTEGER) * ? + ? AS bucket_start, COUNT(*), "
+                 "COUNT(DISTINCT session_id) FROM crisis_events WHERE ts >= ? AND ts < ?")
+        params = [offset, bucket, bucket, offset, since or 0, until or time.time() + 1]
+        if event_type:
+            query += " AND event_type = ?"
+            params.append(event_type)
+        query += " GROUP BY bucket_start ORDER BY bucket_start"
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+
+        return [{"bucket_start": row[0], "events": row[1], "sessions": row[2]} for row in rows]
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_crisis_event_sink():
+    """Get the process-wide crisis event sink, starting its writer on first use"""
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = CrisisEventSink()
+                atexit.register(_sink.close)
+    return _sink
@@ -1,19 +1,191 @@
 import streamlit as st
-import json
-from datetime import datetime
+import threading
+import logging
+from config import Config
+from crisis_events import get_crisis_event_sink
+from data_catalog import get_catalog, require_fields, SchemaError
+
+def validate_categories(categories, where):
+    """Validate a mapping of resource categories to titled contact lists"""
+    if not isinstance(categories, dict) or not categories:
+        raise SchemaError(f"{where}: expected a non-empty object of categories")
+    
+    for category_key, category_data in categories.items():
+        require_fields(category_data, ("title",), f"{where}.{category_key}")
+        contacts = category_data.get("contacts")
+        if not isinstance(contacts, list) or not contacts:
+            raise SchemaError(f"{where}.{category_key}: expected a non-empty 'contacts' list")
+        for i, contact in enumerate(contacts):
+            require_fields(contact, ("name", "number", "description"), f"{where}.{category_key}.contacts[{i}]")
+
+def prepare_crisis_contacts(data):
+    """Validate crisis contact data"""
+    if not isinstance(data, dict) or "emergency" not in data:
+        raise SchemaError("crisis_contacts: expected an object with an 'emergency' category")
+    
+    validate_categories(data, "crisis_contacts")
+    return data
+
+def prepare_crisis_locales(data):
+    """Validate regional crisis contact data"""
+    if not isinstance(data, dict) or not isinstance(data.get("regions"), dict):
+        raise SchemaError("crisis_locales: expected an object with a 'regions' mapping")
+    if data.get("default_region") not in data["regions"]:
+        raise SchemaError("crisis_locales: 'default_region' must be one of the listed regions")
+    
+    for region, region_data in data["regions"].items():
+        where = f"crisis_locales.regions.{region}"
+        require_fields(region_data, ("name", "emergency_number"), where)
+        if not region_data.get("use_base_contacts"):
+            validate_categories(region_data.get("categories"), f"{where}.categories")
+        for language, language_data in region_data.get("languages", {}).items():
+            validate_categories(language_data.get("categories"), f"{where}.languages.{language}.categories")
+    
+    return data
+
+def build_quick_markdown(contacts):
+    """Render quick contacts as a single markdown fragment"""
+    return "\n\n".join(f"**{contact['name']}**  \n`{contact['number']}`" for contact in contacts)
+
+def build_popup_markdown(contacts):
+    """Render emergency contacts for the crisis popup"""
+    return "\n\n".join(
+        f"**{contact['name']}**: {contact['number']}  \n*{contact['description']}*" for contact in contacts
+    )
+
+def build_category_markdown(category_data):
+    """Render one resource category as a single markdown fragment"""
+    lines = [f"## {category_data['title']}", ""]
+    for contact in category_data['contacts']:
+        lines.append(f"- **{contact['name']}** — `{contact['number']}`  \n  {contact['description']}")
+    return "\n".join(lines)
+
+class LocaleBundle:
+    """Crisis resources for one region and language with prebuilt lookups and markdown"""
+    __slots__ = ("region", "language", "region_name", "emergency_number",
+                 "categories", "quick_contacts", "fragments")
+    
+    def __init__(self, region, language, region_name, emergency_number, categories):
+        self.region = region
+        self.language = language
+        self.region_name = region_name
+        self.emergency_number = emergency_number
+        self.categories = categories
+        
+        quick_contacts = []
+        for category in Config.CRISIS_QUICK_CATEGORIES:
+            if category in categories:
+                quick_contacts.extend(categories[category]["contacts"][:2])  # First 2 from each
+        self.quick_contacts = tuple(quick_contacts)
+        
+        emergency = categories.get("emergency", {}).get("contacts", ())
+        self.fragments = {
+            "quick": build_quick_markdown(self.quick_contacts[:2]),
+            "popup": build_popup_markdown(emergency),
+            "page": "\n\n---\n\n".join(build_category_markdown(data) for data in categories.values()),
+        }
+    
+    def get_category(self, category):
+        """Get the contacts for a category in this locale"""
+        category_data = self.categories.get(category)
+        return category_data["contacts"] if category_data else ()
+
+class CrisisIndex:
+    """Crisis resources indexed by (region, language) with a fallback chain"""
+    
+    def __init__(self, base_resources, locales):
+        self.default_region = locales["default_region"]
+        self.default_language = locales.get("default_language", "en")
+        self.regions = {}
+        self.bundles = {}
+        
+        shared = {key: base_resources[key] for key in locales.get("shared_categories", ()) if key in base_resources}
+        
+        for region, region_data in locales["regions"].items():
+            self.regions[region] = region_data["name"]
+            
+            if region_data.get("use_base_contacts"):
+                categories = dict(base_resources)
+            else:
+                categories = dict(region_data["categories"])
+                for key, category_data in shared.items():
+                    categories.setdefault(key, category_data)
+            
+            region_bundle = self._make_bundle(region, self.default_language, region_data, categories)
+            self.bundles[(region, None)] = region_bundle
+            self.bundles[(region, self.default_language)] = region_bundle
+            
+            for language, language_data in region_data.get("languages", {}).items():
+                # Language-specific categories replace the region's, the rest fall through
+                localized = dict(categories)
+                localized.update(language_data["categories"])
+                self.bundles[(region, language)] = self._make_bundle(region, language, region_data, localized)
+    
+    def _make_bundle(self, region, language, region_data, categories):
+        return LocaleBundle(region, language, region_data["name"], region_data["emergency_number"], categories)
+    
+    def lookup(self, region=None, language=None):
+        """Find the best bundle: exact locale, then region, then default region"""
+        region = region.upper() if region else None
+        language = language.lower() if language else None
+        for key in ((region, language), (region, None),
+                    (self.default_region, language), (self.default_region, None)):
+            bundle = self.bundles.get(key)
+            if bundle is not None:
+                return bundle
+
+_index_cache = {}
+_index_lock = threading.Lock()
+
+def get_crisis_index(base_snapshot, locales_snapshot):
+    """Get the index for the given data snapshots, building it once per version"""
+    key = (base_snapshot.path, base_snapshot.version, locales_snapshot.path, locales_snapshot.version)
+    index = _index_cache.get(key)
+    if index is None:
+        with _index_lock:
+            index = _index_cache.get(key)
+            if index is None:
+                index = CrisisIndex(base_snapshot.data, locales_snapshot.data)
+                _index_cache.clear()
+                _index_cache[key] = index
+    return index
 
 class CrisisResources:
-    def __init__(self, resources_file="data/crisis_contacts.json"):
+    def __init__(self, resources_file="data/crisis_contacts.json", locales_file="data/crisis_locales.json"):
         self.resources_file = resources_file
-        self.resources = self.load_resources()
+        self.locales_file = locales_file
+        self.snapshot = self.load_resources()
+        self.resources = self.snapshot.data
+        self.locales_snapshot = self.load_locales()
+        self.index = get_crisis_index(self.snapshot, self.locales_snapshot)
     
     def load_resources(self):
-        """Load crisis resources from JSON file"""
-        try:
-            with open(self.resources_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return self.get_default_resources()
+        """Get the shared, read-only snapshot of the crisis resources file"""
+        return get_catalog().load(self.resources_file, prepare_crisis_contacts, self.get_default_resources)
+    
+    def load_locales(self):
+        """Get the shared, read-only snapshot of the regional crisis resources file"""
+        return get_catalog().load(self.locales_file, prepare_crisis_locales, self.get_default_locales)
+    
+    def get_default_locales(self):
+        """Return a single-region locale table backed by the base resources"""
+        return {
+            "default_region": "US",
+            "default_language": "en",
+            "regions": {
+                "US": {"name": "United States", "emergency_number": "911", "use_base_contacts": True}
+            }
+        }
+    
+    def get_bundle(self, locale=None):
+        """Get resources for a locale, defaulting to the session's locale"""
+        if locale is None:
+            locale = st.session_state.get("locale") or {}
+        return self.index.lookup(locale.get("region"), locale.get("language"))
+    
+    def get_regions(self):
+        """Get available regions as a mapping of code to display name"""
+        return self.index.regions
     
     def get_default_resources(self):
         """Return default crisis resources"""
@@ -63,10 +235,7 @@ class CrisisResources:
         st.markdown("### 🆘 **Immediate Help Available**")
         
         # Emergency contacts
-        emergency_contacts = self.resources["emergency"]["contacts"]
-        for contact in emergency_contacts:
-            st.markdown(f"**{contact['name']}**: {contact['number']}")
-            st.caption(contact['description'])
+        st.markdown(self.get_bundle().fragments["popup"])
         
         # Prominent call-to-action
         st.markdown("---")
@@ -92,25 +261,14 @@ class CrisisResources:
         You matter, and help is available 24/7.**
         """)
         
+        bundle = self.get_bundle()
+        
         # Emergency notice
-        st.error("**🚨 If this is an emergency, call 911 or go to your nearest emergency room immediately.**")
+        st.error(f"**🚨 If this is an emergency, call {bundle.emergency_number} or go to your nearest emergency room immediately.**")
         
         # Display all resource categories
-        for category_key, category_data in self.resources.items():
-            st.markdown(f"## {category_data['title']}")
-            
-            for contact in category_data['contacts']:
-                with st.container():
-                    col1, col2 = st.columns([3, 2])
-                    
-                    with col1:
-                        st.markdown(f"**{contact['name']}**")
-                        st.caption(contact['description'])
-                    
-                    with col2:
-                        st.markdown(f"`{contact['number']}`")
-            
-            st.markdown("---")
+        st.markdown(bundle.fragments["page"])
+        st.markdown("---")
         
         # Additional resources
         st.markdown("## 📚 Additional Resources")
@@ -146,30 +304,18 @@ class CrisisResources:
             - **Follow up** regularly to show you care
             """)
     
-    def get_quick_resources(self):
+    def get_quick_resources(self, locale=None):
         """Get a condensed list of the most important resources"""
-        quick_resources = []
-        
-        # Add emergency and suicide prevention resources
-        for category in ["emergency", "suicide_prevention"]:
-            if category in self.resources:
-                quick_resources.extend(self.resources[category]["contacts"][:2])  # First 2 from each
-        
-        return quick_resources
+        return self.get_bundle(locale).quick_contacts
     
     def log_crisis_interaction(self, user_message):
         """Log crisis interactions for monitoring (anonymized)"""
-        # In a real application, this would log to a secure system
-        # For now, we'll just log the timestamp and fact that crisis resources were shown
-        timestamp = datetime.now().isoformat()
-        
-        # This would be sent to a secure logging system in production
-        crisis_log = {
-            "timestamp": timestamp,
-            "crisis_keywords_detected": True,
-            "resources_shown": True,
-            "session_id": st.session_state.get("session_id", "unknown")
-        }
-        
-        # In production, send this to appropriate monitoring/logging system
-        print(f"Crisis interaction logged: {timestamp}")
+        # Only the fact that resources were shown is recorded, never the message itself
+        try:
+            get_crisis_event_sink().record(
+                session_id=st.session_state.get("session_id", "unknown"),
+                region=self.get_bundle().region,
+                resources_shown=True
+            )
+        except Exception as e:
+            logging.error(f"Error logging crisis interaction: {str(e)}")
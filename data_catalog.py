@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+import time
+import logging
+from types import MappingProxyType
+
+from config import Config
+
+
+class SchemaError(ValueError):
+    """Raised when a data file does not match its expected structure"""
+
+
+def freeze(value):
+    """Recursively convert dicts and lists into read-only equivalents"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def require_fields(record, fields, where):
+    """Check that a record is a dict with non-empty string values for the given fields"""
+    if not isinstance(record, dict):
+        raise SchemaError(f"{where}: expected an object, got {type(record).__name__}")
+    for field in fields:
+        if not isinstance(record.get(field), str) or not record[field].strip():
+            raise SchemaError(f"{where}: missing or empty '{field}'")
+
+
+class CatalogSnapshot:
+    """Immutable view of one data file as of a given version"""
+    __slots__ = ("path", "data", "version", "loaded_at", "is_default")
+
+    def __init__(self, path, data, version, is_default=False):
+        self.path = path
+        self.data = data
+        self.version = version
+        self.loaded_at = time.time()
+        self.is_default = is_default
+
+
+class DataCatalog:
+    """Process-wide cache of parsed data files with mtime-based hot reload"""
+
+    def __init__(self, check_interval=None):
+        self.check_interval = Config.DATA_RELOAD_INTERVAL if check_interval is None else check_interval
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def load(self, path, prepare, default_factory):
+        """Return the current snapshot for a data file, loading or reloading it if needed
+
+        ``prepare`` validates the parsed JSON and returns the data to store; it should
+        raise SchemaError on invalid content. ``default_factory`` supplies data when the
+        file is missing or invalid and no earlier snapshot exists.
+        """
+        key = os.path.abspath(path)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        # Fast path: no stat until the check interval has passed
+        if entry is not None and now - entry["checked_at"] < self.check_interval:
+            return entry["snapshot"]
+
+        version = self._file_version(key)
+        if entry is not None and entry["snapshot"].version == version:
+            entry["checked_at"] = now
+            return entry["snapshot"]
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["snapshot"].version == version:
+                entry["checked_at"] = now
+                return entry["snapshot"]
+
+            previous = entry["snapshot"] if entry is not None else None
+            snapshot = self._read(key, version, prepare, default_factory, previous)
+            # Swap in a fresh entry so readers never see a half-updated one
+            self._entries[key] = {"snapshot": snapshot, "checked_at": now}
+            return snapshot
+
+    def invalidate(self, path=None):
+        """Drop cached snapshots so the next load re-reads from disk"""
+        with self._lock:
+            if path is None:
+                self._entries = {}
+            else:
+                self._entries.pop(os.path.abspath(path), None)
+
+    def _file_version(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _read(self, path, version, prepare, default_factory, previous):
+        if version is not None:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = prepare(json.load(f))
+                logging.info(f"Loaded data file {path}")
+                return CatalogSnapshot(path, freeze(data), version)
+            except (OSError, json.JSONDecodeError, SchemaError) as e:
+                logging.error(f"Error loading data file {path}: {str(e)}")
+        else:
+            logging.warning(f"Data file {path} not found")
+
+        if previous is not None and not previous.is_default:
+            # Keep serving the last good content, but remember the new version
+            # so a broken file is not re-parsed on every check
+            logging.warning(f"Keeping previously loaded content for {path}")
+            return CatalogSnapshot(path, previous.data, version)
+
+        return CatalogSnapshot(path, freeze(prepare(default_factory())), version, is_default=True)
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Get the process-wide data catalog"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = DataCatalog()
+    return _catalog
@@ -0,0 +1,111 @@
+from array import array
+from collections.abc import Mapping
+
+# Labels of Config.EMOTION_MODEL, in the order score vectors store them
+EMOTION_LABELS = ("anger", "disgust", "fear", "joy", "neutral", "sadness", "surprise")
+LABEL_INDEX = {label: index for index, label in enumerate(EMOTION_LABELS)}
+WIDTH = len(EMOTION_LABELS)
+
+_KEYS = ("emotion", "confidence", "all_scores")
+_NO_SCORES = array('f')
+
+
+def _zeros(count):
+    return array('f', bytes(4 * count))
+
+
+class EmotionResult(Mapping):
+    """One text's mood, its confidence and a float32 score per model label
+
+    Scores sit in an array('f') in EMOTION_LABELS order, at ``offset``. Results
+    from one batch share a single array, so a batch costs one buffer rather
+    than a list of small dicts per text. Read as a mapping the result looks
+    like the pipeline-shaped dict it replaces; the ``all_scores`` list is
+    built only when asked for.
+    """
+    __slots__ = ("emotion", "confidence", "_buffer", "_offset")
+
+    def __init__(self, emotion, confidence, buffer=None, offset=0):
+        self.emotion = emotion
+        self.confidence = confidence
+        self._buffer = _NO_SCORES if buffer is None else buffer
+        self._offset = offset
+
+    @property
+    def scores(self):
+        """The score vector as a float32 memoryview, without copying; empty for defaults"""
+        return memoryview(self._buffer)[self._offset:self._offset + WIDTH]
+
+    def __getitem__(self, key):
+        if key == "emotion":
+            return self.emotion
+        if key == "confidence":
+            return self.confidence
+        if key == "all_scores":
+            return [{"label": label, "score": score} for label, score in zip(EMOTION_LABELS, self.scores)]
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(_KEYS)
+
+    def __len__(self):
+        return len(_KEYS)
+
+    def __repr__(self):
+        return f"EmotionResult({self.emotion!r}, confidence={self.confidence:.3f})"
+
+    def to_json(self):
+        """Compact JSON form, read back by from_value"""
+        return {"emotion": self.emotion, "confidence": self.confidence, "scores": self.scores.tolist()}
+
+    @classmethod
+    def from_value(cls, value):
+        """An EmotionResult from a decoded cache entry or service response
+
+        Both the compact ``scores`` form and the older ``all_scores`` list of
+        dicts are read. None and EmotionResults pass through unchanged.
+        """
+        if value is None or isinstance(value, cls):
+            return value
+        scores = value.get("scores")
+        if scores is None and value.get("all_scores"):
+            scores = _zeros(WIDTH)
+            for item in value["all_scores"]:
+                index = LABEL_INDEX.get(item["label"].lower())
+                if index is not None:
+                    scores[index] = item["score"]
+        return cls(value["emotion"], value["confidence"], array('f', scores) if scores else None)
+
+    @classmethod
+    def from_pipeline(cls, batch_scores, mapping):
+        """Results for a batch of pipeline outputs, sharing one score buffer
+
+        Labels missing from EMOTION_LABELS are left out of the vector, but
+        still take part in picking the top emotion.
+        """
+        buffer = _zeros(WIDTH * len(batch_scores))
+        results = []
+        for i, scores in enumerate(batch_scores):
+            offset = i * WIDTH
+            for item in scores:
+                index = LABEL_INDEX.get(item['label'].lower())
+                if index is not None:
+                    buffer[offset + index] = item['score']
+            top_emotion = max(scores, key=lambda x: x['score'])
+            results.append(cls(mapping.get(top_emotion['label'].lower(), 'normal'), top_emotion['score'],
+                               buffer, offset))
+        return results
+
+
+def default_emotion():
+    """The result used when no model output is available"""
+    return EmotionResult("normal", 0.0)
+
+
+def json_default(value):
+    """json.dumps hook for values with a compact JSON form"""
+    to_json = getattr(value, "to_json", None)
+    if to_json is None:
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    return to_json()
+
@@ -0,0 +1,210 @@
+import http.client
+import json
+import logging
+import queue
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+from config import Config
+from emotion_result import EmotionResult
+from preprocessing import as_text
+from result_cache import get_result_cache, text_key
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix domain socket"""
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class InferenceUnavailable(Exception):
+    """The inference service could not answer the request"""
+
+
+class InferenceClient:
+    """Mood detector backed by the standalone inference service
+
+    Offers the same methods as MoodDetector, so the app can use either.
+    Connections are kept alive and reused from a small pool. When the service
+    times out or fails, the request is answered by a local MoodDetector and the
+    service is skipped for ``retry_after`` seconds before it is tried again.
+    """
+
+    def __init__(self, url=None, timeout=None, pool_size=None, retry_after=None):
+        self.url = urlparse(url or Config.INFERENCE_SERVICE_URL)
+        self.timeout = timeout or Config.INFERENCE_TIMEOUT
+        self.retry_after = Config.INFERENCE_RETRY_AFTER if retry_after is None else retry_after
+        self._pool = queue.LifoQueue(maxsize=pool_size or Config.INFERENCE_POOL_SIZE)
+        self._unavailable_until = 0.0
+        self._local = None
+        self._local_lock = threading.Lock()
+
+    def _connect(self):
+        if self.url.scheme == "unix":
+            return UnixHTTPConnection(self.url.path, timeout=self.timeout)
+        return http.client.HTTPConnection(self.url.hostname, self.url.port or 80, timeout=self.timeout)
+
+    def _request(self, method, path, payload=None):
+        if time.monotonic() < self._unavailable_until:
+            raise InferenceUnavailable("Inference service is in its retry cooldown")
+
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        try:
+            connection = self._pool.get_nowait()
+            reused = True
+        except queue.Empty:
+            connection = self._connect()
+            reused = False
+
+        try:
+            try:
+                response, data = self._send(connection, method, path, body)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                if not reused:
+                    raise
+                # The service closed an idle keep-alive connection; retry once on a new one
+                connection.close()
+                connection = self._connect()
+                response, data = self._send(connection, method, path, body)
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            connection.close()
+            self._mark_unavailable(f"{method} {path} failed: {str(e)}")
+            raise InferenceUnavailable(str(e))
+
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+        if response.status != 200:
+            if response.status >= 500:
+                self._mark_unavailable(f"{method} {path} returned {response.status}: {data.get('error')}")
+            raise InferenceUnavailable(data.get("error", f"HTTP {response.status}"))
+        return data
+
+    def _send(self, connection, method, path, body):
+        connection.request(method, path, body=body, headers={"Content-Type": "application/json"})
+        response = connection.getresponse()
+        return response, json.loads(response.read() or b"{}")
+
+    def _mark_unavailable(self, reason):
+        logging.warning(f"Inference service unavailable, using local models: {reason}")
+        self._unavailable_until = time.monotonic() + self.retry_after
+
+    def _fallback(self):
+        """Local detector; its models only load if the service cannot be used"""
+        if self._local is None:
+            with self._local_lock:
+                if self._local is None:
+                    from mood_detector import MoodDetector
+                    self._local = MoodDetector()
+        return self._local
+
+    def is_available(self):
+        try:
+            return self._request("GET", "/healthz").get("status") == "ok"
+        except InferenceUnavailable:
+            return False
+
+    def _analyze(self, kind, texts, batch_size, fallback):
+        """Answer from the result cache where possible and send the rest to the service
+
+        Only the service, or the local fallback, writes to the cache, since
+        they can tell real results from defaults.
+        """
+        cache = get_result_cache()
+        results = [cache.get(text_key(kind, text)) if text else None for text in texts]
+        # Empty texts get the default result locally, without a round trip
+        missing = [i for i, result in enumerate(results) if result is None and texts[i]]
+        step = min(batch_size or Config.INFERENCE_MAX_BATCH, Config.INFERENCE_MAX_BATCH)
+
+        try:
+            for start in range(0, len(missing), step):
+                positions = missing[start:start + step]
+                response = self._request("POST", f"/v1/{kind}", {"texts": [as_text(texts[i]) for i in positions]})
+                for i, result in zip(positions, response["results"]):
+                    results[i] = result
+        except InferenceUnavailable:
+            pass
+
+        remaining = [i for i, result in enumerate(results) if result is None]
+        if remaining:
+            for i, result in zip(remaining, fallback([texts[i] for i in remaining], batch_size)):
+                results[i] = result
+        return results
+
+    def detect_emotions(self, texts, batch_size=None):
+        """Detect emotions for several texts, split into batches the service accepts"""
+        results = self._analyze("emotion", texts, batch_size, self._fallback().detect_emotions)
+        return [EmotionResult.from_value(result) for result in results]
+
+    def detect_emotion(self, text):
+        return self.detect_emotions([text])[0]
+
+    def analyze_batch(self, texts, batch_size=None):
+        """Emotion and sentiment per text, from the service's fused endpoint
+
+        Texts whose halves are both cached are answered locally.
+        """
+        cache = get_result_cache()
+        results = []
+        for text in texts:
+            mood = cache.get(text_key("emotion", text)) if text else None
+            sentiment = cache.get(text_key("sentiment", text)) if text else None
+            results.append({"mood": mood, "sentiment": sentiment} if mood and sentiment else None)
+        missing = [i for i, result in enumerate(results) if result is None and texts[i]]
+        step = min(batch_size or Config.INFERENCE_MAX_BATCH, Config.INFERENCE_MAX_BATCH)
+
+        try:
+            for start in range(0, len(missing), step):
+                positions = missing[start:start + step]
+                response = self._request("POST", "/v1/analyze", {"texts": [as_text(texts[i]) for i in positions]})
+                for i, result in zip(positions, response["results"]):
+                    results[i] = result
+        except InferenceUnavailable:
+            pass
+
+        remaining = [i for i, result in enumerate(results) if result is None]
+        if remaining:
+            for i, result in zip(remaining, self._fallback().analyze_batch([texts[i] for i in remaining], batch_size)):
+                results[i] = result
+        return [{"mood": EmotionResult.from_value(result["mood"]), "sentiment": result["sentiment"]}
+                for result in results]
+
+    def analyze(self, text, context=None):
+        # Scored without context, like detect_emotion_in_context below
+        return self.analyze_batch([text])[0]
+
+    def detect_emotion_in_context(self, text, context):
+        # The service scores messages alone; running the model here for context
+        # would load it in every app process, which the service exists to avoid
+        return self.detect_emotion(text)
+
+    def analyze_sentiments(self, texts, batch_size=None):
+        return self._analyze("sentiment", texts, batch_size, self._fallback().analyze_sentiments)
+
+    def analyze_sentiment_intensity(self, text):
+        return self.analyze_sentiments([text])[0]
+
+    def detect_crisis_indicators(self, text):
+        # The keyword check is cheaper than a round trip and needs no models
+        return self._fallback().detect_crisis_indicators(text)
+
+    def get_mood_emoji(self, emotion):
+        return self._fallback().get_mood_emoji(emotion)
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,220 @@
+"""Standalone inference service for mood analysis.
+
+Runs the emotion and sentiment models in a pool of worker processes, so
+Streamlit sessions share one set of loaded models and a slow analysis never
+holds up a rerun. Every endpoint takes a batch of texts.
+
+    python inference_service.py --port 8765 --workers 2
+    python inference_service.py --socket /tmp/mindmate-inference.sock
+
+Endpoints (JSON bodies):
+    POST /v1/emotion    {"texts": [...]}  -> {"results": [{"emotion", "confidence", "scores"}, ...]}
+                        (scores in emotion_result.EMOTION_LABELS order)
+    POST /v1/sentiment  {"texts": [...]}  -> {"results": [{"label", "score"}, ...]}
+    POST /v1/analyze    {"texts": [...]}  -> {"results": [{"mood": {...}, "sentiment": {...}}, ...]}
+    POST /v1/crisis     {"texts": [...]}  -> {"results": [true, false, ...]}
+    POST /v1/respond    {"emotion", "text", "personality", "crisis"} -> {"response": "..."}
+    GET  /healthz
+    GET  /metrics       (Prometheus text, when MINDMATE_METRICS=1)
+"""
+import argparse
+import json
+import logging
+import os
+import socketserver
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import metrics
+from config import Config
+from emotion_result import json_default
+from logging_pipeline import configure_logging
+
+_worker_detector = None
+
+
+def _init_worker():
+    """Load the models once in each worker process"""
+    global _worker_detector
+    configure_logging()
+    from mood_detector import MoodDetector
+    _worker_detector = MoodDetector(load_models=True)
+
+
+def _run(operation, texts):
+    """Run one batch in a worker process"""
+    if operation == "emotion":
+        return _worker_detector.detect_emotions(texts)
+    if operation == "sentiment":
+        return _worker_detector.analyze_sentiments(texts)
+    if operation == "analyze":
+        # Both models in one task, so a merged request is a single trip to the worker
+        return _worker_detector.analyze_batch(texts)
+    raise ValueError(f"Unknown operation: {operation}")
+
+
+class InferenceService:
+    """Worker pool plus the request handling that does not need the models"""
+
+    def __init__(self, workers=None, max_batch=None, timeout=None):
+        self.max_batch = max_batch or Config.INFERENCE_MAX_BATCH
+        self.timeout = timeout or Config.INFERENCE_REQUEST_TIMEOUT
+        self.executor = ProcessPoolExecutor(max_workers=workers or Config.INFERENCE_WORKERS,
+                                            initializer=_init_worker)
+        # Crisis checks and responses are cheap, so they are answered in the request thread
+        from mood_detector import MoodDetector
+        self.keyword_detector = MoodDetector()
+        self._chatbot = threading.local()
+        self.started = False
+
+    def warm_up(self):
+        """Load the models in every worker before taking traffic"""
+        futures = [self.executor.submit(_run, "emotion", ["warm up"])
+                   for _ in range(self.executor._max_workers)]
+        for future in futures:
+            future.result()
+        self.started = True
+
+    def chatbot(self):
+        if not hasattr(self._chatbot, "instance"):
+            from chatbot import MindMateChatbot
+            self._chatbot.instance = MindMateChatbot()
+        return self._chatbot.instance
+
+    def analyze(self, operation, texts):
+        if len(texts) > self.max_batch:
+            raise ValueError(f"Batch of {len(texts)} texts is larger than the limit of {self.max_batch}")
+        with metrics.span("inference", operation):
+            if operation == "crisis":
+                return [self.keyword_detector.detect_crisis_indicators(text) for text in texts]
+            return self.executor.submit(_run, operation, texts).result(timeout=self.timeout)
+
+    def respond(self, emotion, text="", personality=None, crisis=False):
+        chatbot = self.chatbot()
+        chatbot.set_personality(personality or "Friendly")
+        if crisis:
+            return chatbot.get_crisis_response()
+        return chatbot.get_personality_response(emotion, text)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class InferenceRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients can reuse connections
+
+    def setup(self):
+        # Headers and body go out in separate writes; without TCP_NODELAY every
+        # response waits for the client's delayed ACK
+        self.disable_nagle_algorithm = isinstance(self.client_address, tuple)
+        super().setup()
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, default=json_default).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            self._send_json(200, {"status": "ok", "models_ready": self.server.service.started})
+        elif self.path == "/metrics" and Config.METRICS_ENABLED:
+            body = metrics.registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "Request body must be JSON"})
+            return
+
+        service = self.server.service
+        try:
+            if self.path == "/v1/respond":
+                response = service.respond(payload.get("emotion", "normal"), payload.get("text", ""),
+                                           payload.get("personality"), payload.get("crisis", False))
+                self._send_json(200, {"response": response})
+                return
+
+            operation = self.path.rsplit("/", 1)[-1] if self.path.startswith("/v1/") else None
+            if operation not in ("emotion", "sentiment", "analyze", "crisis"):
+                self._send_json(404, {"error": "Not found"})
+                return
+
+            texts = payload.get("texts")
+            if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                self._send_json(400, {"error": "'texts' must be a list of strings"})
+                return
+            self._send_json(200, {"results": service.analyze(operation, texts)})
+
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+        except FutureTimeoutError:
+            self._send_json(503, {"error": "Inference timed out"})
+        except Exception as e:
+            logging.error(f"Inference request error: {str(e)}")
+            self._send_json(500, {"error": "Inference failed"})
+
+
+class UnixInferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def create_server(service, host="127.0.0.1", port=8765, socket_path=None):
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixInferenceServer(socket_path, InferenceRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), InferenceRequestHandler)
+    server.service = service
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=Config.INFERENCE_WORKERS)
+    parser.add_argument("--max-batch", type=int, default=Config.INFERENCE_MAX_BATCH)
+    args = parser.parse_args()
+
+    configure_logging()
+    service = InferenceService(workers=args.workers, max_batch=args.max_batch)
+    logging.info(f"Loading models in {args.workers} workers")
+    service.warm_up()
+
+    server = create_server(service, args.host, args.port, args.socket)
+    logging.info(f"Inference service listening on {args.socket or f'{args.host}:{args.port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
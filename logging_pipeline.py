@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import queue
+import random
+import atexit
+import logging
+import threading
+import traceback
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from config import Config
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "thread": record.threadName,
+        }
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_info:
+            entry["exception"] = "".join(traceback.format_exception(*record.exc_info)).rstrip()
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a configured share of records per logger, below ERROR
+
+    Keys are logger names. Records logged through the root logger, as most
+    modules here do, match by module name instead.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR or not self.rates:
+            return True
+        key = record.module if record.name == "root" else record.name
+        rate = self.rates.get(key)
+        if rate is None:
+            # A rate set for a parent logger applies to its children
+            for name, parent_rate in self.rates.items():
+                if key.startswith(name + "."):
+                    rate = parent_rate
+                    break
+        return rate is None or random.random() < rate
+
+
+class RateLimitFilter(logging.Filter):
+    """Let through at most ``limit`` records per signature per window
+
+    The signature is the logger, level and call site, so the same failure
+    repeating in a loop is logged a few times rather than thousands. The
+    first record after a window with drops carries the drop count in its
+    ``suppressed`` field.
+    """
+
+    def __init__(self, limit, window):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._signatures = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING or not self.limit:
+            return True
+        signature = (record.name, record.levelno, record.pathname, record.lineno)
+        with self._lock:
+            window_start, count, suppressed = self._signatures.get(signature, (record.created, 0, 0))
+            if record.created - window_start >= self.window:
+                window_start, count = record.created, 0
+            if count >= self.limit:
+                self._signatures[signature] = (window_start, count, suppressed + 1)
+                return False
+            self._signatures[signature] = (window_start, count + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener without formatting them or waiting on a full queue"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting, including tracebacks, happens on the listener thread. Only
+        # %-style arguments are merged here, since they may change after this call.
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sampling(spec):
+    """Parse "logger=rate,logger=rate" into a dict"""
+    rates = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, rate = item.split("=", 1)
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+_listener = None
+_listener_pid = None
+_setup_lock = threading.Lock()
+
+
+def configure_logging():
+    """Route the root logger through a queue to a background listener, once per process"""
+    global _listener, _listener_pid
+    with _setup_lock:
+        # A forked child inherits the handler but not the listener thread, so it sets up its own
+        if _listener is not None and _listener_pid == os.getpid():
+            return _listener
+
+        stream_handler = logging.StreamHandler(sys.stderr)
+        if Config.LOG_FORMAT == "json":
+            stream_handler.setFormatter(JsonFormatter())
+        else:
+            stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+        queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=Config.LOG_QUEUE_SIZE))
+        queue_handler.addFilter(SamplingFilter(parse_sampling(Config.LOG_SAMPLING)))
+        queue_handler.addFilter(RateLimitFilter(Config.LOG_RATE_LIMIT, Config.LOG_RATE_WINDOW))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(Config.LOG_LEVEL)
+
+        _listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+        _listener_pid = os.getpid()
+        _listener.start()
+        atexit.register(_listener.stop)
+        return _listener
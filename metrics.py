@@ -0,0 +1,206 @@
+import os
+import time
+import logging
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import Config
+
+# Upper bounds of the latency buckets, in seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative latency histogram in the Prometheus layout"""
+    __slots__ = ("counts", "total", "count", "_lock")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)  # the last bucket is +Inf
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += seconds
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.total, self.count
+
+
+class MetricsRegistry:
+    """Latency histograms keyed by metric name and label value"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, metric, label, seconds):
+        key = (metric, label)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+        histogram.observe(seconds)
+
+    def render_prometheus(self):
+        """All histograms in the Prometheus text exposition format"""
+        with self._lock:
+            items = sorted(self._histograms.items())
+
+        lines = []
+        current_metric = None
+        for (metric, label), histogram in items:
+            name, label_name = METRICS[metric]
+            if metric != current_metric:
+                current_metric = metric
+                lines.append(f"# HELP {name} {METRIC_HELP[metric]}")
+                lines.append(f"# TYPE {name} histogram")
+
+            counts, total, count = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{{label_name}="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{label_name}="{label}"}} {total:.6f}')
+            lines.append(f'{name}_count{{{label_name}="{label}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+# metric -> (exported name, label name)
+METRICS = {
+    "stage": ("mindmate_stage_duration_seconds", "stage"),
+    "render": ("mindmate_render_duration_seconds", "region"),
+    "inference": ("mindmate_inference_duration_seconds", "operation"),
+}
+METRIC_HELP = {
+    "stage": "Time spent in each stage of processing a chat message.",
+    "render": "Time spent rerunning the app or one of its fragments.",
+    "inference": "Time the inference service spent on a batch.",
+}
+
+registry = MetricsRegistry()
+
+
+class _Span:
+    __slots__ = ("metric", "label", "record", "start")
+
+    def __init__(self, metric, label, record=None):
+        self.metric = metric
+        self.label = label
+        self.record = record
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        if Config.METRICS_ENABLED:
+            registry.observe(self.metric, self.label, elapsed)
+        if self.record is not None:
+            self.record[self.label] = elapsed * 1000
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(metric, label, record=None):
+    """Time a block into a histogram, and into ``record[label]`` in ms when a dict is given
+
+    A shared no-op when metrics are disabled and there is no dict to record into.
+    """
+    if record is None and not Config.METRICS_ENABLED:
+        return _NULL_SPAN
+    return _Span(metric, label, record)
+
+
+def observe(metric, label, seconds):
+    """Record a duration measured elsewhere"""
+    if Config.METRICS_ENABLED:
+        registry.observe(metric, label, seconds)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_metrics_file(path):
+    """Write the current metrics atomically, for node-exporter's textfile collector or similar"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(registry.render_prometheus())
+    os.replace(temp_path, path)
+
+
+def _export_file_loop(path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            write_metrics_file(path)
+        except OSError as e:
+            logging.warning(f"Could not write metrics file {path}: {str(e)}")
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters():
+    """Start the configured metrics endpoint and file export, once per process"""
+    global _exporters_started
+    if _exporters_started or not Config.METRICS_ENABLED:
+        return
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+        if Config.METRICS_PORT:
+            try:
+                server = ThreadingHTTPServer((Config.METRICS_HOST, Config.METRICS_PORT), _MetricsHandler)
+                server.daemon_threads = True
+                threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+                logging.info(f"Serving metrics on http://{Config.METRICS_HOST}:{Config.METRICS_PORT}/metrics")
+            except OSError as e:
+                logging.warning(f"Could not start the metrics endpoint: {str(e)}")
+
+        if Config.METRICS_FILE:
+            threading.Thread(target=_export_file_loop, args=(Config.METRICS_FILE, Config.METRICS_EXPORT_INTERVAL),
+                             name="metrics-file-export", daemon=True).start()
@@ -0,0 +1,139 @@
+import time
+import numpy as np
+import pandas as pd
+
+from mood_history import EMOTIONS, EMOTION_CODES
+from storage import ROLLUP_GRANULARITIES, bucket_start
+
+# How far back each granularity looks by default
+DEFAULT_RANGES = {
+    "hour": 2 * 86400,
+    "day": 30 * 86400,
+    "week": 365 * 86400,
+}
+
+
+class MoodRollupFrame:
+    """Columnar view of mood rollups: one row per bucket, one column per emotion"""
+
+    def __init__(self, granularity, bucket_starts, counts, confidence_sums):
+        self.granularity = granularity
+        self.bucket_starts = bucket_starts
+        self.counts = counts
+        self.confidence_sums = confidence_sums
+
+    @classmethod
+    def from_rows(cls, granularity, rows, since=None, until=None):
+        """Build a dense frame from (bucket_start, emotion, count, confidence_sum) rows
+
+        Buckets with no moods between ``since`` and ``until`` are filled with zeros
+        so charts get an even time axis.
+        """
+        size = ROLLUP_GRANULARITIES[granularity]
+        if rows:
+            starts, emotions, counts, confidence_sums = zip(*rows)
+            starts = np.fromiter(starts, dtype=np.int64, count=len(rows))
+            codes = np.fromiter((EMOTION_CODES.get(e, EMOTION_CODES["normal"]) for e in emotions),
+                                dtype=np.int64, count=len(rows))
+            counts = np.fromiter(counts, dtype=np.int64, count=len(rows))
+            confidence_sums = np.fromiter(confidence_sums, dtype=np.float64, count=len(rows))
+            first = starts.min() if since is None else min(starts.min(), bucket_start(since, granularity))
+            last = starts.max() if until is None else max(starts.max(), bucket_start(until, granularity))
+        else:
+            if since is None or until is None:
+                return cls.empty(granularity)
+            first = bucket_start(since, granularity)
+            last = bucket_start(until, granularity)
+            starts = codes = counts = np.zeros(0, dtype=np.int64)
+            confidence_sums = np.zeros(0, dtype=np.float64)
+
+        bucket_starts = np.arange(first, last + size, size, dtype=np.int64)
+        rows_index = (starts - first) // size
+
+        dense_counts = np.zeros((len(bucket_starts), len(EMOTIONS)), dtype=np.int64)
+        dense_sums = np.zeros((len(bucket_starts), len(EMOTIONS)), dtype=np.float64)
+        np.add.at(dense_counts, (rows_index, codes), counts)
+        np.add.at(dense_sums, (rows_index, codes), confidence_sums)
+        return cls(granularity, bucket_starts, dense_counts, dense_sums)
+
+    @classmethod
+    def empty(cls, granularity):
+        return cls(granularity, np.zeros(0, dtype=np.int64),
+                   np.zeros((0, len(EMOTIONS)), dtype=np.int64),
+                   np.zeros((0, len(EMOTIONS)), dtype=np.float64))
+
+    def __len__(self):
+        return len(self.bucket_starts)
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def totals_by_bucket(self):
+        return self.counts.sum(axis=1)
+
+    def distribution(self):
+        """Emotion counts over the whole frame"""
+        totals = self.counts.sum(axis=0)
+        return {EMOTIONS[code]: int(count) for code, count in enumerate(totals) if count}
+
+    def mean_confidence(self):
+        """Mean confidence per bucket, NaN where there were no moods"""
+        totals = self.totals_by_bucket()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.confidence_sums.sum(axis=1) / totals
+
+    def dominant_moods(self):
+        """Most frequent emotion per bucket, None where there were no moods"""
+        dominant = self.counts.argmax(axis=1)
+        totals = self.totals_by_bucket()
+        return [EMOTIONS[code] if total else None for code, total in zip(dominant, totals)]
+
+    def emotion_columns(self):
+        """Emotions that appear at least once, as (name, column index) pairs"""
+        present = np.flatnonzero(self.counts.sum(axis=0))
+        return [(EMOTIONS[code], code) for code in present]
+
+    def to_chart_data(self):
+        """Per-bucket emotion counts as a DataFrame indexed by bucket start time"""
+        index = pd.to_datetime(self.bucket_starts, unit="s")
+        columns = self.emotion_columns()
+        return pd.DataFrame(
+            self.counts[:, [code for _, code in columns]],
+            index=index,
+            columns=[name.title() for name, _ in columns]
+        )
+
+    def to_distribution_data(self):
+        """Total count per emotion as a DataFrame indexed by mood"""
+        totals = self.counts.sum(axis=0)
+        columns = self.emotion_columns()
+        return pd.DataFrame(
+            {"Count": totals[[code for _, code in columns]]},
+            index=pd.Index([name.title() for name, _ in columns], name="Mood")
+        )
+
+    def to_confidence_data(self):
+        """Mean confidence per bucket as a DataFrame indexed by bucket start time"""
+        return pd.DataFrame(
+            {"Mean Confidence": self.mean_confidence()},
+            index=pd.to_datetime(self.bucket_starts, unit="s")
+        )
+
+
+class MoodAnalytics:
+    """Reads incrementally maintained mood rollups for one user"""
+
+    def __init__(self, store, user_key):
+        self.store = store
+        self.user_key = user_key
+
+    def load(self, granularity="day", since=None, until=None):
+        """Load a dense rollup frame, by default covering the granularity's standard range"""
+        if granularity not in ROLLUP_GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+
+        until = time.time() if until is None else until
+        since = until - DEFAULT_RANGES[granularity] if since is None else since
+        rows = self.store.get_rollups(self.user_key, granularity, since, until)
+        return MoodRollupFrame.from_rows(granularity, rows, since, until)
@@ -1,24 +1,97 @@
-import streamlit as st
-from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
-import torch
+import re
+import time
+import threading
+from collections import deque
 from config import Config
+from result_cache import get_result_cache, text_key
+from preprocessing import PreparedText, as_text, normalize
+from emotion_result import EmotionResult, default_emotion
 import logging
 
+# All crisis keywords in one precompiled pattern, matched against normalized text
+CRISIS_PATTERN = re.compile("|".join(re.escape(normalize(keyword)) for keyword in Config.CRISIS_KEYWORDS))
+
+
+class EmotionContext:
+    """A session's recent user turns as token ids, for context-aware emotion scoring
+
+    Each turn is tokenized once, when it is scored, and kept here, so later
+    turns only tokenize their own text. The joined window is rebuilt when a
+    turn is added and holds at most ``turns`` turns and ``max_tokens`` tokens,
+    dropping the oldest first. Turns are joined with the tokenizer's separator
+    token, when it has one.
+    """
+    __slots__ = ("turns", "max_tokens", "tokenizer_name", "_separator", "_turns", "_ids")
+
+    def __init__(self, turns=None, max_tokens=None):
+        self.turns = Config.EMOTION_CONTEXT_TURNS if turns is None else turns
+        self.max_tokens = max_tokens or Config.EMOTION_CONTEXT_MAX_TOKENS
+        self.tokenizer_name = None
+        self._separator = []
+        self._turns = deque(maxlen=max(self.turns, 1))
+        self._ids = []
+
+    def __len__(self):
+        return len(self._turns)
+
+    def ids(self, tokenizer_name):
+        """The context's token ids, or none when they came from another tokenizer"""
+        return self._ids if tokenizer_name == self.tokenizer_name else []
+
+    def push(self, token_ids, tokenizer_name, separator=()):
+        if tokenizer_name != self.tokenizer_name:
+            self.clear()
+            self.tokenizer_name = tokenizer_name
+        self._separator = list(separator)
+        self._turns.append(token_ids)
+        ids = []
+        for turn in self._turns:
+            if ids:
+                ids.extend(self._separator)
+            ids.extend(turn)
+        ids = ids[-self.max_tokens:]
+        # A window cut just after a separator should not start with it
+        if self._separator and ids[:len(self._separator)] == self._separator:
+            ids = ids[len(self._separator):]
+        self._ids = ids
+
+    def clear(self):
+        self._turns.clear()
+        self._ids = []
+
+
 class MoodDetector:
-    def __init__(self):
+    def __init__(self, load_models=False):
         self.emotion_classifier = None
         self.sentiment_classifier = None
-        self.setup_models()
+        self.models_loaded = False
+        self._retry_at = 0.0
+        self._shared_vocabulary = None
+        self._load_lock = threading.Lock()
+        if load_models:
+            self.setup_models()
     
     def setup_models(self):
         """Initialize the emotion and sentiment analysis models"""
+        # torch and transformers are imported here, on first use, so pages that
+        # never analyse text do not pay for loading them
         try:
+            import torch
+            from transformers import pipeline
+            
+            if Config.INFERENCE_DEVICE == "auto":
+                device = 0 if torch.cuda.is_available() else -1
+            else:
+                device = 0 if Config.INFERENCE_DEVICE == "cuda" else -1
+            if Config.INFERENCE_THREADS:
+                torch.set_num_threads(Config.INFERENCE_THREADS)
+            
             # Initialize emotion classifier
             self.emotion_classifier = pipeline(
                 "text-classification",
                 model=Config.EMOTION_MODEL,
                 return_all_scores=True,
-                device=0 if torch.cuda.is_available() else -1
+                device=device
             )
             
             # Initialize sentiment classifier for backup
@@ -26,50 +99,143 @@ class MoodDetector:
                 "sentiment-analysis",
                 model=Config.SENTIMENT_MODEL,
                 return_all_scores=True,
-                device=0 if torch.cuda.is_available() else -1
+                device=device
             )
+            self.models_loaded = True
             
         except Exception as e:
-            st.error(f"Error loading models: {str(e)}")
+            # Runs in cached resources, worker threads and the inference
+            # service, so failures are logged rather than shown in the page
             logging.error(f"Model loading error: {str(e)}")
+            self._retry_at = time.monotonic() + Config.MODEL_RETRY_AFTER
+    
+    def ensure_models(self):
+        """Load the models the first time they are needed, retrying a failed load after Config.MODEL_RETRY_AFTER"""
+        if not self.models_loaded and time.monotonic() >= self._retry_at:
+            with self._load_lock:
+                if not self.models_loaded and time.monotonic() >= self._retry_at:
+                    self.setup_models()
+    
+    # Maps the emotion model's labels to the app's mood names
+    EMOTION_MAPPING = {
+        'joy': 'happy',
+        'sadness': 'sad',
+        'anger': 'angry',
+        'fear': 'anxious',
+        'surprise': 'excited',
+        'disgust': 'upset',
+        'neutral': 'normal'
+    }
     
     def detect_emotion(self, text):
         """Detect emotion from text input"""
-        if not text or not self.emotion_classifier:
-            return {"emotion": "normal", "confidence": 0.0, "all_scores": []}
+        if not text:
+            return default_emotion()
         
         try:
-            # Get emotion predictions
-            results = self.emotion_classifier(text)
-            
-            # Process results
-            if results and len(results) > 0:
-                # Get the highest scoring emotion
-                top_emotion = max(results[0], key=lambda x: x['score'])
-                
-                emotion_mapping = {
-                    'joy': 'happy',
-                    'sadness': 'sad',
-                    'anger': 'angry',
-                    'fear': 'anxious',
-                    'surprise': 'excited',
-                    'disgust': 'upset',
-                    'neutral': 'normal'
-                }
-                
-                detected_emotion = emotion_mapping.get(top_emotion['label'].lower(), 'normal')
-                
-                return {
-                    "emotion": detected_emotion,
-                    "confidence": top_emotion['score'],
-                    "all_scores": results[0]
-                }
+            # Results are shared through the result cache; concurrent misses on
+            # the same text run the model once
+            result = get_result_cache().get_or_compute(text_key("emotion", text), lambda: self._classify_emotion(as_text(text)))
+            if result is not None:
+                return EmotionResult.from_value(result)
         
         except Exception as e:
-            st.error(f"Error detecting emotion: {str(e)}")
             logging.error(f"Emotion detection error: {str(e)}")
         
-        return {"emotion": "normal", "confidence": 0.0, "all_scores": []}
+        return default_emotion()
+    
+    def _classify_emotion(self, text):
+        """Run the emotion model; None when it is not available"""
+        self.ensure_models()
+        if not self.emotion_classifier:
+            return None
+        
+        # Get emotion predictions
+        results = self.emotion_classifier(text)
+        
+        # Process results
+        if results and len(results) > 0:
+            return EmotionResult.from_pipeline(results[:1], self.EMOTION_MAPPING)[0]
+        return None
+    
+    def detect_emotion_in_context(self, text, context):
+        """Detect emotion from text read after the session's previous turns
+
+        The message is scored as the second segment of a pair whose first
+        segment is the context window, so "yeah" after "I lost my job" is not
+        read on its own. Only the new message is tokenized; it then joins the
+        context for the next turn. Without context, or when the loaded model
+        cannot be run directly, this is detect_emotion. Context-aware results
+        are not cached, since they depend on the conversation.
+        """
+        if not text or context is None or context.turns <= 0:
+            return self.detect_emotion(text)
+        
+        try:
+            self.ensure_models()
+            tokenizer = getattr(self.emotion_classifier, "tokenizer", None)
+            if tokenizer is None:
+                return self.detect_emotion(text)
+            
+            tokenizer_name = tokenizer.name_or_path
+            # A leading space tokenizes the turn as running text, as it would be mid-conversation
+            message_ids = tokenizer(" " + as_text(text), add_special_tokens=False, truncation=True,
+                                    max_length=context.max_tokens)["input_ids"]
+            sep_token_id = getattr(tokenizer, "sep_token_id", None)
+            separator = [] if sep_token_id is None else [sep_token_id]
+        except Exception as e:
+            logging.error(f"Context emotion detection error: {str(e)}")
+            return self.detect_emotion(text)
+        
+        result = None
+        context_ids = context.ids(tokenizer_name)
+        if context_ids:
+            try:
+                result = self._classify_emotion_pair(tokenizer, context_ids, message_ids)
+            except Exception as e:
+                logging.error(f"Context emotion detection error: {str(e)}")
+        # The turn joins the context even when it was scored alone
+        context.push(message_ids, tokenizer_name, separator)
+        return self.detect_emotion(text) if result is None else result
+    
+    def _classify_emotion_pair(self, tokenizer, context_ids, message_ids):
+        """Run the emotion model on already tokenized context and message"""
+        import torch
+        
+        model = self.emotion_classifier.model
+        input_ids = tokenizer.build_inputs_with_special_tokens(context_ids, message_ids)
+        with torch.no_grad():
+            logits = model(input_ids=torch.tensor([input_ids], device=model.device)).logits
+        return EmotionResult.from_pipeline(self._label_scores(model, logits), self.EMOTION_MAPPING)[0]
+    
+    @staticmethod
+    def _label_scores(model, logits):
+        """Softmax logits as pipeline-style [{"label", "score"}, ...] lists, one per row"""
+        labels = model.config.id2label
+        return [[{"label": labels[i], "score": score} for i, score in enumerate(row)]
+                for row in logits.softmax(-1).tolist()]
+    
+    def detect_emotions(self, texts, batch_size=None):
+        """Detect emotions for several texts, running the model once on the cache misses"""
+        keys = [text_key("emotion", text) if text else None for text in texts]
+        
+        def classify(positions):
+            self.ensure_models()
+            if not self.emotion_classifier:
+                return [None] * len(positions)
+            batch_results = self.emotion_classifier(
+                [as_text(texts[i]) for i in positions],
+                batch_size=batch_size or Config.INFERENCE_BATCH_SIZE
+            )
+            return EmotionResult.from_pipeline(batch_results, self.EMOTION_MAPPING)
+        
+        try:
+            results = get_result_cache().get_or_compute_many(keys, classify)
+        except Exception as e:
+            logging.error(f"Batch emotion detection error: {str(e)}")
+            results = [None] * len(texts)
+        
+        return [EmotionResult.from_value(result) or default_emotion() for result in results]
     
     def get_mood_emoji(self, emotion):
         """Get emoji for detected emotion"""
@@ -77,22 +243,198 @@ class MoodDetector:
     
     def analyze_sentiment_intensity(self, text):
         """Analyze sentiment intensity for more nuanced responses"""
-        if not text or not self.sentiment_classifier:
+        if not text:
             return {"label": "NEUTRAL", "score": 0.5}
         
         try:
-            results = self.sentiment_classifier(text)
-            if results and len(results) > 0:
-                return max(results[0], key=lambda x: x['score'])
+            result = get_result_cache().get_or_compute(text_key("sentiment", text),
+                                                       lambda: self._classify_sentiment(as_text(text)))
+            if result is not None:
+                return result
         except Exception as e:
             logging.error(f"Sentiment analysis error: {str(e)}")
         
         return {"label": "NEUTRAL", "score": 0.5}
     
+    def _classify_sentiment(self, text):
+        """Run the sentiment model; None when it is not available"""
+        self.ensure_models()
+        if not self.sentiment_classifier:
+            return None
+        
+        results = self.sentiment_classifier(text)
+        if results and len(results) > 0:
+            return max(results[0], key=lambda x: x['score'])
+        return None
+    
+    def analyze_sentiments(self, texts, batch_size=None):
+        """Analyze sentiment for several texts, running the model once on the cache misses"""
+        keys = [text_key("sentiment", text) if text else None for text in texts]
+        
+        def classify(positions):
+            self.ensure_models()
+            if not self.sentiment_classifier:
+                return [None] * len(positions)
+            batch_results = self.sentiment_classifier(
+                [as_text(texts[i]) for i in positions],
+                batch_size=batch_size or Config.INFERENCE_BATCH_SIZE
+            )
+            return [max(scores, key=lambda x: x['score']) for scores in batch_results]
+        
+        try:
+            results = get_result_cache().get_or_compute_many(keys, classify)
+        except Exception as e:
+            logging.error(f"Batch sentiment analysis error: {str(e)}")
+            results = [None] * len(texts)
+        
+        return [result or {"label": "NEUTRAL", "score": 0.5} for result in results]
+    
+    def analyze(self, text, context=None):
+        """Emotion and sentiment for one text in one fused pass; see analyze_batch
+
+        The fused pass runs under the result cache's in-flight coalescing, on
+        the emotion key, so concurrent sessions sending the same text share one
+        run; the leader stores the sentiment half for the others. With a
+        session ``context`` that keeps turns, the emotion is scored in context
+        instead (see detect_emotion_in_context) and only the sentiment is
+        scored on the message alone.
+        """
+        if not text:
+            return self.analyze_batch([text])[0]
+        if context is not None and context.turns > 0:
+            return {"mood": self.detect_emotion_in_context(text, context),
+                    "sentiment": self.analyze_sentiment_intensity(text)}
+        
+        cache = get_result_cache()
+        fused_sentiment = []
+        
+        def classify():
+            fused = self._classify_both([as_text(text)])
+            if fused is None:
+                return None
+            mood, sentiment = fused[0]
+            cache.set(text_key("sentiment", text), sentiment)
+            fused_sentiment.append(sentiment)
+            return mood
+        
+        try:
+            mood = cache.get_or_compute(text_key("emotion", text), classify)
+        except Exception as e:
+            logging.error(f"Fused analysis error: {str(e)}")
+            mood = None
+        
+        # Halves not produced here (a cache hit, a follower, or models that
+        # cannot be run directly) come from the single-model paths, which
+        # read the cache and coalesce too
+        return {"mood": self.detect_emotion(text) if mood is None else EmotionResult.from_value(mood),
+                "sentiment": fused_sentiment[0] if fused_sentiment else self.analyze_sentiment_intensity(text)}
+    
+    def analyze_batch(self, texts, batch_size=None):
+        """Emotion and sentiment for several texts, merged per text
+
+        Returns {"mood": <emotion result>, "sentiment": {"label", "score"}} for
+        each text. Halves already in the result cache are reused. The rest go
+        through one pass that tokenizes each batch once, when the two models
+        share a vocabulary, and runs both models on the same tensors. Models
+        that cannot be run directly fall back to the two separate calls.
+        Like ResultCache.get_or_compute_many, batches are not coalesced with
+        concurrent callers; analyze() is.
+        """
+        cache = get_result_cache()
+        emotion_keys = [text_key("emotion", text) if text else None for text in texts]
+        sentiment_keys = [text_key("sentiment", text) if text else None for text in texts]
+        moods = [EmotionResult.from_value(cache.get(key)) if key else None for key in emotion_keys]
+        sentiments = [cache.get(key) if key else None for key in sentiment_keys]
+        missing = [i for i, text in enumerate(texts) if text and (moods[i] is None or sentiments[i] is None)]
+        
+        if missing:
+            try:
+                fused = self._classify_both([as_text(texts[i]) for i in missing], batch_size)
+            except Exception as e:
+                logging.error(f"Fused analysis error: {str(e)}")
+                fused = None
+            
+            if fused is None:
+                missing_texts = [texts[i] for i in missing]
+                fused = zip(self.detect_emotions(missing_texts, batch_size),
+                            self.analyze_sentiments(missing_texts, batch_size))
+            else:
+                for i, (mood, sentiment) in zip(missing, fused):
+                    cache.set(emotion_keys[i], mood)
+                    cache.set(sentiment_keys[i], sentiment)
+            
+            for i, (mood, sentiment) in zip(missing, fused):
+                moods[i] = moods[i] or mood
+                sentiments[i] = sentiments[i] or sentiment
+        
+        return [{"mood": mood or default_emotion(), "sentiment": sentiment or {"label": "NEUTRAL", "score": 0.5}}
+                for mood, sentiment in zip(moods, sentiments)]
+    
+    def _shares_vocabulary(self):
+        """Whether both models' tokenizers give the same ids for any text, checked once"""
+        if self._shared_vocabulary is None:
+            try:
+                first = self.emotion_classifier.tokenizer
+                second = self.sentiment_classifier.tokenizer
+                self._shared_vocabulary = (type(first) is type(second)
+                                           and first.all_special_ids == second.all_special_ids
+                                           and first.get_vocab() == second.get_vocab())
+            except Exception:
+                self._shared_vocabulary = False
+        return self._shared_vocabulary
+    
+    def _classify_both(self, texts, batch_size=None):
+        """Run both models on texts, sharing tokenization when possible
+
+        Returns [(emotion result, sentiment), ...], or None when the loaded
+        models cannot be run directly.
+        """
+        self.ensure_models()
+        emotion_model = getattr(self.emotion_classifier, "model", None)
+        sentiment_model = getattr(self.sentiment_classifier, "model", None)
+        if emotion_model is None or sentiment_model is None:
+            return None
+        
+        import torch
+        
+        emotion_tokenizer = self.emotion_classifier.tokenizer
+        sentiment_tokenizer = self.sentiment_classifier.tokenizer
+        shared = self._shares_vocabulary()
+        emotion_max_length = emotion_tokenizer.model_max_length
+        sentiment_max_length = sentiment_tokenizer.model_max_length
+        if shared:
+            # The same tensors go to both models, so they must fit the shorter limit
+            emotion_max_length = min(emotion_max_length, sentiment_max_length)
+        step = batch_size or Config.INFERENCE_BATCH_SIZE
+        
+        def run(model, encoded):
+            return model(input_ids=encoded["input_ids"].to(model.device),
+                         attention_mask=encoded["attention_mask"].to(model.device)).logits
+        
+        results = []
+        with torch.no_grad():
+            for start in range(0, len(texts), step):
+                batch = texts[start:start + step]
+                encoded = emotion_tokenizer(batch, padding=True, truncation=True, max_length=emotion_max_length,
+                                            return_tensors="pt")
+                emotion_logits = run(emotion_model, encoded)
+                if not shared:
+                    encoded = sentiment_tokenizer(batch, padding=True, truncation=True,
+                                                  max_length=sentiment_max_length, return_tensors="pt")
+                sentiment_logits = run(sentiment_model, encoded)
+                
+                moods = EmotionResult.from_pipeline(self._label_scores(emotion_model, emotion_logits),
+                                                    self.EMOTION_MAPPING)
+                sentiments = [max(scores, key=lambda x: x['score'])
+                              for scores in self._label_scores(sentiment_model, sentiment_logits)]
+                results.extend(zip(moods, sentiments))
+        return results
+    
     def detect_crisis_indicators(self, text):
         """Check for crisis-related keywords in the text"""
         if not text:
             return False
         
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in Config.CRISIS_KEYWORDS)
+        # A PreparedText has been normalized already
+        normalized = text.normalized if isinstance(text, PreparedText) else normalize(text)
+        return CRISIS_PATTERN.search(normalized) is not None
@@ -0,0 +1,152 @@
+from array import array
+from datetime import datetime
+
+from config import Config
+
+# Fixed emotion codes used in the compact history arrays
+EMOTIONS = tuple(Config.MOOD_EMOJIS.keys())
+EMOTION_CODES = {emotion: code for code, emotion in enumerate(EMOTIONS)}
+NEGATIVE_EMOTIONS = frozenset(Config.NEGATIVE_EMOTIONS)
+_NEGATIVE = tuple(emotion in NEGATIVE_EMOTIONS for emotion in EMOTIONS)
+
+
+def emotion_code(emotion):
+    """Get the compact code for an emotion, treating unknown ones as normal"""
+    return EMOTION_CODES.get(emotion, EMOTION_CODES["normal"])
+
+
+class MoodHistory:
+    """Fixed-capacity ring buffer of moods with running trend aggregates
+
+    Emotions are stored as small integer codes, confidences as float32 and
+    timestamps as epoch seconds. Counts over the whole buffer and over the
+    trend window (the last ``trend_window`` moods, split into two halves) are
+    updated on every append and eviction, so reading the trend never rescans
+    the history.
+    """
+
+    def __init__(self, capacity=None, trend_window=None):
+        self.capacity = capacity or Config.MOOD_HISTORY_CAPACITY
+        self.trend_window = min(trend_window or Config.MOOD_TREND_WINDOW, self.capacity)
+        self.codes = array('b', [0]) * self.capacity
+        self.confidences = array('f', [0.0]) * self.capacity
+        self.timestamps = array('d', [0.0]) * self.capacity
+        self.start = 0
+        self.size = 0
+
+        self.counts = [0] * len(EMOTIONS)
+        self.window_counts = [0] * len(EMOTIONS)
+        self.window_negative = 0
+        self.first_half_negative = 0
+
+    def __len__(self):
+        return self.size
+
+    def __bool__(self):
+        return self.size > 0
+
+    def _slot(self, index):
+        """Physical slot of the index-th oldest entry"""
+        return (self.start + index) % self.capacity
+
+    def _code_at(self, index):
+        return self.codes[self._slot(index)]
+
+    def append(self, emotion, confidence, timestamp=None):
+        """Add a mood, evicting the oldest one when the buffer is full"""
+        if timestamp is None:
+            timestamp = datetime.now()
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.timestamp()
+
+        code = emotion_code(emotion)
+        self._update_window(code)
+
+        if self.size == self.capacity:
+            self.counts[self.codes[self.start]] -= 1
+            slot = self.start
+            self.start = (self.start + 1) % self.capacity
+        else:
+            slot = self._slot(self.size)
+            self.size += 1
+
+        self.codes[slot] = code
+        self.confidences[slot] = confidence
+        self.timestamps[slot] = timestamp
+        self.counts[code] += 1
+
+    def _update_window(self, code):
+        """Slide the trend window forward by one mood before it is stored"""
+        width = min(self.size, self.trend_window)
+        half = width // 2
+        window_start = self.size - width
+
+        if width == self.trend_window:
+            # The oldest mood leaves the first half and the first mood of the
+            # second half moves into it
+            leaving = self._code_at(window_start)
+            moving = self._code_at(window_start + half)
+            self.window_counts[leaving] -= 1
+            self.window_negative -= _NEGATIVE[leaving]
+            self.first_half_negative += _NEGATIVE[moving] - _NEGATIVE[leaving]
+        elif (width + 1) // 2 > half:
+            # The window grows and its midpoint shifts by one
+            self.first_half_negative += _NEGATIVE[self._code_at(window_start + half)]
+
+        self.window_counts[code] += 1
+        self.window_negative += _NEGATIVE[code]
+
+    def entry(self, index):
+        """Get one mood as a dict, oldest first, supporting negative indices"""
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("mood history index out of range")
+        slot = self._slot(index)
+        return {
+            "timestamp": datetime.fromtimestamp(self.timestamps[slot]),
+            "emotion": EMOTIONS[self.codes[slot]],
+            "confidence": float(self.confidences[slot])
+        }
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.entry(i) for i in range(*key.indices(self.size))]
+        return self.entry(key)
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield self.entry(i)
+
+    def recent(self, count):
+        """Get the most recent moods, oldest first"""
+        return self[-count:] if count else []
+
+    def latest(self):
+        """Get the most recent mood, or None if empty"""
+        return self.entry(-1) if self.size else None
+
+    def distribution(self, window_only=True):
+        """Emotion counts over the trend window or the whole buffer"""
+        counts = self.window_counts if window_only else self.counts
+        return {EMOTIONS[code]: count for code, count in enumerate(counts) if count}
+
+    def dominant_mood(self, window_only=True):
+        """Most frequent emotion over the trend window or the whole buffer"""
+        counts = self.window_counts if window_only else self.counts
+        if not any(counts):
+            return "normal"
+        return EMOTIONS[max(range(len(counts)), key=counts.__getitem__)]
+
+    def trend(self):
+        """Compare negative moods in the two halves of the trend window"""
+        width = min(self.size, self.trend_window)
+        if width < 5:
+            return "stable"
+
+        second_half_negative = self.window_negative - self.first_half_negative
+        if second_half_negative < self.first_half_negative:
+            return "improving"
+        if second_half_negative > self.first_half_negative:
+            return "concerning"
+        return "stable"
@@ -0,0 +1,164 @@
+import math
+import time
+from datetime import datetime
+
+from config import Config
+from mood_history import EMOTIONS, EMOTION_CODES, NEGATIVE_EMOTIONS
+
+
+class MoodTrend:
+    """Read-only summary of a user's mood trend"""
+    __slots__ = ("trend", "dominant_mood", "short_term_negativity", "long_term_negativity",
+                 "emotion_levels", "last_change", "observations")
+
+    def __init__(self, trend, dominant_mood, short_term_negativity, long_term_negativity,
+                 emotion_levels, last_change, observations):
+        self.trend = trend
+        self.dominant_mood = dominant_mood
+        self.short_term_negativity = short_term_negativity
+        self.long_term_negativity = long_term_negativity
+        self.emotion_levels = emotion_levels
+        self.last_change = last_change
+        self.observations = observations
+
+    @property
+    def has_data(self):
+        return self.observations >= Config.MOOD_TREND_MIN_OBSERVATIONS
+
+    def describe_change(self):
+        """Human-readable note about the most recent detected shift, if any"""
+        if not self.last_change:
+            return None
+        when = datetime.fromtimestamp(self.last_change["timestamp"]).strftime("%B %d")
+        direction = "more difficult" if self.last_change["direction"] == "up" else "lighter"
+        return f"Your mood shifted to {direction} around {when}"
+
+
+class MoodTrendEngine:
+    """Online mood trend tracking with constant state per user
+
+    Keeps time-decayed moving averages of each emotion and of a negativity
+    signal (the confidence of negative moods, 0 otherwise) at a short and a
+    long horizon. A two-sided Page-Hinkley test on the negativity signal,
+    measured against the long-horizon average, flags sustained shifts.
+    """
+
+    def __init__(self, short_half_life=None, long_half_life=None, delta=None, threshold=None):
+        self.short_half_life = short_half_life or Config.MOOD_TREND_SHORT_HALF_LIFE
+        self.long_half_life = long_half_life or Config.MOOD_TREND_LONG_HALF_LIFE
+        self.delta = Config.MOOD_TREND_CHANGE_DELTA if delta is None else delta
+        self.threshold = threshold or Config.MOOD_TREND_CHANGE_THRESHOLD
+
+        self.observations = 0
+        self.last_timestamp = None
+        self.emotion_levels = [0.0] * len(EMOTIONS)
+        self.short_negativity = 0.0
+        self.long_negativity = 0.0
+        self.increase_sum = 0.0
+        self.decrease_sum = 0.0
+        self.last_change = None
+
+    def _decay(self, elapsed, half_life):
+        """Weight kept by the old average after ``elapsed`` seconds"""
+        return math.exp(-math.log(2) * max(elapsed, 0.0) / half_life)
+
+    def update(self, emotion, confidence, timestamp=None):
+        """Feed one mood observation"""
+        if timestamp is None:
+            timestamp = time.time()
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.timestamp()
+
+        code = EMOTION_CODES.get(emotion, EMOTION_CODES["normal"])
+        negativity = float(confidence) if emotion in NEGATIVE_EMOTIONS else 0.0
+
+        if self.observations == 0:
+            self.emotion_levels[code] = 1.0
+            self.short_negativity = self.long_negativity = negativity
+        else:
+            elapsed = timestamp - self.last_timestamp
+            # Each observation moves the averages at least a little, even in quick bursts
+            keep_short = min(self._decay(elapsed, self.short_half_life), Config.MOOD_TREND_SHORT_MAX_KEEP)
+            keep_long = min(self._decay(elapsed, self.long_half_life), Config.MOOD_TREND_LONG_MAX_KEEP)
+
+            for i in range(len(self.emotion_levels)):
+                self.emotion_levels[i] *= keep_short
+            self.emotion_levels[code] += 1.0 - keep_short
+
+            self.short_negativity = keep_short * self.short_negativity + (1.0 - keep_short) * negativity
+            baseline = self.long_negativity
+            self.long_negativity = keep_long * self.long_negativity + (1.0 - keep_long) * negativity
+            self._detect_change(negativity - baseline, timestamp)
+
+        self.observations += 1
+        self.last_timestamp = timestamp
+
+    def _detect_change(self, deviation, timestamp):
+        self.increase_sum = max(0.0, self.increase_sum + deviation - self.delta)
+        self.decrease_sum = max(0.0, self.decrease_sum - deviation - self.delta)
+
+        direction = None
+        if self.increase_sum > self.threshold:
+            direction = "up"
+        elif self.decrease_sum > self.threshold:
+            direction = "down"
+
+        if direction:
+            self.last_change = {"timestamp": timestamp, "direction": direction}
+            self.increase_sum = self.decrease_sum = 0.0
+            # Restart the baseline at the new level so the same shift is not reported twice
+            self.long_negativity = self.short_negativity
+
+    def current(self):
+        """Get the current trend without looking at any history"""
+        if self.observations < Config.MOOD_TREND_MIN_OBSERVATIONS:
+            trend = "stable"
+        else:
+            difference = self.short_negativity - self.long_negativity
+            recent_change = (self.last_change is not None and self.last_timestamp - self.last_change["timestamp"]
+                             < self.short_half_life)
+            if (recent_change and self.last_change["direction"] == "up") or difference > Config.MOOD_TREND_MARGIN:
+                trend = "concerning"
+            elif (recent_change and self.last_change["direction"] == "down") or difference < -Config.MOOD_TREND_MARGIN:
+                trend = "improving"
+            else:
+                trend = "stable"
+
+        dominant = max(range(len(EMOTIONS)), key=self.emotion_levels.__getitem__) if self.observations else None
+        return MoodTrend(
+            trend=trend,
+            dominant_mood=EMOTIONS[dominant] if dominant is not None else "normal",
+            short_term_negativity=self.short_negativity,
+            long_term_negativity=self.long_negativity,
+            emotion_levels={emotion: level for emotion, level in zip(EMOTIONS, self.emotion_levels) if level > 0.005},
+            last_change=self.last_change,
+            observations=self.observations
+        )
+
+    def to_dict(self):
+        """Serializable engine state"""
+        return {
+            "observations": self.observations,
+            "last_timestamp": self.last_timestamp,
+            "emotion_levels": dict(zip(EMOTIONS, self.emotion_levels)),
+            "short_negativity": self.short_negativity,
+            "long_negativity": self.long_negativity,
+            "increase_sum": self.increase_sum,
+            "decrease_sum": self.decrease_sum,
+            "last_change": self.last_change,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Restore an engine saved with to_dict()"""
+        engine = cls()
+        engine.observations = state["observations"]
+        engine.last_timestamp = state["last_timestamp"]
+        levels = state.get("emotion_levels", {})
+        engine.emotion_levels = [float(levels.get(emotion, 0.0)) for emotion in EMOTIONS]
+        engine.short_negativity = state["short_negativity"]
+        engine.long_negativity = state["long_negativity"]
+        engine.increase_sum = state["increase_sum"]
+        engine.decrease_sum = state["decrease_sum"]
+        engine.last_change = state.get("last_change")
+        return engine
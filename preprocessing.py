@@ -0,0 +1,108 @@
+import re
+import hashlib
+import unicodedata
+
+_TAG_PATTERN = re.compile(r'<[^>]+>')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+_WORD_PATTERN = re.compile(r"\w+(?:'\w+)?")
+
+MAX_MESSAGE_LENGTH = 1000
+
+# Typographic characters folded to their ASCII form, so "can’t" matches "can't"
+_FOLD_TABLE = str.maketrans({"‘": "'", "’": "'", "“": '"', "”": '"', "–": "-", "—": "-"})
+
+# Common function words of the Latin-script languages the crisis locales cover
+_STOPWORDS = {
+    "en": {"the", "and", "is", "i", "to", "it", "my", "of", "you", "that", "feel", "am", "with", "me"},
+    "es": {"el", "la", "y", "es", "yo", "que", "de", "mi", "me", "no", "estoy", "con", "muy", "siento"},
+    "fr": {"le", "la", "et", "est", "je", "que", "de", "mon", "ma", "ne", "pas", "suis", "avec", "très"},
+}
+# Unicode name prefixes of non-Latin scripts and the language they most likely mean here
+_SCRIPTS = (("DEVANAGARI", "hi"), ("ARABIC", "ar"), ("CYRILLIC", "ru"), ("HANGUL", "ko"),
+            ("HIRAGANA", "ja"), ("KATAKANA", "ja"), ("CJK", "zh"))
+
+
+def sanitize(text):
+    """Strip HTML tags and limit length"""
+    if not text:
+        return ""
+
+    # Remove potential HTML/script tags for safety
+    text = _TAG_PATTERN.sub('', text)
+
+    # Limit length
+    if len(text) > MAX_MESSAGE_LENGTH:
+        text = text[:MAX_MESSAGE_LENGTH] + "..."
+
+    return text.strip()
+
+
+def normalize(text):
+    """Unicode-normalized, case-folded text with single spaces, for matching"""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKC", text).translate(_FOLD_TABLE)
+    text = text.casefold()
+    return _WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def content_hash(text):
+    """Short, fast hash of the exact text, used in cache keys and logs"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def language_hint(normalized, words):
+    """Best-guess language code, or "und" when there is no clear signal"""
+    for char in normalized:
+        if char.isalpha() and ord(char) > 0x24F:
+            name = unicodedata.name(char, "")
+            for prefix, language in _SCRIPTS:
+                if name.startswith(prefix):
+                    return language
+            break
+
+    scores = {language: sum(word in stopwords for word in words) for language, stopwords in _STOPWORDS.items()}
+    language, score = max(scores.items(), key=lambda item: item[1])
+    return language if score else "und"
+
+
+class PreparedText:
+    """A message after the one preprocessing pass it gets, shared by every later stage
+
+    ``text`` is what the models see and what is stored; ``normalized`` is for
+    keyword matching; ``content_hash`` identifies ``text`` in caches and logs.
+    Instances are immutable.
+    """
+    __slots__ = ("text", "normalized", "content_hash", "token_estimate", "language_hint")
+
+    def __init__(self, text, normalized, content_hash, token_estimate, language_hint):
+        for name, value in zip(self.__slots__, (text, normalized, content_hash, token_estimate, language_hint)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PreparedText is immutable")
+
+    def __str__(self):
+        return self.text
+
+    def __bool__(self):
+        return bool(self.text)
+
+    def __repr__(self):
+        return (f"PreparedText(hash={self.content_hash}, tokens~{self.token_estimate}, "
+                f"language={self.language_hint})")
+
+
+def prepare_text(raw):
+    """Run the preprocessing pass once for a message"""
+    text = sanitize(raw)
+    normalized = normalize(text)
+    words = _WORD_PATTERN.findall(normalized)
+    # Subword tokenizers average a bit over one token per word; scripts without
+    # spaces are closer to one token per few characters
+    token_estimate = max(len(words) * 4 // 3, len(normalized) // 4)
+    return PreparedText(text, normalized, content_hash(text), token_estimate, language_hint(normalized, words))
+
+
+def as_text(value):
+    """The model input for a PreparedText or a plain string"""
+    return value.text if isinstance(value, PreparedText) else value
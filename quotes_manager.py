@@ -1,27 +1,49 @@
-import json
 import random
+import hashlib
 import streamlit as st
 from datetime import date
-import logging
+from config import Config
+from utils import persist
+from result_cache import get_result_cache
+from data_catalog import get_catalog, require_fields, SchemaError
+
+def prepare_quotes(data):
+    """Validate quote data and give every quote a stable id derived from its category and content"""
+    if not isinstance(data, dict) or not data:
+        raise SchemaError("quotes: expected a non-empty object of categories")
+    
+    prepared = {}
+    for category, quotes in data.items():
+        if not isinstance(quotes, list):
+            raise SchemaError(f"quotes.{category}: expected a list")
+        
+        prepared[category] = []
+        for i, quote in enumerate(quotes):
+            require_fields(quote, ("text", "author"), f"quotes.{category}[{i}]")
+            quote = dict(quote)
+            if 'id' not in quote:
+                digest = hashlib.sha1(f"{quote['text']}|{quote['author']}".encode('utf-8')).hexdigest()
+                quote['id'] = f"{category}-{digest[:10]}"
+            prepared[category].append(quote)
+    
+    return prepared
 
 class QuotesManager:
     def __init__(self, quotes_file="data/quotes.json"):
         self.quotes_file = quotes_file
-        self.quotes = self.load_quotes()
+        self.snapshot = self.load_quotes()
+        self.quotes = self.snapshot.data
         self.initialize_favorites()
     
     def load_quotes(self):
-        """Load quotes from JSON file"""
-        try:
-            with open(self.quotes_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            logging.warning(f"Quotes file {self.quotes_file} not found. Using default quotes.")
-            return self.get_default_quotes()
-        except json.JSONDecodeError:
-            logging.error(f"Error parsing quotes file {self.quotes_file}")
-            return self.get_default_quotes()
+        """Get the shared, read-only snapshot of the quotes file"""
+        return get_catalog().load(self.quotes_file, prepare_quotes, self.get_default_quotes)
     
+    @property
+    def data_version(self):
+        """Version tag of the loaded quote data, used to key rendering caches"""
+        return self.snapshot.version
+
     def get_default_quotes(self):
         """Return default quotes if file loading fails"""
         return {
@@ -55,9 +77,19 @@ class QuotesManager:
     
     def get_daily_quote(self):
         """Get quote of the day based on current date"""
-        # Use date as seed for consistent daily quote
+        # The pick goes through the result cache, so every replica shows the same quote
         today = date.today()
-        random.seed(today.toordinal())
+        daily_quote = get_result_cache().get_or_compute(
+            f"daily_quote:{today.isoformat()}", lambda: self._pick_daily_quote(today), ttl=Config.DAILY_QUOTE_TTL
+        )
+        if daily_quote:
+            return daily_quote
+        
+        return {"text": "Every day is a new opportunity to grow and heal.", "author": "MindMate"}
+    
+    def _pick_daily_quote(self, day):
+        # Use date as seed for consistent daily quote, without touching the shared random state
+        rng = random.Random(day.toordinal())
         
         # Get all quotes from all categories
         all_quotes = []
@@ -65,12 +97,8 @@ class QuotesManager:
             all_quotes.extend(category)
         
         if all_quotes:
-            daily_quote = random.choice(all_quotes)
-            # Reset random seed
-            random.seed()
-            return daily_quote
-        
-        return {"text": "Every day is a new opportunity to grow and heal.", "author": "MindMate"}
+            return dict(rng.choice(all_quotes))
+        return None
     
     def get_random_quote(self, category=None):
         """Get a random quote, optionally from specific category"""
@@ -89,16 +117,19 @@ class QuotesManager:
     
     def add_to_favorites(self, quote):
         """Add quote to favorites"""
-        if quote not in st.session_state.favorite_quotes:
-            st.session_state.favorite_quotes.append(quote)
+        if not self.is_favorite(quote):
+            st.session_state.favorite_quotes.append(dict(quote))
+            persist("add_favorite", quote)
             return True
         return False
     
     def remove_from_favorites(self, quote):
         """Remove quote from favorites"""
-        if quote in st.session_state.favorite_quotes:
-            st.session_state.favorite_quotes.remove(quote)
-            return True
+        for favorite in st.session_state.favorite_quotes:
+            if self._same_quote(favorite, quote):
+                st.session_state.favorite_quotes.remove(favorite)
+                persist("remove_favorite", favorite)
+                return True
         return False
     
     def get_favorites(self):
@@ -107,7 +138,18 @@ class QuotesManager:
     
     def is_favorite(self, quote):
         """Check if quote is in favorites"""
-        return quote in st.session_state.favorite_quotes
+        return any(self._same_quote(favorite, quote) for favorite in st.session_state.favorite_quotes)
+    
+    @staticmethod
+    def _same_quote(first, second):
+        """Compare quotes by id when both have one, otherwise by content"""
+        if 'id' in first and 'id' in second:
+            return first['id'] == second['id']
+        return first['text'] == second['text'] and first['author'] == second['author']
+    
+    def get_category_quotes(self, category):
+        """Get quotes for a single category"""
+        return self.quotes.get(category, [])
     
     def get_quote_categories(self):
         """Get all available quote categories"""
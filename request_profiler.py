@@ -0,0 +1,154 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from config import Config
+from preprocessing import content_hash
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval into collapsed stacks
+
+    Only the sampled thread's frames are read, from a separate thread, so the
+    profiled code runs unmodified.
+    """
+
+    def __init__(self, thread_id, interval=None):
+        self.thread_id = thread_id
+        self.interval = interval or Config.PROFILE_SAMPLE_INTERVAL
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        """Stacks in the collapsed format read by flamegraph.pl and speedscope"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def should_profile(force=False):
+    """Whether to profile this request: forced, or picked by the sample rate"""
+    return force or (Config.PROFILE_SAMPLE_RATE > 0 and random.random() < Config.PROFILE_SAMPLE_RATE)
+
+
+def _prune(directory, keep):
+    """Delete the oldest profiles (and their metadata) beyond ``keep``"""
+    profiles = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith((".collapsed", ".prof"))),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in profiles[:max(0, len(profiles) - keep)]:
+        base = os.path.splitext(entry.path)[0]
+        for path in (entry.path, base + ".json"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _write(session_id, profile, profile_format, elapsed_ms, details):
+    directory = Config.PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    # Profiles are shared for analysis, so they name the session only by a hash of its id
+    session = content_hash(session_id)
+    base = os.path.join(directory, f"{stamp}-{session[:12]}-{elapsed_ms:.0f}ms-{os.getpid()}")
+    if profile_format == "pstats":
+        profile.dump_stats(base + ".prof")
+    else:
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            f.write(profile.collapsed())
+
+    metadata = {"session": session, "timestamp": time.time(), "elapsed_ms": elapsed_ms,
+                "format": profile_format}
+    metadata.update(details)
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+
+    _prune(directory, Config.PROFILE_MAX_FILES)
+
+
+# cProfile hooks the interpreter (process-wide through sys.monitoring on 3.12+),
+# so only one request holds it at a time
+_cprofile_lock = threading.Lock()
+
+
+def _start_cprofile():
+    """An enabled cProfile.Profile, or None when another profile or tool holds the hook"""
+    if not _cprofile_lock.acquire(blocking=False):
+        return None
+    import cProfile
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError as e:
+        _cprofile_lock.release()
+        logging.info(f"cProfile unavailable, sampling instead: {str(e)}")
+        return None
+    return profile
+
+
+@contextmanager
+def profile_request(session_id, force=False, details=None):
+    """Profile the enclosed block when this request is sampled
+
+    Writes a collapsed-stack (sampling) or pstats (cProfile) file to
+    Config.PROFILE_DIR, plus a JSON file with a hash of the session id, total
+    time and whatever ``details()`` returns at the end, e.g. stage timings.
+    The block may end in an exception, such as Streamlit's rerun, and is still
+    recorded. One pstats profile runs at a time; overlapping requests, or a
+    cProfile hook already taken by another tool, get the stack sampler
+    instead. Yields whether the request is being profiled.
+    """
+    if not should_profile(force):
+        yield False
+        return
+
+    profile_format = Config.PROFILE_FORMAT
+    profile = _start_cprofile() if profile_format == "pstats" else None
+    if profile is None:
+        profile_format = "collapsed"
+        profile = StackSampler(threading.get_ident())
+        profile.start()
+
+    start = time.perf_counter()
+    try:
+        yield True
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if profile_format == "pstats":
+            profile.disable()
+            _cprofile_lock.release()
+        else:
+            profile.stop()
+        try:
+            _write(session_id, profile, profile_format, elapsed_ms, details() if details else {})
+        except Exception as e:
+            logging.warning(f"Could not write request profile: {str(e)}")
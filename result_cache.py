@@ -0,0 +1,427 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+import threading
+import socketserver
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from config import Config
+from emotion_result import json_default
+from preprocessing import PreparedText, content_hash
+
+
+def text_key(kind, text):
+    """Cache key for a result computed from a text
+
+    The model name is part of the key, so switching models never serves
+    results from the old one. A PreparedText brings its hash along, so the
+    text is not hashed again.
+    """
+    model = Config.SENTIMENT_MODEL if kind == "sentiment" else Config.EMOTION_MODEL
+    digest = text.content_hash if isinstance(text, PreparedText) else content_hash(text)
+    return f"{kind}:{model}:{digest}"
+
+
+class MemoryBackend:
+    """In-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or Config.RESULT_CACHE_MAX_ENTRIES
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at and expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl if ttl else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def close(self):
+        pass
+
+
+class NullBackend:
+    """Caches nothing; used to turn the cache off, e.g. for benchmarks"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteBackend:
+    """Cache table in a SQLite file that replicas share, e.g. on a shared volume"""
+
+    def __init__(self, path=None):
+        self.path = path or Config.RESULT_CACHE_DB
+        self._local = threading.local()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS result_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+
+    def _conn(self):
+        """One connection per thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM result_cache WHERE key = ? AND (expires_at IS NULL OR expires_at >= ?)",
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl=None):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO result_cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl if ttl else None)
+        )
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM result_cache WHERE key = ?", (key,))
+
+    def purge_expired(self):
+        self._conn().execute("DELETE FROM result_cache WHERE expires_at < ?", (time.time(),))
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class RedisBackend:
+    """Minimal client for any server speaking the Redis protocol (GET, SET EX, DEL)
+
+    Only uses the standard library, so no redis package is needed.
+    """
+
+    def __init__(self, url=None, timeout=None):
+        url = urlparse(url or Config.RESULT_CACHE_URL)
+        self.host = url.hostname or "localhost"
+        self.port = url.port or 6379
+        self.password = url.password
+        self.db = int(url.path.lstrip("/") or 0)
+        self.timeout = timeout or Config.RESULT_CACHE_TIMEOUT
+        self._local = threading.local()
+
+    def _connection(self):
+        """One connection per thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            conn = self._local.conn = (sock, sock.makefile("rb"))
+            if self.password:
+                self._command("AUTH", self.password)
+            if self.db:
+                self._command("SELECT", str(self.db))
+        return conn
+
+    def _command(self, *args):
+        sock, reader = self._connection()
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg.encode("utf-8") if isinstance(arg, str) else arg
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        try:
+            sock.sendall(b"".join(parts))
+            return self._read_reply(reader)
+        except OSError:
+            self.close()
+            raise
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by the cache server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RuntimeError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            return reader.read(length + 2)[:-2].decode("utf-8")
+        if kind == b"*":
+            return [self._read_reply(reader) for _ in range(int(payload))]
+        raise RuntimeError(f"Unexpected reply from the cache server: {line!r}")
+
+    def get(self, key):
+        return self._command("GET", key)
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self._command("SET", key, value, "EX", str(int(ttl)))
+        else:
+            self._command("SET", key, value)
+
+    def delete(self, key):
+        self._command("DEL", key)
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            sock, reader = conn
+            reader.close()
+            sock.close()
+            self._local.conn = None
+
+
+class _StandInHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        store = self.server.store
+        while True:
+            try:
+                command = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if command is None:
+                return
+            name, args = command[0].upper(), command[1:]
+            if name == b"GET":
+                value = store.get(args[0])
+                self.wfile.write(b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value))
+            elif name == b"SET":
+                ttl = int(args[3]) if len(args) > 3 and args[2].upper() == b"EX" else None
+                store.set(args[0], args[1], ttl)
+                self.wfile.write(b"+OK\r\n")
+            elif name == b"DEL":
+                store.delete(args[0])
+                self.wfile.write(b":1\r\n")
+            elif name in (b"PING", b"AUTH", b"SELECT"):
+                self.wfile.write(b"+PONG\r\n" if name == b"PING" else b"+OK\r\n")
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            raise ValueError("Expected an array")
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+
+class LocalRedisStandIn(socketserver.ThreadingTCPServer):
+    """Small in-process server speaking enough of the Redis protocol for RedisBackend
+
+    For tests and local development where no Redis server is available:
+
+        server = LocalRedisStandIn()
+        server.start()
+        cache = ResultCache(RedisBackend(server.url))
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0):
+        super().__init__((host, port), _StandInHandler)
+        self.store = MemoryBackend()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="redis-stand-in", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResultCache:
+    """JSON result cache in front of a pluggable backend, with request coalescing
+
+    Concurrent misses on the same key within this process wait for the first
+    caller's computation instead of running their own. Backend errors are
+    logged and treated as misses, and the backend is skipped for
+    ``retry_after`` seconds, so a cache outage never slows analysis down.
+    """
+
+    def __init__(self, backend, ttl=None, retry_after=None):
+        self.backend = backend
+        self.ttl = Config.RESULT_CACHE_TTL if ttl is None else ttl
+        self.retry_after = Config.RESULT_CACHE_RETRY_AFTER if retry_after is None else retry_after
+        self._unavailable_until = 0.0
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _backend_failed(self, action, error):
+        logging.warning(f"Result cache {action} failed, skipping the cache for {self.retry_after}s: {str(error)}")
+        self._unavailable_until = time.monotonic() + self.retry_after
+
+    def get(self, key):
+        if time.monotonic() < self._unavailable_until:
+            return None
+        try:
+            raw = self.backend.get(key)
+        except Exception as e:
+            self._backend_failed("read", e)
+            return None
+        if raw is None:
+            return None
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        if time.monotonic() < self._unavailable_until:
+            return
+        try:
+            self.backend.set(key, json.dumps(value, default=json_default), self.ttl if ttl is None else ttl)
+        except Exception as e:
+            self._backend_failed("write", e)
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """Return the cached value for key, computing and storing it on a miss
+
+        compute() returns None, or raises, when it has no real result; neither
+        is cached, so fallback values never reach other replicas.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            self.coalesced += 1
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        self.misses += 1
+        try:
+            flight.value = compute()
+            if flight.value is not None:
+                self.set(key, flight.value, ttl)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def get_or_compute_many(self, keys, compute, ttl=None):
+        """Batch form of get_or_compute
+
+        Keys that are None are never looked up. compute(positions) gets the
+        positions of the misses and returns their values in the same order.
+        Batches are not coalesced with concurrent callers.
+        """
+        values = [None] * len(keys)
+        missing = []
+        for i, key in enumerate(keys):
+            if key is None:
+                continue
+            values[i] = self.get(key)
+            if values[i] is None:
+                missing.append(i)
+        self.hits += len(keys) - keys.count(None) - len(missing)
+
+        if missing:
+            self.misses += len(missing)
+            for i, value in zip(missing, compute(missing)):
+                values[i] = value
+                if value is not None:
+                    self.set(keys[i], value, ttl)
+        return values
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced,
+                "backend": type(self.backend).__name__}
+
+    def close(self):
+        self.backend.close()
+
+
+def create_backend(name=None):
+    """Build the backend named in Config.RESULT_CACHE_BACKEND"""
+    name = (name or Config.RESULT_CACHE_BACKEND).lower()
+    if name == "none":
+        return NullBackend()
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sqlite":
+        return SQLiteBackend()
+    if name == "redis":
+        return RedisBackend()
+    raise ValueError(f"Unknown result cache backend: {name}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Get the process-wide result cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache(create_backend())
+    return _cache
@@ -0,0 +1,218 @@
+import sys
+import threading
+import weakref
+import logging
+from datetime import datetime
+
+from config import Config
+from storage import to_epoch
+
+_STRING_FIELDS = ("user_message", "bot_response")
+
+
+class ChatTurn:
+    """Compact chat history record with read access compatible with the dict entries"""
+    __slots__ = ("id", "ts", "user_message", "bot_response", "detected_emotion", "personality", "is_welcome")
+
+    def __init__(self, id, ts, user_message, bot_response, detected_emotion=None, personality=None,
+                 is_welcome=False):
+        self.id = id
+        self.ts = ts
+        self.user_message = user_message
+        self.bot_response = bot_response
+        self.detected_emotion = sys.intern(detected_emotion) if detected_emotion else None
+        self.personality = sys.intern(personality) if personality else None
+        self.is_welcome = is_welcome
+
+    @classmethod
+    def from_entry(cls, entry):
+        if isinstance(entry, cls):
+            return entry
+        return cls(
+            entry.get("id"),
+            to_epoch(entry.get("timestamp")),
+            entry.get("user_message"),
+            entry.get("bot_response"),
+            entry.get("detected_emotion"),
+            entry.get("personality"),
+            entry.get("is_welcome", False)
+        )
+
+    @property
+    def timestamp(self):
+        return datetime.fromtimestamp(self.ts)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "timestamp": self.timestamp,
+            "user_message": self.user_message,
+            "bot_response": self.bot_response,
+            "detected_emotion": self.detected_emotion,
+            "personality": self.personality,
+        }
+
+
+def estimate_entry_size(entry):
+    """Approximate memory held by one chat entry, in bytes"""
+    size = sys.getsizeof(entry)
+    for field in _STRING_FIELDS:
+        value = entry.get(field)
+        if value:
+            size += sys.getsizeof(value)
+    if isinstance(entry, dict):
+        size += sum(sys.getsizeof(value) for key, value in entry.items() if key not in _STRING_FIELDS)
+    return size
+
+
+class ChatTranscript:
+    """Session chat history kept within a memory budget
+
+    The newest ``hot_turns`` entries stay as they were appended. Older ones are
+    compacted into ChatTurn records. When the estimated size passes the budget,
+    the oldest stored turns are dropped from memory; ``cursor`` points at the
+    oldest stored turn still held, so they can be paged back in on demand.
+    Turns appended in this session are only dropped once ``is_committed``
+    confirms the store wrote them (see track_write).
+    """
+
+    def __init__(self, entries=(), cursor=None, budget=None, hot_turns=None, is_committed=None):
+        self.budget = budget or Config.SESSION_MEMORY_BUDGET
+        self.hot_turns = hot_turns or Config.SESSION_HOT_TURNS
+        self.cursor = cursor
+        self.is_committed = is_committed
+        self.entries = []
+        self.size = 0
+        self.spilled = 0
+        # Write sequence numbers of turns appended here, None until the write is queued
+        self._writes = {}
+        for entry in entries:
+            self.entries.append(entry)
+            self.size += estimate_entry_size(entry)
+        self._compact()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __bool__(self):
+        return bool(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __getitem__(self, key):
+        return self.entries[key]
+
+    def append(self, entry):
+        """Add a new entry, then compact and enforce the budget"""
+        self.entries.append(entry)
+        self.size += estimate_entry_size(entry)
+        if entry.get("id") and not entry.get("is_welcome"):
+            self._writes[entry["id"]] = None
+        self._compact()
+        self._enforce_budget()
+
+    def track_write(self, entry_id, seq):
+        """Record the store write queued for an appended entry; None if it was not queued"""
+        if entry_id in self._writes:
+            self._writes[entry_id] = seq
+
+    def prepend(self, entries, cursor):
+        """Add older entries loaded from the store in front of the stored ones in memory"""
+        compacted = [ChatTurn.from_entry(entry) for entry in entries]
+        # Welcome entries at the front stay there
+        position = 0
+        while position < len(self.entries) and self._is_pinned(self.entries[position]):
+            position += 1
+        self.entries[position:position] = compacted
+        self.size += sum(estimate_entry_size(entry) for entry in compacted)
+        self.cursor = cursor
+
+    def _compact(self):
+        for i in range(max(0, len(self.entries) - self.hot_turns)):
+            entry = self.entries[i]
+            if isinstance(entry, ChatTurn):
+                continue
+            turn = ChatTurn.from_entry(entry)
+            self.size += estimate_entry_size(turn) - estimate_entry_size(entry)
+            self.entries[i] = turn
+
+    @staticmethod
+    def _is_pinned(entry):
+        """Welcome entries and turns without ids are not in the store, so they always stay"""
+        return not entry.get("id") or entry.get("is_welcome")
+
+    def _is_stored(self, entry):
+        if entry.get("id") not in self._writes:
+            return True  # loaded from the store
+        seq = self._writes[entry.get("id")]
+        return seq is not None and self.is_committed is not None and self.is_committed(seq)
+
+    def _enforce_budget(self):
+        kept = []
+        evicted = 0
+        i = 0
+        limit = len(self.entries) - self.hot_turns
+        while self.size > self.budget and i < limit:
+            entry = self.entries[i]
+            if self._is_pinned(entry):
+                kept.append(entry)
+            elif self._is_stored(entry):
+                self.size -= estimate_entry_size(entry)
+                self._writes.pop(entry.get("id"), None)
+                evicted += 1
+            else:
+                # Not confirmed yet; dropping later turns would leave a gap before it
+                break
+            i += 1
+
+        if evicted:
+            self.entries[:i] = kept
+            self.spilled += evicted
+            oldest = next((entry for entry in self.entries if not self._is_pinned(entry)), None)
+            if oldest is not None:
+                self.cursor = (to_epoch(oldest.get("timestamp")), oldest.get("id"))
+
+
+class SessionMemoryRegistry:
+    """Server-wide view of how much chat history each live session holds"""
+
+    def __init__(self):
+        self._transcripts = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def register(self, session_id, transcript):
+        with self._lock:
+            self._transcripts[session_id] = transcript
+
+    def report(self, top=10):
+        """Totals across sessions and the largest sessions by estimated size"""
+        with self._lock:
+            sessions = [(session_id, transcript.size, len(transcript), transcript.spilled)
+                        for session_id, transcript in self._transcripts.items()]
+
+        sessions.sort(key=lambda item: -item[1])
+        total = sum(size for _, size, _, _ in sessions)
+        if total > Config.SERVER_MEMORY_WARNING:
+            logging.warning(f"Chat history across {len(sessions)} sessions is using about {total} bytes")
+
+        return {
+            "sessions": len(sessions),
+            "total_bytes": total,
+            "entries": sum(count for _, _, count, _ in sessions),
+            "spilled_entries": sum(spilled for _, _, _, spilled in sessions),
+            "largest": [{"session_id": session_id, "bytes": size, "entries": count, "spilled": spilled}
+                        for session_id, size, count, spilled in sessions[:top]],
+        }
+
+
+memory_registry = SessionMemoryRegistry()
@@ -0,0 +1,486 @@
+import os
+import json
+import queue
+import sqlite3
+import threading
+import time
+import atexit
+import logging
+from datetime import datetime
+from collections import Counter
+from itertools import count, groupby
+
+from config import Config
+
+_FLUSH = object()
+_STOP = object()
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS moods (
+        user_key TEXT NOT NULL,
+        ts REAL NOT NULL,
+        emotion TEXT NOT NULL,
+        confidence REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_moods_user_ts ON moods (user_key, ts)",
+    """
+    CREATE TABLE IF NOT EXISTS mood_rollups (
+        user_key TEXT NOT NULL,
+        granularity TEXT NOT NULL,
+        bucket_start INTEGER NOT NULL,
+        emotion TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        confidence_sum REAL NOT NULL,
+        PRIMARY KEY (user_key, granularity, bucket_start, emotion)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS chat_messages (
+        user_key TEXT NOT NULL,
+        message_id TEXT NOT NULL,
+        ts REAL NOT NULL,
+        user_message TEXT,
+        bot_response TEXT,
+        detected_emotion TEXT,
+        personality TEXT,
+        PRIMARY KEY (user_key, message_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_chat_messages_user_ts ON chat_messages (user_key, ts)",
+    """
+    CREATE TABLE IF NOT EXISTS trend_state (
+        user_key TEXT PRIMARY KEY,
+        ts REAL NOT NULL,
+        state TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS favorite_quotes (
+        user_key TEXT NOT NULL,
+        quote_id TEXT NOT NULL,
+        ts REAL NOT NULL,
+        text TEXT NOT NULL,
+        author TEXT NOT NULL,
+        category TEXT,
+        PRIMARY KEY (user_key, quote_id)
+    )
+    """,
+]
+
+INSERT_MOOD = "INSERT INTO moods (user_key, ts, emotion, confidence) VALUES (?, ?, ?, ?)"
+UPSERT_ROLLUP = (
+    "INSERT INTO mood_rollups (user_key, granularity, bucket_start, emotion, count, confidence_sum) "
+    "VALUES (?, ?, ?, ?, 1, ?) "
+    "ON CONFLICT (user_key, granularity, bucket_start, emotion) "
+    "DO UPDATE SET count = count + 1, confidence_sum = confidence_sum + excluded.confidence_sum"
+)
+INSERT_CHAT = (
+    "INSERT OR REPLACE INTO chat_messages "
+    "(user_key, message_id, ts, user_message, bot_response, detected_emotion, personality) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+INSERT_FAVORITE = (
+    "INSERT OR REPLACE INTO favorite_quotes (user_key, quote_id, ts, text, author, category) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+INSERT_CHAT_IF_NEW = INSERT_CHAT.replace("INSERT OR REPLACE", "INSERT OR IGNORE")
+INSERT_FAVORITE_IF_NEW = INSERT_FAVORITE.replace("INSERT OR REPLACE", "INSERT OR IGNORE")
+SAVE_TREND_STATE = "INSERT OR REPLACE INTO trend_state (user_key, ts, state) VALUES (?, ?, ?)"
+DELETE_FAVORITE = "DELETE FROM favorite_quotes WHERE user_key = ? AND quote_id = ?"
+
+# Columns of exported rows per record kind, in order; user keys are never exported
+EXPORT_COLUMNS = {
+    "chat": ("message_id", "ts", "user_message", "bot_response", "detected_emotion", "personality"),
+    "mood": ("ts", "emotion", "confidence"),
+    "favorite": ("quote_id", "ts", "text", "author", "category"),
+}
+_EXPORT_TABLES = {"chat": "chat_messages", "mood": "moods", "favorite": "favorite_quotes"}
+
+
+# Rollup bucket sizes in seconds; buckets are aligned to UTC
+ROLLUP_GRANULARITIES = {
+    "hour": 3600,
+    "day": 86400,
+    "week": 604800,
+}
+# The epoch fell on a Thursday; shift so weekly buckets start on Monday
+WEEK_OFFSET = 4 * 86400
+
+
+def bucket_start(ts, granularity):
+    """Start of the rollup bucket containing an epoch timestamp"""
+    size = ROLLUP_GRANULARITIES[granularity]
+    offset = WEEK_OFFSET if granularity == "week" else 0
+    return int((ts - offset) // size * size + offset)
+
+
+def to_epoch(timestamp):
+    """Convert a datetime, ISO string or epoch value to epoch seconds"""
+    if timestamp is None:
+        return time.time()
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    if isinstance(timestamp, str):
+        return datetime.fromisoformat(timestamp).timestamp()
+    return float(timestamp)
+
+
+class ConversationStore:
+    """SQLite store for moods, chat messages and favorites, keyed by user and time
+
+    Writes are queued and committed in batches by a background thread. Reads go
+    to the database directly and only see committed rows; call flush() first
+    when a read must include writes made moments ago.
+    """
+
+    def __init__(self, db_path=None, batch_size=None, flush_interval=None):
+        self.db_path = db_path or Config.CONVERSATION_DB
+        self.batch_size = batch_size or Config.STORAGE_BATCH_SIZE
+        self.flush_interval = Config.STORAGE_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.queue = queue.Queue()
+        self._local = threading.local()
+        # Every queued write gets a sequence number; the writer records how far it has
+        # committed, and which writes failed, so callers can check that a write is durable
+        self._sequence = count(1)
+        self._put_lock = threading.Lock()
+        self.committed_through = 0
+        self._failed = set()
+        # Bulk imports write on their own connection, one import at a time
+        self._import_lock = threading.Lock()
+        self._import_conn = None
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        try:
+            for statement in SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+        finally:
+            conn.close()
+
+        self._thread = threading.Thread(target=self._run, name="conversation-store-writer", daemon=True)
+        self._thread.start()
+
+    def _connect(self, check_same_thread=True):
+        conn = sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=check_same_thread)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self):
+        """One read connection per thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # Writes
+
+    def _put(self, statement, params):
+        # Numbered and queued together, so the queue stays in sequence order
+        with self._put_lock:
+            seq = next(self._sequence)
+            self.queue.put((statement, params, seq))
+        return seq
+
+    def is_committed(self, seq):
+        """Whether the write with this sequence number has been committed"""
+        return seq <= self.committed_through and seq not in self._failed
+
+    def add_mood(self, user_key, emotion, confidence, timestamp=None):
+        """Queue a mood entry and the matching rollup updates; returns the last write's sequence number"""
+        ts = to_epoch(timestamp)
+        confidence = float(confidence)
+        seq = self._put(INSERT_MOOD, (user_key, ts, emotion, confidence))
+        for granularity in ROLLUP_GRANULARITIES:
+            seq = self._put(UPSERT_ROLLUP, (user_key, granularity, bucket_start(ts, granularity), emotion, confidence))
+        return seq
+
+    def add_chat_entry(self, user_key, entry):
+        """Queue a chat entry and return its write sequence number
+
+        Entries without an id or marked as welcome are skipped and return None.
+        """
+        if entry.get("is_welcome") or not entry.get("id"):
+            return None
+        return self._put(INSERT_CHAT, (
+            user_key,
+            entry["id"],
+            to_epoch(entry.get("timestamp")),
+            entry.get("user_message"),
+            entry.get("bot_response"),
+            entry.get("detected_emotion"),
+            entry.get("personality"),
+        ))
+
+    def add_favorite(self, user_key, quote):
+        """Queue a favorite quote"""
+        self._put(INSERT_FAVORITE, (
+            user_key, quote["id"], time.time(), quote["text"], quote["author"], quote.get("category")
+        ))
+
+    def remove_favorite(self, user_key, quote):
+        """Queue removal of a favorite quote"""
+        self._put(DELETE_FAVORITE, (user_key, quote["id"]))
+
+    def save_trend_state(self, user_key, state):
+        """Queue the latest trend engine state, replacing the previous one"""
+        self._put(SAVE_TREND_STATE, (user_key, time.time(), json.dumps(state)))
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far has been committed"""
+        done = threading.Event()
+        self.queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Commit queued writes and stop the writer thread"""
+        if self._thread.is_alive():
+            self.queue.put((_STOP, None))
+            self._thread.join(timeout)
+        with self._import_lock:
+            if self._import_conn is not None:
+                self._import_conn.close()
+                self._import_conn = None
+
+    def _run(self):
+        conn = self._connect()
+        batch = []
+        deadline = None
+        try:
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is not None and item[0] is not _FLUSH and item[0] is not _STOP:
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+                    if len(batch) < self.batch_size:
+                        continue
+
+                self._write_batch(conn, batch)
+                batch = []
+                deadline = None
+
+                if item is not None and item[0] is _FLUSH:
+                    item[1].set()
+                elif item is not None and item[0] is _STOP:
+                    return
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn, batch):
+        if not batch:
+            return
+        try:
+            with conn:
+                # Consecutive writes of the same kind go through one executemany call
+                for statement, group in groupby(batch, key=lambda item: item[0]):
+                    conn.executemany(statement, [item[1] for item in group])
+        except sqlite3.Error as e:
+            logging.error(f"Error writing {len(batch)} conversation store rows: {str(e)}")
+            self._failed.update(item[2] for item in batch)
+        self.committed_through = batch[-1][2]
+
+    # Reads
+
+    def get_moods(self, user_key, since=None, until=None, after=None, limit=None):
+        """Get moods in time order within [since, until), resuming after a (ts, rowid) cursor
+
+        Returns (entries, cursor); cursor is None when there are no more rows.
+        """
+        limit = limit or Config.STORAGE_PAGE_SIZE
+        query = "SELECT ts, rowid, emotion, confidence FROM moods WHERE user_key = ? AND ts >= ? AND ts < ?"
+        params = [user_key, to_epoch(since) if since is not None else 0.0,
+                  to_epoch(until) if until is not None else float("inf")]
+        if after is not None:
+            query += " AND (ts, rowid) > (?, ?)"
+            params.extend(after)
+        query += " ORDER BY ts, rowid LIMIT ?"
+        params.append(limit)
+
+        rows = self._reader().execute(query, params).fetchall()
+        entries = [{"timestamp": datetime.fromtimestamp(ts), "emotion": emotion, "confidence": confidence}
+                   for ts, _, emotion, confidence in rows]
+        cursor = (rows[-1][0], rows[-1][1]) if len(rows) == limit else None
+        return entries, cursor
+
+    def iter_moods(self, user_key, since=None, until=None, page_size=None):
+        """Iterate over moods in time order one page at a time"""
+        cursor = None
+        while True:
+            entries, cursor = self.get_moods(user_key, since, until, after=cursor, limit=page_size)
+            yield from entries
+            if cursor is None:
+                return
+
+    def get_recent_moods(self, user_key, limit):
+        """Get the latest moods, oldest first"""
+        rows = self._reader().execute(
+            "SELECT ts, emotion, confidence FROM moods WHERE user_key = ? ORDER BY ts DESC, rowid DESC LIMIT ?",
+            (user_key, limit)
+        ).fetchall()
+        return [{"timestamp": datetime.fromtimestamp(ts), "emotion": emotion, "confidence": confidence}
+                for ts, emotion, confidence in reversed(rows)]
+
+    def get_rollups(self, user_key, granularity, since=None, until=None):
+        """Get rollup rows (bucket_start, emotion, count, confidence_sum) in bucket order"""
+        return self._reader().execute(
+            "SELECT bucket_start, emotion, count, confidence_sum FROM mood_rollups "
+            "WHERE user_key = ? AND granularity = ? AND bucket_start >= ? AND bucket_start < ? "
+            "ORDER BY bucket_start",
+            (user_key, granularity,
+             bucket_start(to_epoch(since), granularity) if since is not None else 0,
+             to_epoch(until) if until is not None else float("inf"))
+        ).fetchall()
+
+    def get_trend_state(self, user_key):
+        """Get the saved trend engine state, or None"""
+        row = self._reader().execute(
+            "SELECT state FROM trend_state WHERE user_key = ?", (user_key,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_chat_page(self, user_key, before=None, limit=None):
+        """Get the chat entries just before a (ts, message_id) cursor, oldest first
+
+        Returns (entries, cursor) where cursor points at the oldest returned entry
+        and is None when there is nothing older.
+        """
+        limit = limit or Config.STORAGE_PAGE_SIZE
+        query = ("SELECT message_id, ts, user_message, bot_response, detected_emotion, personality "
+                 "FROM chat_messages WHERE user_key = ?")
+        params = [user_key]
+        if before is not None:
+            query += " AND (ts, message_id) < (?, ?)"
+            params.extend(before)
+        query += " ORDER BY ts DESC, message_id DESC LIMIT ?"
+        params.append(limit)
+
+        rows = self._reader().execute(query, params).fetchall()
+        entries = [{
+            "id": message_id,
+            "timestamp": datetime.fromtimestamp(ts),
+            "user_message": user_message,
+            "bot_response": bot_response,
+            "detected_emotion": detected_emotion,
+            "personality": personality
+        } for message_id, ts, user_message, bot_response, detected_emotion, personality in reversed(rows)]
+        cursor = (rows[-1][1], rows[-1][0]) if len(rows) == limit else None
+        return entries, cursor
+
+    def iter_chat(self, user_key, page_size=None):
+        """Iterate over all chat entries, newest page first"""
+        cursor = None
+        while True:
+            entries, cursor = self.get_chat_page(user_key, before=cursor, limit=page_size)
+            yield from entries
+            if cursor is None:
+                return
+
+    def get_favorites(self, user_key):
+        """Get favorite quotes in the order they were added"""
+        rows = self._reader().execute(
+            "SELECT quote_id, text, author, category FROM favorite_quotes WHERE user_key = ? ORDER BY ts",
+            (user_key,)
+        ).fetchall()
+        favorites = []
+        for quote_id, text, author, category in rows:
+            quote = {"text": text, "author": author, "id": quote_id}
+            if category:
+                quote["category"] = category
+            favorites.append(quote)
+        return favorites
+
+    # Bulk export and import
+
+    def iter_export_chunks(self, kind, user_key, chunk_size=None):
+        """Yield a user's rows of one kind as lists of tuples in EXPORT_COLUMNS order, oldest first
+
+        Pages are read with a (ts, rowid) cursor, so memory stays bounded by
+        the chunk size however long the history is.
+        """
+        chunk_size = chunk_size or Config.EXPORT_CHUNK_SIZE
+        columns = EXPORT_COLUMNS[kind]
+        query = (f"SELECT {', '.join(columns)}, rowid FROM {_EXPORT_TABLES[kind]} "
+                 "WHERE user_key = ? AND (ts, rowid) > (?, ?) ORDER BY ts, rowid LIMIT ?")
+        ts_index = columns.index("ts")
+        cursor = (float("-inf"), 0)
+        while True:
+            rows = self._reader().execute(query, (user_key, *cursor, chunk_size)).fetchall()
+            if rows:
+                cursor = (rows[-1][ts_index], rows[-1][-1])
+                yield [row[:-1] for row in rows]
+            if len(rows) < chunk_size:
+                return
+
+    def import_rows(self, kind, user_key, rows):
+        """Insert exported rows for a user in one transaction, skipping ones already stored
+
+        Chat messages and favorites are matched on their ids. Moods have no id,
+        so they are matched on time, emotion and confidence against the moods
+        already in the table: each stored mood accounts for one identical
+        imported mood and the rest are inserted, so repeated moods within a
+        chunk are kept (a repeat split across two chunks counts as stored).
+        Imported moods update the rollups like new ones. Imports write on their
+        own connection, not the per-thread read connections, and commit apart
+        from the queued writes. Returns the number of rows inserted.
+        """
+        if not rows:
+            return 0
+        if kind not in EXPORT_COLUMNS:
+            raise ValueError(f"Unknown record kind: {kind}")
+        with self._import_lock:
+            if self._import_conn is None:
+                self._import_conn = self._connect(check_same_thread=False)
+            conn = self._import_conn
+            with conn:
+                if kind == "chat":
+                    before = conn.total_changes
+                    conn.executemany(INSERT_CHAT_IF_NEW, [(user_key, *row) for row in rows])
+                    return conn.total_changes - before
+                if kind == "favorite":
+                    before = conn.total_changes
+                    conn.executemany(INSERT_FAVORITE_IF_NEW, [(user_key, *row) for row in rows])
+                    return conn.total_changes - before
+
+                stored = Counter(conn.execute(
+                    "SELECT ts, emotion, confidence FROM moods WHERE user_key = ? AND ts BETWEEN ? AND ?",
+                    (user_key, min(row[0] for row in rows), max(row[0] for row in rows))
+                ))
+                new_rows = []
+                for row in rows:
+                    if stored[row]:
+                        stored[row] -= 1
+                    else:
+                        new_rows.append(row)
+                conn.executemany(INSERT_MOOD, [(user_key, *row) for row in new_rows])
+                for granularity in ROLLUP_GRANULARITIES:
+                    conn.executemany(UPSERT_ROLLUP, [
+                        (user_key, granularity, bucket_start(ts, granularity), emotion, confidence)
+                        for ts, emotion, confidence in new_rows
+                    ])
+                return len(new_rows)
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Get the process-wide conversation store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ConversationStore()
+                atexit.register(_store.close)
+    return _store
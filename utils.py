@@ -1,18 +1,38 @@
 import streamlit as st
+import os
+import hmac
 import uuid
-from datetime import datetime, timedelta
+import hashlib
+import tempfile
+import html
+from datetime import datetime
+from functools import lru_cache
 import logging
+import metrics
+from logging_pipeline import configure_logging
+from config import Config
+from preprocessing import sanitize
+from mood_detector import EmotionContext
+from mood_history import MoodHistory
+from mood_trend import MoodTrendEngine
+from session_memory import ChatTranscript, memory_registry
+from storage import get_store
 
 def initialize_session_state():
     """Initialize session state variables"""
     
-    # Generate unique session ID if not exists
+    # Reuse the session ID from the URL so history survives a page refresh
     if 'session_id' not in st.session_state:
-        st.session_state.session_id = str(uuid.uuid4())
+        st.session_state.session_id = get_url_session_id()
     
-    # Chat history
+    # Chat history, restored from the persistent store
     if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
+        chat_history, cursor = load_from_store(
+            lambda store, key: store.get_chat_page(key, limit=Config.CHAT_HISTORY_PRELOAD), ([], None)
+        )
+        # Bounded in memory: older turns are compacted, and dropped once they are only needed from the store
+        st.session_state.chat_history = ChatTranscript(chat_history, cursor, is_committed=store_is_committed)
+        memory_registry.register(st.session_state.session_id, st.session_state.chat_history)
     
     # Current mood tracking
     if 'current_mood' not in st.session_state:
@@ -20,7 +40,29 @@ def initialize_session_state():
     
     # Mood history for tracking patterns
     if 'mood_history' not in st.session_state:
-        st.session_state.mood_history = []
+        mood_history = MoodHistory()
+        for entry in load_from_store(lambda store, key: store.get_recent_moods(key, mood_history.capacity), []):
+            mood_history.append(entry['emotion'], entry['confidence'], entry['timestamp'])
+        st.session_state.mood_history = mood_history
+    
+    # Online trend engine, restored from its saved state
+    if 'mood_trend' not in st.session_state:
+        state = load_from_store(lambda store, key: store.get_trend_state(key), None)
+        if state:
+            st.session_state.mood_trend = MoodTrendEngine.from_dict(state)
+        else:
+            engine = MoodTrendEngine()
+            for entry in st.session_state.mood_history:
+                engine.update(entry['emotion'], entry['confidence'], entry['timestamp'])
+            st.session_state.mood_trend = engine
+    
+    # Recent user turns, already tokenized, for context-aware emotion scoring
+    if 'emotion_context' not in st.session_state:
+        st.session_state.emotion_context = EmotionContext()
+    
+    # Locale used to pick regional crisis resources
+    if 'locale' not in st.session_state:
+        st.session_state.locale = detect_locale()
     
     # Personality selection
     if 'selected_personality' not in st.session_state:
@@ -28,7 +70,7 @@ def initialize_session_state():
     
     # Favorite quotes
     if 'favorite_quotes' not in st.session_state:
-        st.session_state.favorite_quotes = []
+        st.session_state.favorite_quotes = load_from_store(lambda store, key: store.get_favorites(key), [])
     
     # Crisis-related states
     if 'crisis_detected' not in st.session_state:
@@ -47,110 +89,239 @@ def initialize_session_state():
     if 'show_mood_history' not in st.session_state:
         st.session_state.show_mood_history = False
 
+# Shortest signing key accepted, in bytes
+_MIN_SECRET_BYTES = 32
+
+@lru_cache(maxsize=1)
+def _session_secret():
+    """Key for signing session ids: Config.SESSION_SECRET, or one generated once and kept on disk
+
+    A new key is written to a temporary file and linked into place, so other
+    processes only ever see the file complete. Keys shorter than 32 bytes are
+    refused rather than cached.
+    """
+    if Config.SESSION_SECRET:
+        secret = Config.SESSION_SECRET.encode("utf-8")
+        if len(secret) < _MIN_SECRET_BYTES:
+            raise RuntimeError(f"MINDMATE_SESSION_SECRET must be at least {_MIN_SECRET_BYTES} bytes")
+        return secret
+    
+    path = os.path.join(Config.STORAGE_DIR, "session_secret")
+    if not os.path.exists(path):
+        os.makedirs(Config.STORAGE_DIR, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=Config.STORAGE_DIR, prefix=".session_secret-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(os.urandom(_MIN_SECRET_BYTES))
+            # Fails if another process linked its key first; that key is used instead
+            os.link(temp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temp_path)
+    
+    with open(path, "rb") as f:
+        secret = f.read()
+    if len(secret) < _MIN_SECRET_BYTES:
+        raise RuntimeError(f"Session secret {path} is shorter than {_MIN_SECRET_BYTES} bytes; delete it to regenerate")
+    return secret
+
+def _session_signature(session_id):
+    return hmac.new(_session_secret(), session_id.encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+def sign_session_id(session_id):
+    """The URL form of a session id: ``<id>.<signature>``"""
+    return f"{session_id}.{_session_signature(session_id)}"
+
+def verify_session_id(token):
+    """The session id in a signed URL token, or None if it is malformed or the signature does not match"""
+    session_id, _, signature = (token or "").partition(".")
+    try:
+        session_id = str(uuid.UUID(session_id))
+    except ValueError:
+        return None
+    if not hmac.compare_digest(signature, _session_signature(session_id)):
+        return None
+    return session_id
+
+def get_url_session_id():
+    """Get the session ID from the signed ``sid`` URL parameter, starting a new session if it is missing or invalid
+
+    Only ids this server signed are accepted, so stored history can't be
+    reached by guessing or editing the parameter; an unsigned or tampered
+    ``sid`` gets a fresh session with nothing restored.
+    """
+    session_id = verify_session_id(st.query_params.get("sid"))
+    if session_id is None:
+        session_id = str(uuid.uuid4())
+        st.query_params["sid"] = sign_session_id(session_id)
+    return session_id
+
+def get_user_key():
+    """Storage key for the current user: the signed-in user if any, otherwise the session"""
+    try:
+        if st.user.is_logged_in:
+            user_id = getattr(st.user, "sub", None) or getattr(st.user, "email", None)
+            if user_id:
+                return f"user:{user_id}"
+    except Exception:
+        pass
+    return f"session:{st.session_state.session_id}"
+
+def is_admin():
+    """Whether the signed-in user is listed in Config.ADMIN_EMAILS"""
+    try:
+        return bool(Config.ADMIN_EMAILS) and st.user.is_logged_in and st.user.email in Config.ADMIN_EMAILS
+    except Exception:
+        return False
+
+def load_earlier_chat(count):
+    """Make sure at least ``count`` chat entries are in memory, reading older pages from the store"""
+    chat_history = st.session_state.chat_history
+    if len(chat_history) < count and chat_history.cursor is not None:
+        # Turns dropped from memory may still be waiting in the write queue
+        load_from_store(lambda store, key: store.flush(), None)
+    
+    while len(chat_history) < count and chat_history.cursor is not None:
+        older, cursor = load_from_store(
+            lambda store, key: store.get_chat_page(key, before=chat_history.cursor),
+            ([], None)
+        )
+        chat_history.prepend(older, cursor)
+
+def load_from_store(loader, default):
+    """Read from the persistent store, falling back to a default if storage is unavailable"""
+    try:
+        return loader(get_store(), get_user_key())
+    except Exception as e:
+        logging.error(f"Error loading from conversation store: {str(e)}")
+        return default
+
+def persist(action, *args):
+    """Queue a write to the persistent store for the current user; returns what the store returns"""
+    try:
+        return getattr(get_store(), action)(get_user_key(), *args)
+    except Exception as e:
+        logging.error(f"Error writing to conversation store: {str(e)}")
+        return None
+
+def store_is_committed(seq):
+    """Whether a queued store write has been committed; False if the store is unavailable"""
+    try:
+        return get_store().is_committed(seq)
+    except Exception:
+        return False
+
+def parse_locale(tag):
+    """Split a locale tag like 'en-US' or 'hi_IN' into language and region"""
+    parts = (tag or "").replace("_", "-").split("-")
+    language = parts[0].lower() or None
+    region = parts[-1].upper() if len(parts) > 1 else None
+    return {"language": language, "region": region}
+
+def detect_locale():
+    """Get the session locale from the browser, falling back to the configured default"""
+    tag = None
+    try:
+        tag = st.context.locale
+    except Exception:
+        pass
+    
+    locale = parse_locale(tag or Config.DEFAULT_LOCALE)
+    if not locale["region"]:
+        locale["region"] = parse_locale(Config.DEFAULT_LOCALE)["region"]
+    return locale
+
 def add_mood_to_history(emotion, confidence, timestamp=None):
     """Add detected mood to history for pattern tracking"""
     if timestamp is None:
         timestamp = datetime.now()
     
-    mood_entry = {
-        "timestamp": timestamp,
-        "emotion": emotion,
-        "confidence": confidence
-    }
-    
-    st.session_state.mood_history.append(mood_entry)
+    # The ring buffer keeps a fixed number of entries and updates trend counts as it goes
+    st.session_state.mood_history.append(emotion, confidence, timestamp)
+    # Remembered so the rollup charts flush the store only while this mood is still queued
+    st.session_state.pending_mood_write = persist("add_mood", emotion, confidence, timestamp)
     
-    # Keep only last 50 mood entries to prevent memory issues
-    if len(st.session_state.mood_history) > 50:
-        st.session_state.mood_history = st.session_state.mood_history[-50:]
+    # Trend state is constant-size, so it is updated and saved on every mood
+    st.session_state.mood_trend.update(emotion, confidence, timestamp)
+    persist("save_trend_state", st.session_state.mood_trend.to_dict())
 
 def get_mood_trend():
     """Analyze mood trends from recent history"""
-    if len(st.session_state.mood_history) < 3:
+    mood_history = st.session_state.mood_history
+    if len(mood_history) < 3:
         return "Not enough data"
     
-    recent_moods = st.session_state.mood_history[-10:]  # Last 10 moods
-    
-    mood_counts = {}
-    for mood_entry in recent_moods:
-        emotion = mood_entry['emotion']
-        mood_counts[emotion] = mood_counts.get(emotion, 0) + 1
-    
-    dominant_mood = max(mood_counts, key=mood_counts.get)
-    
-    # Determine trend
-    if len(recent_moods) >= 5:
-        first_half = recent_moods[:len(recent_moods)//2]
-        second_half = recent_moods[len(recent_moods)//2:]
-        
-        # Count negative emotions
-        negative_emotions = {'sad', 'angry', 'upset', 'anxious'}
-        
-        first_negative = sum(1 for m in first_half if m['emotion'] in negative_emotions)
-        second_negative = sum(1 for m in second_half if m['emotion'] in negative_emotions)
-        
-        if second_negative < first_negative:
-            trend = "improving"
-        elif second_negative > first_negative:
-            trend = "concerning"
-        else:
-            trend = "stable"
-    else:
-        trend = "stable"
-    
     return {
-        "dominant_mood": dominant_mood,
-        "trend": trend,
-        "mood_distribution": mood_counts
+        "dominant_mood": mood_history.dominant_mood(),
+        "trend": mood_history.trend(),
+        "mood_distribution": mood_history.distribution()
     }
 
 def format_timestamp(timestamp):
     """Format timestamp for display"""
     if isinstance(timestamp, str):
         timestamp = datetime.fromisoformat(timestamp)
+    elif isinstance(timestamp, (int, float)):
+        timestamp = datetime.fromtimestamp(timestamp)
     
-    now = datetime.now()
-    diff = now - timestamp
+    seconds = (datetime.now() - timestamp).total_seconds()
     
-    if diff < timedelta(minutes=1):
+    if seconds < 60:
         return "Just now"
-    elif diff < timedelta(hours=1):
-        return f"{int(diff.total_seconds() / 60)} minutes ago"
-    elif diff < timedelta(days=1):
-        return f"{int(diff.total_seconds() / 3600)} hours ago"
+    elif seconds < 3600:
+        return f"{int(seconds / 60)} minutes ago"
+    elif seconds < 86400:
+        return f"{int(seconds / 3600)} hours ago"
     else:
-        return timestamp.strftime("%B %d, %Y at %I:%M %p")
+        return _format_absolute_time(timestamp)
+
+@lru_cache(maxsize=Config.CHAT_BUBBLE_CACHE_SIZE)
+def _format_absolute_time(timestamp):
+    return timestamp.strftime("%B %d, %Y at %I:%M %p")
+
+def paginate(items, page, page_size):
+    """Return the items on the requested page along with the clamped page and page count"""
+    total_pages = max(1, -(-len(items) // page_size))
+    page = min(max(page, 0), total_pages - 1)
+    start = page * page_size
+    return items[start:start + page_size], page, total_pages
 
 def sanitize_input(text):
-    """Basic input sanitization"""
-    if not text:
-        return ""
-    
-    # Remove potential HTML/script tags for safety
-    import re
-    text = re.sub(r'<[^>]+>', '', text)
-    
-    # Limit length
-    max_length = 1000
-    if len(text) > max_length:
-        text = text[:max_length] + "..."
-    
-    return text.strip()
+    """Basic input sanitization; prepare_text also gives the derived fields"""
+    return sanitize(text)
+
+def _timings(key):
+    """The session's dict of latest timings under key, or None when nothing reads them"""
+    if Config.RECORD_TIMINGS or st.session_state.get('profiling', False):
+        return st.session_state.setdefault(key, {})
+    return None
+
+def render_timer(name):
+    """Time a full rerun or a fragment rerun, keeping the latest duration per region
+
+    A shared no-op unless metrics are enabled or timings are being recorded.
+    """
+    return metrics.span("render", name, _timings('render_timings'))
+
+def stage_timer(name):
+    """Time one stage of message processing, keeping the latest duration per stage
+
+    Durations go to the stage histogram when metrics are enabled, and to
+    ``stage_timings`` for profiled requests and Config.RECORD_TIMINGS.
+    """
+    return metrics.span("stage", name, _timings('stage_timings'))
 
 def setup_logging():
-    """Setup logging configuration"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler()
-        ]
-    )
+    """Setup logging configuration
+
+    Log calls only queue the record; a background listener formats and writes
+    it, with rate limiting and per-logger sampling (see logging_pipeline).
+    """
+    configure_logging()
 
 def get_welcome_message():
     """Get personalized welcome message"""
-    from config import Config
-    
     personality = st.session_state.get('selected_personality', 'Friendly')
     greeting = Config.PERSONALITIES[personality]["greeting"]
     
@@ -168,42 +339,68 @@ def get_welcome_message():
     Feel free to share what's on your mind, and I'll adapt my responses to help you feel heard and supported.
     """
 
-def create_chat_bubble(message, is_user=False, emotion=None, timestamp=None):
-    """Create a formatted chat bubble"""
-    from config import Config
-    
-    # Get emoji for emotion if provided
-    emotion_emoji = Config.MOOD_EMOJIS.get(emotion, "") if emotion else ""
-    
-    # Format timestamp
-    time_str = format_timestamp(timestamp) if timestamp else ""
+@lru_cache(maxsize=Config.CHAT_BUBBLE_CACHE_SIZE)
+def build_chat_bubble_html(message, is_user=False, emotion=None):
+    """Build the HTML for a chat bubble, split around the timestamp slot
     
+    Cached on the message text, so only the relative timestamp is formatted on
+    each rerun. The text is HTML-escaped.
+    """
+    message = html.escape(message)
     if is_user:
         # User message bubble
-        st.markdown(f"""
-        <div style="text-align: right; margin: 10px 0;">
-            <div style="display: inline-block; background: linear-gradient(135deg, #007BFF, #0056B3); 
-                        color: white; padding: 10px 15px; border-radius: 20px 20px 5px 20px; 
-                        max-width: 70%; box-shadow: 0 2px 5px rgba(0,0,0,0.1);">
-                {message} {emotion_emoji}
-            </div>
-            <div style="font-size: 0.8em; color: #888; margin-top: 5px;">
-                {time_str}
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        emotion_emoji = Config.MOOD_EMOJIS.get(emotion, "") if emotion else ""
+        head = (
+            '<div style="text-align: right; margin: 10px 0;">'
+            '<div style="display: inline-block; background: linear-gradient(135deg, #007BFF, #0056B3); '
+            'color: white; padding: 10px 15px; border-radius: 20px 20px 5px 20px; '
+            'max-width: 70%; box-shadow: 0 2px 5px rgba(0,0,0,0.1);">'
+            f'{message} {emotion_emoji}</div>'
+        )
     else:
         # Bot message bubble
-        st.markdown(f"""
-        <div style="text-align: left; margin: 10px 0;">
-            <div style="display: inline-block; background: #1a1a3e; color: white; 
-                        padding: 10px 15px; border-radius: 20px 20px 20px 5px; 
-                        max-width: 70%; box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-                        border-left: 3px solid #007BFF;">
-                🤖 {message}
-            </div>
-            <div style="font-size: 0.8em; color: #888; margin-top: 5px;">
-                {time_str}
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        head = (
+            '<div style="text-align: left; margin: 10px 0;">'
+            '<div style="display: inline-block; background: #1a1a3e; color: white; '
+            'padding: 10px 15px; border-radius: 20px 20px 20px 5px; '
+            'max-width: 70%; box-shadow: 0 2px 5px rgba(0,0,0,0.1); '
+            'border-left: 3px solid #007BFF;">'
+            f'🤖 {message}</div>'
+        )
+    
+    head += '<div style="font-size: 0.8em; color: #888; margin-top: 5px;">'
+    tail = '</div></div>'
+    return head, tail
+
+def render_chat_bubble(message, is_user=False, emotion=None, timestamp=None):
+    """Get the full HTML for a chat bubble with a fresh relative timestamp"""
+    head, tail = build_chat_bubble_html(message, is_user, emotion)
+    time_str = format_timestamp(timestamp) if timestamp else ""
+    return head + time_str + tail
+
+def build_chat_transcript_html(chat_entries):
+    """Render chat entries as one HTML block"""
+    parts = []
+    for chat in chat_entries:
+        if chat.get('is_welcome'):
+            continue  # Skip welcome message in chat bubbles
+        
+        if chat['user_message']:
+            parts.append(render_chat_bubble(
+                chat['user_message'],
+                is_user=True,
+                emotion=chat.get('detected_emotion'),
+                timestamp=chat['timestamp']
+            ))
+        
+        if chat['bot_response']:
+            parts.append(render_chat_bubble(
+                chat['bot_response'],
+                is_user=False,
+                timestamp=chat['timestamp']
+            ))
+    return "".join(parts)
+
+def create_chat_bubble(message, is_user=False, emotion=None, timestamp=None):
+    """Create a formatted chat bubble"""
+    st.markdown(render_chat_bubble(message, is_user, emotion, timestamp), unsafe_allow_html=True)